@@ -12,6 +12,7 @@ import logging
 import pandas as pd
 import typing_extensions as t
 from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy_cratedb import insert_bulk
 from sqlalchemy_cratedb.support import table_kwargs
 from vasuki import generate_nagamani19_hash
@@ -41,19 +42,8 @@ async def add_documents(
     documents = response["data"]
     data = pd.DataFrame.from_records(documents)
 
-    logger.info(f"Inserting records into CrateDB: schema={workspace}, table={collection}")
-    with table_kwargs(crate_column_policy="'dynamic'"):
-        data.to_sql(
-            name=collection,
-            schema=workspace,
-            con=cratedb.engine,
-            index=False,
-            if_exists="append",
-            method=insert_bulk,
-        )
-
-    # TODO: Make it optional?
-    cratedb.refresh_table(f'"{workspace}"."{collection}"')
+    # Inserting records blocks, so run it on a worker thread, without stalling the event loop.
+    await run_in_threadpool(insert_documents, cratedb, workspace, collection, data)
 
     # TODO: Properly convey back error messages.
     """
@@ -89,3 +79,22 @@ async def add_documents(
         # https://docs.rockset.com/documentation/docs/write-api#verify-collection-is-updated
         "last_offset": "f1:0:0:0:0",
     }
+
+
+def insert_documents(cratedb: DatabaseAdapter, workspace: str, collection: str, data: pd.DataFrame):
+    """
+    Insert records into CrateDB table, creating it on demand, and refresh it.
+    """
+    logger.info(f"Inserting records into CrateDB: schema={workspace}, table={collection}")
+    with table_kwargs(crate_column_policy="'dynamic'"):
+        data.to_sql(
+            name=collection,
+            schema=workspace,
+            con=cratedb.engine,
+            index=False,
+            if_exists="append",
+            method=insert_bulk,
+        )
+
+    # TODO: Make it optional?
+    cratedb.refresh_table(f'"{workspace}"."{collection}"')
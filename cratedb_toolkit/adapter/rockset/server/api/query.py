@@ -16,14 +16,14 @@ from boltons.iterutils import flatten
 from fastapi import APIRouter, Depends, Request
 from vasuki import generate_nagamani19_hash
 
-from cratedb_toolkit.adapter.rockset.server.dependencies import database_adapter
-from cratedb_toolkit.util import DatabaseAdapter
+from cratedb_toolkit.adapter.rockset.server.dependencies import async_database_adapter
 from cratedb_toolkit.util.database import get_table_names
+from cratedb_toolkit.util.database_async import AsyncDatabaseAdapter
 
 logger = logging.getLogger(__name__)
 
 
-router = APIRouter(dependencies=[Depends(database_adapter)])
+router = APIRouter(dependencies=[Depends(async_database_adapter)])
 
 
 def translate_parameters(parameters: t.Sequence) -> t.Dict[str, str]:
@@ -34,7 +34,7 @@ def translate_parameters(parameters: t.Sequence) -> t.Dict[str, str]:
 
 
 @router.post("/v1/orgs/self/queries")
-async def execute(request: Request, adapter: t.Annotated[DatabaseAdapter, Depends(database_adapter)]):
+async def execute(request: Request, adapter: t.Annotated[AsyncDatabaseAdapter, Depends(async_database_adapter)]):
     # Assign unique identifiers to this operation.
     # TODO: Store audit records.
     query_id = generate_nagamani19_hash()
@@ -51,7 +51,7 @@ async def execute(request: Request, adapter: t.Annotated[DatabaseAdapter, Depend
     if "parameters" in user_request["sql"]:
         parameters = translate_parameters(user_request["sql"]["parameters"])
 
-    results = adapter.run_sql(
+    results = await adapter.run_sql(
         sql=sql,
         parameters=parameters,
         records=True,
@@ -4,6 +4,7 @@ import os
 from functools import lru_cache
 
 from cratedb_toolkit.util import DatabaseAdapter
+from cratedb_toolkit.util.database_async import AsyncDatabaseAdapter
 
 
 @lru_cache
@@ -11,3 +12,9 @@ def database_adapter() -> DatabaseAdapter:
     # TODO: return config.Settings()
     cratedb_sqlalchemy_url = os.environ["CRATEDB_SQLALCHEMY_URL"]
     return DatabaseAdapter(dburi=cratedb_sqlalchemy_url)
+
+
+@lru_cache
+def async_database_adapter() -> AsyncDatabaseAdapter:
+    cratedb_sqlalchemy_url = os.environ["CRATEDB_SQLALCHEMY_URL"]
+    return AsyncDatabaseAdapter(dburi=cratedb_sqlalchemy_url)
@@ -0,0 +1,378 @@
+"""
+CrateDB Diagnostics: Analyze exported system tables offline.
+
+System tables of an export are mounted as lazy polars frames, and evaluated using
+polars expressions equivalent to the diagnostics queries of `wtf.library.Library`.
+Predicates and projections are pushed down into the file scans, so only rows and
+columns needed by an analysis are read. No database is needed.
+
+Exports are read from directories, from chains of incremental exports, and from
+archive files. Members of archive files can not be scanned lazily, so they are
+read completely, but without extracting them.
+"""
+
+import dataclasses
+import logging
+import typing as t
+from pathlib import Path
+
+import polars as pl
+
+from cratedb_toolkit.cfr.systable import (
+    ExportManifest,
+    ExportSettings,
+    SourcePath,
+    SystemTableImporter,
+    SystemTableKnowledge,
+)
+from cratedb_toolkit.util.archive import ArchivePath, ArchiveReader, is_archive
+from cratedb_toolkit.wtf.library import Library
+from cratedb_toolkit.wtf.model import ElementStore, InfoElement
+from cratedb_toolkit.wtf.util import get_baseinfo
+
+logger = logging.getLogger(__name__)
+
+
+# Columns of system tables holding timestamps. NDJSON files store them as strings.
+TIMESTAMP_COLUMNS = ["started", "ended", "finished"]
+
+
+class ExportBundle:
+    """
+    Mount system tables of an export as lazy polars frames.
+
+    The source is the `sys` directory of a single export, a directory containing
+    a manifest of incremental exports, or an archive file. On chains of incremental
+    exports, append-only tables are combined from all exports, while all other
+    tables are taken from the most recent export.
+    """
+
+    def __init__(self, source: Path):
+        self.source = source
+        self.tables: t.Dict[str, t.List[SourcePath]] = {}
+        if is_archive(source):
+            self.add_export(SystemTableImporter.find_export(ArchiveReader(source)))
+        elif ExportManifest.exists(source):
+            for export in ExportManifest.load(source).exports:
+                self.add_export(source / export)
+        else:
+            self.add_export(source)
+
+    def add_export(self, source: SourcePath):
+        path_data = source / ExportSettings.DATA_PATH
+        if not path_data.exists():
+            raise FileNotFoundError(f"Path does not exist: {path_data}")
+        for path in path_data.glob(f"{ExportSettings.TABLE_FILENAME_PREFIX}*"):
+            if path.suffix not in [".jsonl", ".ndjson", ".parquet", ".pq"] or path.stat().st_size == 0:
+                continue
+            tablename = path.name[len(ExportSettings.TABLE_FILENAME_PREFIX) : -len(path.suffix)]
+            if tablename in SystemTableKnowledge.WATERMARK_COLUMNS:
+                self.tables.setdefault(tablename, []).append(path)
+            else:
+                self.tables[tablename] = [path]
+
+    def table_names(self) -> t.List[str]:
+        return sorted(self.tables)
+
+    def scan(self, tablename: str) -> pl.LazyFrame:
+        """
+        Return lazy frame of a system table, with timestamp columns decoded.
+        """
+        frames = [self.scan_file(path) for path in self.tables[tablename]]
+        frame = frames[0] if len(frames) == 1 else pl.concat(frames, how="diagonal_relaxed")
+        schema = frame.collect_schema()
+        return frame.with_columns(
+            pl.col(column).str.to_datetime(time_zone="UTC", strict=False)
+            for column in TIMESTAMP_COLUMNS
+            if schema.get(column) == pl.String
+        )
+
+    @staticmethod
+    def scan_file(path: SourcePath) -> pl.LazyFrame:
+        if isinstance(path, ArchivePath):
+            with path.open() as file:
+                if path.suffix in [".parquet", ".pq"]:
+                    return pl.read_parquet(file).lazy()
+                return pl.read_ndjson(file).lazy()  # type: ignore[arg-type]
+        if path.suffix in [".parquet", ".pq"]:
+            return pl.scan_parquet(path)
+        return pl.scan_ndjson(path, infer_schema_length=None)
+
+
+def duration() -> pl.Expr:
+    """
+    Duration of a job in milliseconds, like `ended::LONG - started::LONG`.
+    """
+    return pl.col("ended").dt.epoch("ms") - pl.col("started").dt.epoch("ms")
+
+
+def field(column: str, *names: str) -> pl.Expr:
+    """
+    Access nested field of an object column, like `column['name']`.
+    """
+    expr = pl.col(column)
+    for name in names:
+        expr = expr.struct.field(name)
+    return expr
+
+
+def count(frame: pl.LazyFrame, name: str) -> pl.LazyFrame:
+    """
+    Count records of a frame into a column called `name`.
+
+    Counting directly on a scan takes a fast path, which does not honor aliases.
+    """
+    return frame.select(pl.len()).rename({"len": name})
+
+
+@dataclasses.dataclass
+class Analysis:
+    """
+    A diagnostics element of `wtf.library.Library`, and its equivalent polars query on system tables.
+    """
+
+    element: InfoElement
+    tables: t.List[str]
+    query: t.Callable[..., pl.LazyFrame]
+
+
+class Analyses:
+    """
+    A collection of diagnostics, evaluated on exported system tables.
+    """
+
+    cluster_name = Analysis(
+        Library.Health.cluster_name,
+        ["cluster"],
+        lambda cluster: cluster.select("name").limit(1),
+    )
+    nodes_count = Analysis(
+        Library.Health.nodes_count,
+        ["nodes"],
+        lambda nodes: count(nodes, "count"),
+    )
+    nodes_list = Analysis(
+        Library.Health.nodes_list,
+        ["nodes"],
+        lambda nodes: nodes.sort("hostname"),
+    )
+    table_health = Analysis(
+        Library.Health.table_health,
+        ["health"],
+        lambda health: health.group_by("health").agg(pl.len().alias("table_count")).sort("health"),
+    )
+    backups_recent = Analysis(
+        Library.Health.backups_recent,
+        ["snapshots"],
+        lambda snapshots: snapshots.select("repository", "name", "finished", "state")
+        .sort("finished", descending=True)
+        .limit(10),
+    )
+
+    shard_allocation = Analysis(
+        Library.Shards.allocation,
+        ["allocations"],
+        lambda allocations: allocations.filter(pl.col("current_state") != "STARTED")
+        .group_by(pl.when(pl.col("primary")).then(pl.lit("primary")).otherwise(pl.lit("replica")).alias("shard_type"))
+        .agg(pl.len().alias("shards")),
+    )
+    node_shard_distribution = Analysis(
+        Library.Shards.node_shard_distribution,
+        ["shards"],
+        lambda shards: shards.filter(pl.col("primary"))
+        .group_by(field("node", "name").alias("node_name"))
+        .agg(pl.len().alias("num_shards"))
+        .sort("node_name"),
+    )
+    rebalancing_progress = Analysis(
+        Library.Shards.rebalancing_progress,
+        ["shards"],
+        lambda shards: shards.group_by(
+            "table_name", "schema_name", field("recovery", "stage").alias("recovery_stage")
+        ).agg(
+            field("recovery", "size", "percent").mean().alias("progress"),
+            pl.len().alias("count"),
+        ),
+    )
+    rebalancing_status = Analysis(
+        Library.Shards.rebalancing_status,
+        ["shards"],
+        lambda shards: shards.filter(pl.col("routing_state").is_in(["INITIALIZING", "RELOCATING"]))
+        .select(
+            field("node", "name").alias("node['name']"),
+            "id",
+            field("recovery", "stage").alias("recovery['stage']"),
+            field("recovery", "size", "percent").alias("recovery['size']['percent']"),
+            "routing_state",
+            "state",
+        )
+        .sort("id"),
+    )
+    shard_not_started = Analysis(
+        Library.Shards.not_started,
+        ["allocations"],
+        lambda allocations: allocations.filter(pl.col("current_state") != "STARTED"),
+    )
+    shard_not_started_count = Analysis(
+        Library.Shards.not_started_count,
+        ["allocations"],
+        lambda allocations: allocations.filter(pl.col("current_state") != "STARTED").select(
+            pl.len().alias("not_started_count")
+        ),
+    )
+    max_checkpoint_delta = Analysis(
+        Library.Shards.max_checkpoint_delta,
+        ["shards"],
+        lambda shards: shards.select(
+            (field("seq_no_stats", "local_checkpoint") - field("seq_no_stats", "global_checkpoint"))
+            .max()
+            .fill_null(0)
+            .alias("max_checkpoint_delta")
+        ),
+    )
+    shard_total_count = Analysis(
+        Library.Shards.total_count,
+        ["shards"],
+        lambda shards: count(shards, "shard_count"),
+    )
+    translog_uncommitted_size = Analysis(
+        Library.Shards.translog_uncommitted_size,
+        ["shards"],
+        lambda shards: shards.select(
+            field("translog_stats", "uncommitted_size").sum().fill_null(0).alias("translog_uncommitted_size")
+        ),
+    )
+
+    age_range = Analysis(
+        Library.JobInfo.age_range,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.select(
+            pl.col("started").min().alias("first_job"), pl.col("started").max().alias("last_job")
+        ),
+    )
+    by_user = Analysis(
+        Library.JobInfo.by_user,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.group_by("username")
+        .agg(pl.col("username").count().alias("count"))
+        .sort("count", descending=True),
+    )
+    duration_percentiles = Analysis(
+        Library.JobInfo.duration_percentiles,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.select(
+            duration().min().alias("min"),
+            duration().quantile(0.50).alias("p50"),
+            duration().quantile(0.90).alias("p90"),
+            duration().quantile(0.99).alias("p99"),
+            duration().max().alias("max"),
+        ),
+    )
+    history = Analysis(
+        Library.JobInfo.history100,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.filter(~pl.col("stmt").str.to_lowercase().str.contains("snapshot", literal=True))
+        .select(pl.col("started").alias("time"), "stmt", duration().alias("duration"), "username")
+        .sort("time", descending=True)
+        .limit(100),
+    )
+    history_count = Analysis(
+        Library.JobInfo.history_count,
+        ["jobs_log"],
+        lambda jobs_log: count(jobs_log, "job_count"),
+    )
+    running_count = Analysis(
+        Library.JobInfo.running_count,
+        ["jobs"],
+        lambda jobs: count(jobs, "job_count"),
+    )
+    top100_count = Analysis(
+        Library.JobInfo.top100_count,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.group_by("stmt")
+        .agg(
+            pl.col("stmt").count().alias("stmt_count"),
+            duration().max().alias("max_duration"),
+            duration().min().alias("min_duration"),
+            duration().mean().alias("avg_duration"),
+            duration().quantile(0.99).alias("p90"),
+        )
+        .sort("stmt_count", descending=True)
+        .limit(100),
+    )
+    top100_duration_individual = Analysis(
+        Library.JobInfo.top100_duration_individual,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.select(duration().alias("duration"), "stmt")
+        .sort("duration", descending=True)
+        .limit(100),
+    )
+    top100_duration_total = Analysis(
+        Library.JobInfo.top100_duration_total,
+        ["jobs_log"],
+        lambda jobs_log: jobs_log.group_by("stmt")
+        .agg(duration().sum().alias("total_duration"), pl.col("stmt").count().alias("stmt_count"))
+        .select("total_duration", "stmt", "stmt_count")
+        .sort("total_duration", descending=True)
+        .limit(100),
+    )
+
+
+class ExportAnalyzer:
+    """
+    Evaluate diagnostics on exported system tables, without a database.
+
+    The output has the same shape as the output of `ctk wtf info`. Diagnostics on
+    tables missing from the export, or failing to evaluate, yield `None`.
+    """
+
+    def __init__(self, bundle: ExportBundle):
+        self.bundle = bundle
+        self.elements = ElementStore()
+        self.analyses: t.Dict[str, Analysis] = {}
+        self.register_builtins()
+
+    def register_builtins(self):
+        for analysis in vars(Analyses).values():
+            if isinstance(analysis, Analysis):
+                self.add(analysis)
+
+    def add(self, *analyses: Analysis):
+        for analysis in analyses:
+            self.elements.add(analysis.element)
+            self.analyses[analysis.element.name] = analysis
+
+    def metadata(self):
+        data = {}
+        data.update(get_baseinfo())
+        data["source"] = str(self.bundle.source)
+        data["elements"] = {}
+        for element in self.elements.items:
+            data["elements"][element.name] = element.to_dict()
+        return data
+
+    def evaluate(self, analysis: Analysis):
+        missing = [tablename for tablename in analysis.tables if tablename not in self.bundle.tables]
+        if missing:
+            logger.info(f"Skipping analysis {analysis.element.name}, tables not exported: {', '.join(missing)}")
+            return None
+        try:
+            frames = [self.bundle.scan(tablename) for tablename in analysis.tables]
+            results = analysis.query(*frames).collect().to_dicts()
+        except pl.exceptions.PolarsError as ex:
+            logger.warning(f"Analysis failed: {analysis.element.name}. Reason: {ex}")
+            return None
+        if analysis.element.transform is not None:
+            results = analysis.element.transform(results)
+        return results
+
+    def render(self):
+        data = {}
+        for name, analysis in self.analyses.items():
+            data[name] = self.evaluate(analysis)
+        return data
+
+    def to_dict(self, data=None):
+        if data is None:
+            data = self.render()
+        return {"meta": self.metadata(), "data": data}
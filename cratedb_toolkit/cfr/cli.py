@@ -3,17 +3,21 @@
 import logging
 import multiprocessing
 import sys
+import typing as t
+from pathlib import Path
 
 import click
 from click_aliases import ClickAliasedGroup
 
-from cratedb_toolkit.cfr.systable import Archive, SystemTableExporter, SystemTableImporter
+from cratedb_toolkit.cfr.systable import SystemTableExporter, SystemTableImporter
+from cratedb_toolkit.util.archive import ArchiveWriter
 from cratedb_toolkit.util.cli import (
     boot_click,
     error_logger,
     make_command,
 )
 from cratedb_toolkit.util.data import jd, path_from_url
+from cratedb_toolkit.util.objectstore import ObjectStore, is_object_store_url
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +38,7 @@ def cli(ctx: click.Context, cratedb_sqlalchemy_url: str, verbose: bool, debug: b
     """
     Diagnostics and informational utilities.
     """
-    if not cratedb_sqlalchemy_url:
+    if not cratedb_sqlalchemy_url and ctx.invoked_subcommand not in ["analyze"]:
         logger.error("Unable to operate without database address")
         sys.exit(1)
     ctx.meta.update({"cratedb_sqlalchemy_url": cratedb_sqlalchemy_url, "scrub": scrub})
@@ -43,24 +47,28 @@ def cli(ctx: click.Context, cratedb_sqlalchemy_url: str, verbose: bool, debug: b
 
 @make_command(cli, "sys-export")
 @click.argument("target", envvar="CFR_TARGET", type=str, required=False, default="file://./cfr")
+@click.option("--incremental", is_flag=True, required=False, help="Only export records added since the previous export")
+@click.option(
+    "--spool-size",
+    envvar="CFR_SPOOL_SIZE",
+    type=click.IntRange(min=0),
+    required=False,
+    default=ArchiveWriter.SPOOL_SIZE,
+    help="Bytes of each table buffered in memory when writing archive files, before using temporary files",
+)
 @click.pass_context
-def sys_export(ctx: click.Context, target: str):
+def sys_export(ctx: click.Context, target: str, incremental: bool, spool_size: int):
     cratedb_sqlalchemy_url = ctx.meta["cratedb_sqlalchemy_url"]
     try:
-        target_path = path_from_url(target)
-        stc = SystemTableExporter(dburi=cratedb_sqlalchemy_url, target=target_path)
-
-        archive = None
-        if target_path.name.endswith(".tgz") or target_path.name.endswith(".tar.gz"):
-            archive = Archive(stc)
-
+        target_location: t.Union[Path, ObjectStore]
+        if is_object_store_url(target):
+            target_location = ObjectStore.from_url(target)
+        else:
+            target_location = path_from_url(target)
+        stc = SystemTableExporter(
+            dburi=cratedb_sqlalchemy_url, target=target_location, incremental=incremental, spool_size=spool_size
+        )
         path = stc.save()
-
-        if archive is not None:
-            path = archive.make_tarfile()
-            archive.close()
-            logger.info(f"Created archive file {target}")
-
         jd({"path": str(path)})
     except Exception as ex:
         error_logger(ctx)(ex)
@@ -80,6 +88,23 @@ def sys_import(ctx: click.Context, source: str):
         sys.exit(1)
 
 
+@make_command(cli, "analyze")
+@click.argument("source", envvar="CFR_SOURCE", type=str, required=True)
+@click.pass_context
+def analyze(ctx: click.Context, source: str):
+    """
+    Run diagnostics on exported system tables, without a database.
+    """
+    from cratedb_toolkit.cfr.analyze import ExportAnalyzer, ExportBundle
+
+    try:
+        analyzer = ExportAnalyzer(ExportBundle(path_from_url(source)))
+        jd(analyzer.to_dict())
+    except Exception as ex:
+        error_logger(ctx)(ex)
+        sys.exit(1)
+
+
 if getattr(sys, "frozen", False):
     # https://github.com/pyinstaller/pyinstaller/issues/6368
     multiprocessing.freeze_support()
@@ -15,11 +15,15 @@ https://cratedb.com/docs/python/en/latest/by-example/sqlalchemy/inspection-refle
 https://docs.sqlalchemy.org/en/20/faq/metadata_schema.html#how-can-i-get-the-create-table-drop-table-output-as-a-string
 """
 
+import contextlib
+import dataclasses
 import datetime as dt
+import io
+import itertools
+import json
 import logging
 import os
-import tarfile
-import tempfile
+import re
 import typing as t
 from pathlib import Path
 
@@ -27,16 +31,30 @@ import polars as pl
 import sqlalchemy as sa
 from tqdm import tqdm
 
+if t.TYPE_CHECKING:
+    import pyarrow as pa
+    from polars._typing import PolarsDataType
+
+from cratedb_toolkit.exception import OperationFailed
 from cratedb_toolkit.util import DatabaseAdapter
+from cratedb_toolkit.util.archive import ArchivePath, ArchiveReader, ArchiveWriter, is_archive
 from cratedb_toolkit.util.cli import error_logger
+from cratedb_toolkit.util.executor import bounded_map, prefetch
+from cratedb_toolkit.util.objectstore import ObjectStore
 from cratedb_toolkit.util.sqlalchemy import patch_encoder
 from cratedb_toolkit.wtf.core import InfoContainer
 
 logger = logging.getLogger(__name__)
 
+# Subscripts of nested columns, like `['id']` within `node['id']`.
+SUBSCRIPT_PATTERN = re.compile(r"\['([^']*)'\]")
+
 
 DataFormat = t.Literal["csv", "jsonl", "ndjson", "parquet"]
 
+# Exports are read from directories, or from members of archive files.
+SourcePath = t.Union[Path, ArchivePath]
+
 
 class SystemTableKnowledge:
     """
@@ -46,9 +64,17 @@ class SystemTableKnowledge:
     # Name of CrateDB's schema for system tables.
     SYS_SCHEMA = "sys"
 
-    # TODO: Reflecting the `summits` table raises an error.
-    # AttributeError: 'UserDefinedType' object has no attribute 'get_col_spec'
-    REFLECTION_BLOCKLIST = ["summits"]
+    # Suffix of array types within `information_schema.columns.data_type`, like `text_array`.
+    ARRAY_TYPE_SUFFIX = "_array"
+
+    # Types within `information_schema.columns.data_type` holding nested values, besides arrays.
+    NESTED_TYPES = ["object", "geo_point", "geo_shape"]
+
+    # Append-only system tables, and their columns used as high-water marks for incremental exports.
+    WATERMARK_COLUMNS = {
+        "jobs_log": "ended",
+        "operations_log": "ended",
+    }
 
 
 class ExportSettings:
@@ -63,144 +89,649 @@ class ExportSettings:
     # The filename prefix when storing tables to disk.
     TABLE_FILENAME_PREFIX = "sys-"
 
+    # Number of tables exported concurrently.
+    CONCURRENCY = 4
+
+    # Number of records per batch when streaming tables to disk.
+    BATCH_SIZE = 5_000
+
+    # Number of bytes per batch when reading CSV files.
+    CSV_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+@dataclasses.dataclass
+class ExportManifest:
+    """
+    Keep track of a chain of incremental exports of a single cluster.
+
+    The manifest lists the export directories in chronological order, and the
+    high-water marks of append-only system tables, in epoch milliseconds. Next
+    incremental exports only include records beyond those marks. Tables which
+    failed to export are listed per export directory, and are not imported.
+    """
+
+    FILENAME: t.ClassVar[str] = "manifest.json"
+
+    exports: t.List[str] = dataclasses.field(default_factory=list)
+    watermarks: t.Dict[str, int] = dataclasses.field(default_factory=dict)
+    failed: t.Dict[str, t.List[str]] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def exists(cls, path: "SourcePath") -> bool:
+        return (path / cls.FILENAME).exists()
+
+    @classmethod
+    def load(cls, path: "SourcePath") -> "ExportManifest":
+        if not cls.exists(path):
+            return cls()
+        data = json.loads((path / cls.FILENAME).read_text())
+        return cls(
+            exports=data.get("exports", []), watermarks=data.get("watermarks", {}), failed=data.get("failed", {})
+        )
+
+    def save(self, path: Path):
+        """
+        Write manifest file, replacing the previous one atomically.
+        """
+        path_tmp = path / f"{self.FILENAME}.tmp"
+        path_tmp.write_text(json.dumps(dataclasses.asdict(self), indent=2))
+        path_tmp.replace(path / self.FILENAME)
+
 
 class SystemTableInspector:
     """
     Reflect schema information from CrateDB system tables.
+
+    Column definitions of all system tables are read using a single query on
+    `information_schema.columns`, and cached on disk per CrateDB version, because
+    they only change between versions.
     """
 
-    def __init__(self, dburi: str):
+    def __init__(self, dburi: str, cache_path: t.Optional[Path] = None):
         self.dburi = dburi
         self.adapter = DatabaseAdapter(dburi=self.dburi)
-        self.engine = self.adapter.engine
-        self.inspector = sa.inspect(self.engine)
+        self.cache_path = cache_path or default_cache_path()
+        self._columns: t.Optional[t.Dict[str, t.List[t.Tuple[str, str]]]] = None
 
     def table_names(self):
-        return self.inspector.get_table_names(schema=SystemTableKnowledge.SYS_SCHEMA)
+        return list(self.columns())
+
+    def columns(self) -> t.Dict[str, t.List[t.Tuple[str, str]]]:
+        """
+        Return names and data types of top-level columns, per system table.
+        """
+        return {
+            tablename: [(column_name, data_type) for column_name, data_type in columns if "[" not in column_name]
+            for tablename, columns in self.all_columns().items()
+        }
+
+    def all_columns(self) -> t.Dict[str, t.List[t.Tuple[str, str]]]:
+        """
+        Return names and data types of all columns, including nested columns of objects
+        like `node['id']`, per system table, reading them on first access.
+        """
+        if self._columns is None:
+            self._columns = self.read_columns()
+        return self._columns
+
+    def arrow_schema(self, tablename: str) -> "pa.Schema":
+        """
+        Return Arrow schema of a system table, derived from its column definitions.
+
+        Objects are represented as structs of their nested columns. Columns whose
+        types can not be derived are omitted, so their types are inferred from the
+        values when reading them.
+        """
+        import pyarrow as pa
+
+        from cratedb_toolkit.util.arrow import arrow_type_from_name
+
+        columns = {
+            column_path(column_name): data_type for column_name, data_type in self.all_columns().get(tablename, [])
+        }
+
+        def arrow_type(path: t.Tuple[str, ...]) -> t.Optional[pa.DataType]:
+            data_type = columns[path]
+            if data_type != "object":
+                return arrow_type_from_name(data_type)
+            fields = []
+            for child in columns:
+                if len(child) == len(path) + 1 and child[: len(path)] == path:
+                    child_type = arrow_type(child)
+                    if child_type is None:
+                        return None
+                    fields.append(pa.field(child[-1], child_type))
+            return fields and pa.struct(fields) or None
+
+        fields = []
+        for path in columns:
+            if len(path) == 1:
+                type_ = arrow_type(path)
+                if type_ is not None:
+                    fields.append(pa.field(path[0], type_))
+        return pa.schema(fields)
+
+    def read_columns(self) -> t.Dict[str, t.List[t.Tuple[str, str]]]:
+        version = self.version()
+        path_cache = self.cache_path / f"sys-columns-{version}.json" if version else None
+        if path_cache is not None and path_cache.exists():
+            logger.debug(f"Reading system table columns from cache: {path_cache}")
+            return json.loads(path_cache.read_text())
+
+        sql = (
+            "SELECT table_name, column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = :schema ORDER BY table_name, ordinal_position"
+        )
+        columns: t.Dict[str, t.List[t.Tuple[str, str]]] = {}
+        for tablename, column_name, data_type in self.adapter.run_sql(
+            sql, parameters={"schema": SystemTableKnowledge.SYS_SCHEMA}
+        ):
+            columns.setdefault(tablename, []).append((column_name, data_type))
+
+        if path_cache is not None:
+            try:
+                path_cache.parent.mkdir(parents=True, exist_ok=True)
+                path_cache.write_text(json.dumps(columns))
+            except OSError as ex:
+                logger.warning(f"Unable to cache system table columns: {path_cache}. Reason: {ex}")
+        return columns
+
+    def version(self) -> t.Optional[str]:
+        """
+        Return CrateDB version of the cluster, or `None` if it is not uniform across nodes.
+        """
+        versions = self.adapter.run_sql("SELECT DISTINCT version['number'] FROM sys.nodes")
+        if len(versions) != 1:
+            return None
+        return versions[0][0]
 
     def ddl(self, tablename_in: str, tablename_out: str, out_schema: str = None, with_drop_table: bool = False) -> str:
-        meta = sa.MetaData(schema=SystemTableKnowledge.SYS_SCHEMA)
-        table = sa.Table(tablename_in, meta, autoload_with=self.engine)
-        table.schema = out_schema
-        table.name = tablename_out
+        tablename = DatabaseAdapter.quote_relation_name(tablename_out)
+        if out_schema:
+            tablename = f"{DatabaseAdapter.quote_relation_name(out_schema)}.{tablename}"
+        definitions = [
+            f"\t{DatabaseAdapter.quote_relation_name(column_name)} {self.sql_type(data_type)}"
+            for column_name, data_type in self.columns()[tablename_in]
+        ]
         sql = ""
         if with_drop_table:
-            sql += sa.schema.DropTable(table, if_exists=True).compile(self.engine).string.strip() + ";\n"
-        sql += sa.schema.CreateTable(table, if_not_exists=True).compile(self.engine).string.strip() + ";\n"
+            sql += f"DROP TABLE IF EXISTS {tablename};\n"
+        sql += f"CREATE TABLE IF NOT EXISTS {tablename} (\n" + ",\n".join(definitions) + "\n);\n"
         return sql
 
+    @staticmethod
+    def sql_type(data_type: str) -> str:
+        """
+        Convert data type name of `information_schema.columns` to SQL DDL, like `text_array` to `ARRAY(TEXT)`.
+        """
+        if data_type.endswith(SystemTableKnowledge.ARRAY_TYPE_SUFFIX):
+            inner = data_type[: -len(SystemTableKnowledge.ARRAY_TYPE_SUFFIX)]
+            return f"ARRAY({SystemTableInspector.sql_type(inner)})"
+        return data_type.upper()
 
-class PathProvider:
-    def __init__(self, path: t.Union[Path]):
-        self.path = path
+
+def column_path(column_name: str) -> t.Tuple[str, ...]:
+    """
+    Split name of a nested column, like `node['id']`, into its path, like `("node", "id")`.
+    """
+    return (column_name.split("[", 1)[0], *SUBSCRIPT_PATTERN.findall(column_name))
+
+
+def default_cache_path() -> Path:
+    """
+    Return directory for caching data across invocations, honoring `XDG_CACHE_HOME`.
+    """
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "cratedb-toolkit"
 
 
-class Archive:
-    def __init__(self, path_provider: PathProvider):
-        self.path_provider = path_provider
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.target_path = self.path_provider.path
-        self.path_provider.path = Path(self.temp_dir.name)
+def csv_frame(frame: pl.DataFrame) -> pl.DataFrame:
+    """
+    Encode nested columns, i.e. objects and arrays, as JSON strings, which the CSV writer of polars can handle.
 
-    def close(self):
-        self.temp_dir.cleanup()
+    Timestamps within nested values are encoded as epoch milliseconds, like the CrateDB client does.
+    Only structs can be encoded to JSON by polars, so arrays are wrapped into a struct, and extracted
+    again using a JSON path.
+    """
+    encoded = []
+    for name, dtype in frame.schema.items():
+        if not isinstance(dtype, (pl.Struct, pl.List, pl.Array)):
+            continue
+        column = pl.col(name).cast(temporal_dtype(dtype, pl.Datetime("ms"))).cast(temporal_dtype(dtype, pl.Int64))
+        if isinstance(dtype, pl.Struct):
+            value = column.struct.json_encode()
+        else:
+            value = pl.struct(column.alias("value")).struct.json_encode().str.json_path_match("$.value")
+        encoded.append(pl.when(pl.col(name).is_null()).then(None).otherwise(value).alias(name))
+    if not encoded:
+        return frame
+    return frame.with_columns(encoded)
 
-    def make_tarfile(self) -> Path:
-        source_path = self.path_provider.path
-        with tarfile.open(self.target_path, "x:gz") as tar:
-            tar.add(source_path.absolute(), arcname=os.path.basename(source_path))
-        return self.target_path
+
+def csv_batches(file: t.BinaryIO, columns: t.List[t.Tuple[str, str]]) -> t.Iterator[pl.DataFrame]:
+    """
+    Read CSV file written by `csv_frame` in blocks, decoding nested columns from JSON.
+
+    Values of columns are converted to the Arrow types derived from their CrateDB data types,
+    so all blocks use the same types. Quoted values may span multiple lines.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    from cratedb_toolkit.util.arrow import arrow_type_from_name
+
+    nested_columns = [name for name, data_type in columns if is_nested_type(data_type)]
+    column_types = {name: pa.string() for name in nested_columns}
+    for name, data_type in columns:
+        arrow_type = arrow_type_from_name(data_type)
+        if name not in column_types and arrow_type is not None:
+            column_types[name] = arrow_type
+
+    reader = pa_csv.open_csv(
+        file,
+        read_options=pa_csv.ReadOptions(block_size=ExportSettings.CSV_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, ignore_empty_lines=False),
+        # The CSV writer of polars writes null values as empty fields, and empty strings as `""`.
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types, strings_can_be_null=True, quoted_strings_can_be_null=False
+        ),
+    )
+    for batch in reader:
+        frame = t.cast(pl.DataFrame, pl.from_arrow(batch))
+        decoded = [
+            pl.col(name).str.json_decode(infer_schema_length=None) for name in nested_columns if name in frame.columns
+        ]
+        yield frame.with_columns(decoded) if decoded else frame
+
+
+def is_nested_type(data_type: str) -> bool:
+    """
+    Whether values of a CrateDB data type are objects or arrays.
+    """
+    return data_type in SystemTableKnowledge.NESTED_TYPES or data_type.endswith(SystemTableKnowledge.ARRAY_TYPE_SUFFIX)
+
+
+def temporal_dtype(dtype: "PolarsDataType", target: "PolarsDataType") -> "PolarsDataType":
+    """
+    Replace dates and timestamps within a possibly nested data type by `target`, retaining time zones.
+    """
+    if isinstance(dtype, pl.Struct):
+        return pl.Struct([pl.Field(field.name, temporal_dtype(field.dtype, target)) for field in dtype.fields])
+    if isinstance(dtype, pl.List):
+        return pl.List(temporal_dtype(dtype.inner, target))  # type: ignore[arg-type]
+    if isinstance(dtype, pl.Array):
+        return pl.Array(temporal_dtype(dtype.inner, target), dtype.size)  # type: ignore[arg-type]
+    if isinstance(dtype, pl.Datetime) and isinstance(target, pl.Datetime):
+        return pl.Datetime("ms", dtype.time_zone)
+    if dtype in (pl.Date, pl.Datetime):
+        return target
+    return dtype
+
+
+class PathProvider:
+    def __init__(self, path: t.Union[Path]):
+        self.path = path
 
 
 class SystemTableExporter(PathProvider):
     """
     Export schema and data from CrateDB system tables.
+
+    When the target is an archive file, like `.tgz` or `.tar.zst`, tables are
+    streamed into the compressed archive, without writing them to disk first.
+    Tables are buffered in memory up to `spool_size` bytes, and in temporary
+    files beyond that, because tar headers need their size up front.
+
+    When the target is an object store, like `s3://` or `az://`, files or the
+    archive are uploaded while they are written, without staging them locally.
     """
 
-    def __init__(self, dburi: str, target: t.Union[Path], data_format: DataFormat = "jsonl"):
+    def __init__(
+        self,
+        dburi: str,
+        target: t.Union[Path, ObjectStore],
+        data_format: DataFormat = "jsonl",
+        concurrency: int = ExportSettings.CONCURRENCY,
+        incremental: bool = False,
+        spool_size: int = ArchiveWriter.SPOOL_SIZE,
+    ):
+        self.store: t.Optional[ObjectStore] = None
+        if isinstance(target, ObjectStore):
+            self.store = target
+            target = Path(target.prefix)
         super().__init__(target)
         self.dburi = dburi
         self.data_format = data_format
+        self.concurrency = concurrency
+        self.incremental = incremental
+        self.spool_size = spool_size
+        self.watermarks: t.Dict[str, int] = {}
+        self.failures: t.Dict[str, Exception] = {}
+        self.archive: t.Optional[ArchiveWriter] = None
         self.adapter = DatabaseAdapter(dburi=self.dburi)
         self.info = InfoContainer(adapter=self.adapter)
         self.inspector = SystemTableInspector(dburi=self.dburi)
 
-    def read_table(self, tablename: str) -> pl.DataFrame:
+    def select_sql(self, tablename: str) -> t.Tuple[str, t.Dict[str, t.Any]]:
+        """
+        Render SQL statement for reading a system table.
+
+        On incremental exports, append-only tables are only read beyond their high-water mark.
+        """
         sql = f'SELECT * FROM "{SystemTableKnowledge.SYS_SCHEMA}"."{tablename}"'  # noqa: S608
+        column = SystemTableKnowledge.WATERMARK_COLUMNS.get(tablename)
+        watermark = self.watermarks.get(tablename)
+        if self.incremental and column is not None and watermark is not None:
+            sql += f' WHERE "{column}" > :watermark'
+            return sql, {"watermark": watermark}
+        return sql, {}
+
+    def read_table(self, tablename: str) -> pl.DataFrame:
+        sql, parameters = self.select_sql(tablename)
         logger.debug(f"Running SQL: {sql}")
-        return pl.read_database(
-            query=sql,  # noqa: S608
-            connection=self.adapter.engine,
-            infer_schema_length=1000,
-        )
+        return self.adapter.run_sql(sql, parameters=parameters, output="polars")
 
-    def dump_table(self, frame: pl.DataFrame, file: t.Union[t.TextIO, None] = None):
+    def dump_table(self, frame: pl.DataFrame, file: t.BinaryIO):
         if self.data_format == "csv":
-            # polars.exceptions.ComputeError: CSV format does not support nested data
-            # return df.write_csv()  # noqa: ERA001
-            return frame.to_pandas().to_csv(file)
+            csv_frame(frame).write_csv(file)
         elif self.data_format in ["jsonl", "ndjson"]:
-            return frame.write_ndjson(file and file.buffer)  # type: ignore[arg-type]
+            frame.write_ndjson(file)  # type: ignore[call-overload]
         elif self.data_format in ["parquet", "pq"]:
-            return frame.write_parquet(file and file.buffer)  # type: ignore[arg-type]
+            frame.write_parquet(file)  # type: ignore[arg-type]
         else:
             raise NotImplementedError(f"Output format not implemented: {self.data_format}")
 
-    def save(self) -> Path:
-        self.path.mkdir(exist_ok=True, parents=True)
+    @contextlib.contextmanager
+    def open_file(self, path: Path) -> t.Iterator[t.BinaryIO]:
+        """
+        Open file for writing, either as member of the archive, as object, or on disk.
+        """
+        if self.archive is not None:
+            with self.archive.open(path.as_posix()) as file:
+                yield file
+        elif self.store is not None:
+            with self.store.open(path.as_posix()) as file:
+                yield file
+        else:
+            with open(path, "wb") as file:
+                yield file
+
+    def location(self, path: Path) -> t.Union[Path, str]:
+        """
+        Return location of an exported file or directory, i.e. its path, or its object store URL.
+        """
+        if self.store is not None:
+            return self.store.location(path.as_posix())
+        return path
+
+    def save(self) -> t.Union[Path, str]:
+        """
+        Export schema and data of all system tables.
+
+        Tables are exported concurrently, using a bounded pool of workers, which
+        share the connection pool of the database adapter. Failing tables do not
+        stop the export, but it raises `OperationFailed` after all tables have been
+        processed, because the export is incomplete.
+        """
+        self.failures = {}
+        if self.incremental and self.store is not None:
+            raise ValueError("Incremental exports can not be written to object stores")
+        if is_archive(self.path):
+            if self.incremental:
+                raise ValueError("Incremental exports can not be written to archive files")
+            with contextlib.ExitStack() as stack:
+                fileobj = None
+                if self.store is not None:
+                    fileobj = stack.enter_context(self.store.open(self.path.as_posix()))
+                else:
+                    self.path.parent.mkdir(exist_ok=True, parents=True)
+                self.archive = ArchiveWriter(self.path, spool_size=self.spool_size, fileobj=fileobj)
+                try:
+                    self.save_to(Path())
+                    self.archive.close()
+                except BaseException:
+                    self.archive.close()
+                    if self.store is None:
+                        self.path.unlink()
+                    raise
+                finally:
+                    self.archive = None
+            logger.info(f"Created archive file {self.location(self.path)}")
+            location = self.location(self.path)
+        else:
+            if self.store is None:
+                self.path.mkdir(exist_ok=True, parents=True)
+            location = self.location(self.save_to(self.path))
+        if self.failures:
+            raise OperationFailed(
+                f"Export is incomplete: {location}. "
+                f"Failed to export {len(self.failures)} system tables: {', '.join(sorted(self.failures))}"
+            )
+        return location
+
+    def save_to(self, root: Path) -> Path:
         timestamp = dt.datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
-        path = self.path / self.info.cluster_name / timestamp / "sys"
-        logger.info(f"Exporting system tables to: {path}")
-        system_tables = self.inspector.table_names()
+        path_cluster = root / self.info.cluster_name
+        path = path_cluster / timestamp / "sys"
+        manifest = None
+        if self.incremental:
+            manifest = ExportManifest.load(path_cluster)
+            self.watermarks = dict(manifest.watermarks)
+        logger.info(f"Exporting system tables to: {self.location(path)}")
+        system_tables = sorted(self.inspector.table_names())
         path_schema = path / ExportSettings.SCHEMA_PATH
         path_data = path / ExportSettings.DATA_PATH
-        path_schema.mkdir(parents=True, exist_ok=True)
-        path_data.mkdir(parents=True, exist_ok=True)
-        table_count = 0
-        for tablename in tqdm(system_tables, disable=None):
-            logger.debug(f"Exporting table: {tablename}")
-            if tablename in SystemTableKnowledge.REFLECTION_BLOCKLIST:
-                continue
+        if self.archive is None and self.store is None:
+            path_schema.mkdir(parents=True, exist_ok=True)
+            path_data.mkdir(parents=True, exist_ok=True)
 
-            path_table_schema = path_schema / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.sql"
-            path_table_data = path_data / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.{self.data_format}"
-            tablename_out = self.adapter.quote_relation_name(f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}")
+        def export(tablename: str) -> t.Tuple[str, t.Optional[bool], t.Optional[Exception]]:
+            try:
+                return tablename, self.save_table(tablename, path_schema=path_schema, path_data=path_data), None
+            except Exception as ex:
+                return tablename, None, ex
 
-            # Write schema file.
-            with open(path_table_schema, "w") as fh_schema:
-                print(self.inspector.ddl(tablename_in=tablename, tablename_out=tablename_out), file=fh_schema)
+        table_count = 0
+        failures: t.Dict[str, Exception] = {}
+        outcomes = bounded_map(export, system_tables, workers=self.concurrency)
+        for tablename, has_data, error in tqdm(outcomes, total=len(system_tables), disable=None):
+            if error is not None:
+                logger.error(f"Exporting table failed: {tablename}. Reason: {error}")
+                failures[tablename] = error
+            elif has_data:
+                table_count += 1
+
+        if failures:
+            if len(failures) == len(system_tables):
+                raise next(iter(failures.values()))
+            logger.error(f"Failed to export {len(failures)} system tables: {', '.join(sorted(failures))}")
+            if self.archive is None and self.store is None:
+                self.discard_tables(list(failures), path_schema=path_schema, path_data=path_data)
+        self.failures.update(failures)
+        if manifest is not None:
+            export_name = path.relative_to(path_cluster).as_posix()
+            manifest.exports.append(export_name)
+            manifest.watermarks = self.watermarks
+            if failures:
+                manifest.failed[export_name] = sorted(failures)
+            manifest.save(path_cluster)
+        logger.info(f"Successfully exported {table_count} system tables")
+        return path
 
-            # Write data file.
+    def discard_tables(self, tablenames: t.List[str], path_schema: Path, path_data: Path):
+        """
+        Remove files of tables which failed to export, so the export directory only contains complete tables.
+        """
+        for tablename in tablenames:
+            (path_schema / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.sql").unlink(missing_ok=True)
+            (path_data / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.{self.data_format}").unlink(
+                missing_ok=True
+            )
+
+    def save_table(self, tablename: str, path_schema: Path, path_data: Path) -> bool:
+        """
+        Export schema and data of a single system table, and return whether it contains data.
+        """
+        logger.debug(f"Exporting table: {tablename}")
+        path_table_schema = path_schema / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.sql"
+        path_table_data = path_data / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.{self.data_format}"
+        tablename_out = self.adapter.quote_relation_name(f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}")
+
+        ddl = self.inspector.ddl(tablename_in=tablename, tablename_out=tablename_out)
+
+        # Write data file, streaming record batches, prefetching the next one while writing.
+        import pyarrow as pa
+
+        column = SystemTableKnowledge.WATERMARK_COLUMNS.get(tablename) if self.incremental else None
+        watermarks: t.List[int] = []
+
+        def track(batches: t.Iterable["pa.RecordBatch"]) -> t.Iterator["pa.RecordBatch"]:
+            for batch in batches:
+                watermark = self.watermark_of(batch, column) if column is not None else None
+                if watermark is not None:
+                    watermarks.append(watermark)
+                yield batch
+
+        try:
+            record_count = self.dump_batches(prefetch(track(self.read_table_batches(tablename))), path_table_data)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as ex:
+            logger.debug(f"Schema of table varies between batches, exporting at once: {tablename}. Reason: {ex}")
+            watermarks.clear()
             df = self.read_table(tablename=tablename)
-            if df.is_empty():
-                continue
-
-            table_count += 1
-
-            mode = "w"
-            if self.data_format in ["parquet", "pq"]:
-                mode = "wb"
-            with open(path_table_data, mode) as fh_data:
-                self.dump_table(frame=df, file=t.cast(t.TextIO, fh_data))
+            watermark = self.watermark_of(df.to_arrow(), column) if column is not None else None
+            if watermark is not None:
+                watermarks.append(watermark)
+            if not df.is_empty():
+                with self.open_file(path_table_data) as fh_data:
+                    self.dump_table(frame=df, file=fh_data)
+            record_count = len(df)
+
+        # Write schema file only after the data file, so tables failing to export leave
+        # no schema behind within archives and object stores, where files can not be removed.
+        with self.open_file(path_table_schema) as fh_schema:
+            fh_schema.write(ddl.encode() + b"\n")
+
+        # Advance the high-water mark only after the data file has been written.
+        if watermarks:
+            self.watermarks[tablename] = max(watermarks)
+        return record_count > 0
+
+    @staticmethod
+    def watermark_of(data: t.Union["pa.RecordBatch", "pa.Table"], column: str) -> t.Optional[int]:
+        """
+        Return the maximum value of a timestamp column in epoch milliseconds, or `None` if there is none.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if data.schema.get_field_index(column) == -1:
+            return None
+        values = data.column(column)
+        if pa.types.is_timestamp(values.type):
+            values = values.cast(pa.timestamp("ms", tz=values.type.tz)).cast(pa.int64())
+        return pc.max(values).as_py()
+
+    def read_table_batches(self, tablename: str) -> t.Iterator["pa.RecordBatch"]:
+        """
+        Read system table in record batches of bounded size, using a server-side cursor.
+
+        When the database does not support cursors, the table is read at once.
+        """
+        sql, parameters = self.select_sql(tablename)
+        logger.debug(f"Running SQL: {sql}")
+        batches = self.adapter.iter_sql(
+            sql,
+            parameters=parameters,
+            page_size=ExportSettings.BATCH_SIZE,
+            output="arrow",
+            schema=self.inspector.arrow_schema(tablename),
+        )
+        try:
+            batch = next(batches, None)
+        except sa.exc.DatabaseError as ex:
+            logger.debug(f"Reading table using cursor failed, reading it at once: {tablename}. Reason: {ex}")
+            yield from self.read_table(tablename=tablename).to_arrow().to_batches()
+            return
+        if batch is not None:
+            yield batch
+            yield from batches
+
+    def dump_batches(self, batches: t.Iterable["pa.RecordBatch"], path: Path) -> int:
+        """
+        Write record batches to file, one at a time, and return the number of records written.
+
+        The file is only created when there is data. Parquet files get one row group
+        per batch, NDJSON and CSV files are appended per batch.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.data_format not in ["csv", "jsonl", "ndjson", "parquet", "pq"]:
+            raise NotImplementedError(f"Output format not implemented: {self.data_format}")
 
-        logger.info(f"Successfully exported {table_count} system tables")
-        return path
+        record_count = 0
+        file: t.Optional[t.BinaryIO] = None
+        writer: t.Optional[pq.ParquetWriter] = None
+        with contextlib.ExitStack() as stack:
+            for batch in batches:
+                if batch.num_rows == 0:
+                    continue
+                if file is None:
+                    file = stack.enter_context(self.open_file(path))
+                if self.data_format == "csv":
+                    csv_frame(pl.from_arrow(batch)).write_csv(file, include_header=record_count == 0)  # type: ignore[arg-type]
+                elif self.data_format in ["jsonl", "ndjson"]:
+                    pl.from_arrow(batch).write_ndjson(file)  # type: ignore[union-attr,call-overload]
+                else:
+                    if writer is None:
+                        writer = pq.ParquetWriter(file, batch.schema)
+                        stack.callback(writer.close)
+                    writer.write_table(pa.Table.from_batches([batch]).cast(writer.schema))
+                record_count += batch.num_rows
+        return record_count
 
 
 class SystemTableImporter:
     """
     Import schema and data about CrateDB system tables.
+
+    The source is either a directory, or an archive file, like `.tgz` or `.tar.zst`,
+    which is read without extracting it.
     """
 
-    def __init__(self, dburi: str, source: Path, data_format: DataFormat = "jsonl", debug: bool = False):
+    def __init__(
+        self,
+        dburi: str,
+        source: Path,
+        data_format: DataFormat = "jsonl",
+        debug: bool = False,
+        concurrency: int = ExportSettings.CONCURRENCY,
+    ):
         self.dburi = dburi
-        self.source = source
+        self.source: SourcePath = source
+        if is_archive(source):
+            self.source = self.find_export(ArchiveReader(source))
         self.data_format = data_format
         self.debug = debug
+        self.concurrency = concurrency
+        self.failures: t.Dict[str, Exception] = {}
         self.adapter = DatabaseAdapter(dburi=self.dburi)
 
-    def table_names(self):
-        path_schema = self.source / ExportSettings.SCHEMA_PATH
+    @staticmethod
+    def find_export(archive: ArchiveReader) -> ArchivePath:
+        """
+        Return the `sys` directory of the export within an archive file.
+        """
+        roots = set()
+        for name in archive.names():
+            parts = name.split("/")
+            if len(parts) >= 3 and parts[-3:-1] == ["sys", ExportSettings.SCHEMA_PATH]:
+                roots.add("/".join(parts[:-2]))
+        if len(roots) != 1:
+            raise ValueError(f"Archive file must contain exactly one export, found {len(roots)}: {archive.path}")
+        return archive.root() / roots.pop()
+
+    def table_names(self, source: t.Optional[SourcePath] = None):
+        path_schema = (source or self.source) / ExportSettings.SCHEMA_PATH
         names = []
         for item in path_schema.glob("*.sql"):
             name = item.name.replace(ExportSettings.TABLE_FILENAME_PREFIX, "").replace(".sql", "")
@@ -208,48 +739,174 @@ class SystemTableImporter:
         return names
 
     def load(self):
-        path_schema = self.source / ExportSettings.SCHEMA_PATH
-        path_data = self.source / ExportSettings.DATA_PATH
+        """
+        Import schema and data of system tables from a single export, or from a chain of incremental exports.
+
+        When the source directory contains a manifest of incremental exports, they
+        are replayed in order. Records of append-only tables are imported from all
+        exports, while all other tables are imported from the most recent export.
+
+        Failing tables do not stop the import, but it raises `OperationFailed` after
+        all tables have been processed, because the import is incomplete.
+        """
+        self.failures = {}
+        if not ExportManifest.exists(self.source):
+            table_count = len(self.load_export(self.source))
+            logger.info(f"Successfully imported {table_count} system tables")
+            self.check_failures()
+            return
+
+        manifest = ExportManifest.load(self.source)
+        logger.info(f"Replaying {len(manifest.exports)} exports from: {self.source}")
+        latest: t.Dict[str, str] = {}
+        for export in manifest.exports:
+            for tablename in self.table_names(self.source / export):
+                if tablename not in manifest.failed.get(export, []):
+                    latest[tablename] = export
+        tablenames_imported: t.Set[str] = set()
+        for export in manifest.exports:
+            tablenames = [
+                tablename
+                for tablename in self.table_names(self.source / export)
+                if tablename not in manifest.failed.get(export, [])
+                and (tablename in SystemTableKnowledge.WATERMARK_COLUMNS or latest[tablename] == export)
+            ]
+            tablenames_imported |= self.load_export(self.source / export, tablenames=tablenames)
+        logger.info(f"Successfully imported {len(tablenames_imported)} system tables")
+        self.check_failures()
+
+    def check_failures(self):
+        """
+        Raise `OperationFailed` when tables failed to import.
+        """
+        if self.failures:
+            raise OperationFailed(
+                "Import is incomplete. "
+                f"Failed to import {len(self.failures)} system tables: {', '.join(sorted(self.failures))}"
+            )
+
+    def load_export(self, source: SourcePath, tablenames: t.Optional[t.List[str]] = None) -> t.Set[str]:
+        """
+        Import schema and data of system tables from a single export, and return the names of imported tables.
+
+        Tables are loaded concurrently, using a bounded pool of workers, which share
+        the connection pool of the database adapter. Data is submitted using CrateDB
+        bulk operations. Failing tables do not stop the import, but are reported
+        after all tables have been processed.
+        """
+        path_schema = source / ExportSettings.SCHEMA_PATH
+        path_data = source / ExportSettings.DATA_PATH
 
         if not path_schema.exists():
             raise FileNotFoundError(f"Path does not exist: {path_schema}")
 
-        logger.info(f"Importing system tables from: {self.source}")
-
-        table_count = 0
-        for tablename in tqdm(self.table_names()):
-            tablename_restored = ExportSettings.TABLE_FILENAME_PREFIX + tablename
+        logger.info(f"Importing system tables from: {source}")
 
-            path_table_schema = path_schema / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.sql"
+        # Skip import of non-existing or empty files.
+        candidates = []
+        for tablename in self.table_names(source) if tablenames is None else tablenames:
             path_table_data = path_data / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.{self.data_format}"
+            if path_table_data.exists() and path_table_data.stat().st_size > 0:
+                candidates.append(tablename)
 
-            # Skip import of non-existing or empty files.
-            if not path_table_data.exists() or path_table_data.stat().st_size == 0:
-                continue
-
-            table_count += 1
-
-            # Invoke SQL DDL.
-            schema_sql = path_table_schema.read_text()
-            self.adapter.run_sql(schema_sql)
-
-            # Load data.
+        def load(tablename: str) -> t.Tuple[str, t.Optional[Exception]]:
             try:
-                df: pl.DataFrame = self.load_table(path_table_data)
-                df.write_database(table_name=tablename_restored, connection=self.dburi, if_table_exists="append")
+                self.load_export_table(tablename, path_schema=path_schema, path_data=path_data)
+                return tablename, None
             except Exception as ex:
-                error_logger(self.debug)(f"Importing table failed: {tablename}. Reason: {ex}")
-
-        logger.info(f"Successfully imported {table_count} system tables")
-        # df.to_pandas().to_sql(name=tablename, con=self.adapter.engine, if_exists="append", index=False)  # noqa: ERA001, E501
-
-    def load_table(self, path: Path) -> pl.DataFrame:
-        if path.suffix in [".jsonl"]:
-            return pl.read_ndjson(path)
-        elif path.suffix in [".parquet", ".pq"]:
-            return pl.read_parquet(path)
-        else:
-            raise NotImplementedError(f"Input format not implemented: {path.suffix}")
+                return tablename, ex
+
+        tablenames_imported = set()
+        failures: t.Dict[str, Exception] = {}
+        outcomes = bounded_map(load, candidates, workers=self.concurrency)
+        for tablename, error in tqdm(outcomes, total=len(candidates), disable=None):
+            if error is not None:
+                error_logger(self.debug)(f"Importing table failed: {tablename}. Reason: {error}")
+                failures[tablename] = error
+            else:
+                tablenames_imported.add(tablename)
+
+        if failures:
+            logger.error(f"Failed to import {len(failures)} system tables: {', '.join(sorted(failures))}")
+        self.failures.update(failures)
+        return tablenames_imported
+
+    def load_export_table(self, tablename: str, path_schema: SourcePath, path_data: SourcePath):
+        """
+        Import schema and data of a single system table.
+        """
+        tablename_restored = ExportSettings.TABLE_FILENAME_PREFIX + tablename
+        path_table_schema = path_schema / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.sql"
+        path_table_data = path_data / f"{ExportSettings.TABLE_FILENAME_PREFIX}{tablename}.{self.data_format}"
+
+        # Invoke SQL DDL.
+        schema_sql = path_table_schema.read_text()
+        self.adapter.run_sql(schema_sql)
+
+        # Load data.
+        record_count = 0
+        failed_count = 0
+        columns: t.Optional[t.List[t.Tuple[str, str]]] = None
+        if path_table_data.suffix == ".csv":
+            columns = self.table_columns(tablename_restored)
+        for df in self.load_table_batches(path_table_data, columns=columns):
+            response = self.adapter.insert_bulk(tablename_restored, df, batch_size=ExportSettings.BATCH_SIZE)
+            record_count += response.record_count
+            failed_count += len(response.failed_records)
+        if failed_count:
+            raise ValueError(f"Failed to import {failed_count} of {record_count} records")
+
+    def table_columns(self, tablename: str) -> t.List[t.Tuple[str, str]]:
+        """
+        Return names and data types of top-level columns of a restored table, used to read CSV files.
+        """
+        sql = (
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = CURRENT_SCHEMA AND table_name = :name ORDER BY ordinal_position"
+        )
+        return [
+            (column_name, data_type)
+            for column_name, data_type in self.adapter.run_sql(sql, parameters={"name": tablename})
+            if len(column_path(column_name)) == 1
+        ]
+
+    def load_table(self, path: SourcePath) -> pl.DataFrame:
+        with path.open("rb") as file:
+            if path.suffix in [".jsonl"]:
+                return pl.read_ndjson(file)  # type: ignore[arg-type]
+            elif path.suffix in [".parquet", ".pq"]:
+                return pl.read_parquet(file)
+            else:
+                raise NotImplementedError(f"Input format not implemented: {path.suffix}")
+
+    def load_table_batches(
+        self, path: SourcePath, columns: t.Optional[t.List[t.Tuple[str, str]]] = None
+    ) -> t.Iterator[pl.DataFrame]:
+        """
+        Read data file of a table in batches of bounded size.
+
+        NDJSON files are streamed line by line, Parquet files are read one record batch at a time.
+        CSV files are streamed in blocks of `CSV_BLOCK_SIZE` bytes, converting values to the
+        data types of `columns`, and decoding objects and arrays from JSON.
+        """
+        with path.open("rb") as file:
+            if path.suffix in [".csv"]:
+                for batch in csv_batches(file, columns or []):
+                    yield batch
+                return
+            if path.suffix in [".jsonl"]:
+                while True:
+                    lines = list(itertools.islice(file, ExportSettings.BATCH_SIZE))
+                    if not lines:
+                        break
+                    yield pl.read_ndjson(io.BytesIO(b"".join(lines)))
+            elif path.suffix in [".parquet", ".pq"]:
+                import pyarrow.parquet as pq
+
+                for batch in pq.ParquetFile(file).iter_batches(batch_size=ExportSettings.BATCH_SIZE):
+                    yield t.cast(pl.DataFrame, pl.from_arrow(batch))
+            else:
+                raise NotImplementedError(f"Input format not implemented: {path.suffix}")
 
 
 patch_encoder()
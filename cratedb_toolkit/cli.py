@@ -2,6 +2,7 @@ import click
 from click_aliases import ClickAliasedGroup
 
 from cratedb_toolkit.util.cli import boot_click
+from cratedb_toolkit.util.instrumentation import sql_profiler
 
 from .adapter.rockset.cli import cli as rockset_cli
 from .cfr.cli import cli as cfr_cli
@@ -15,9 +16,20 @@ from .wtf.cli import cli as wtf_cli
 @click.group(cls=ClickAliasedGroup)  # type: ignore[arg-type]
 @click.option("--verbose", is_flag=True, required=False, help="Turn on logging")
 @click.option("--debug", is_flag=True, required=False, help="Turn on logging with debug level")
+@click.option("--profile-sql", is_flag=True, required=False, help="Report timings of SQL statements to stderr on exit")
+@click.option(
+    "--profile-sql-format",
+    type=click.Choice(["table", "json"]),
+    default="table",
+    required=False,
+    help="Format of the SQL statement timings report",
+)
 @click.version_option()
 @click.pass_context
-def cli(ctx: click.Context, verbose: bool, debug: bool):
+def cli(ctx: click.Context, verbose: bool, debug: bool, profile_sql: bool, profile_sql_format: str):
+    if profile_sql:
+        sql_profiler.enable()
+        ctx.call_on_close(lambda: sql_profiler.report(format_=profile_sql_format))  # type: ignore[arg-type]
     return boot_click(ctx, verbose, debug)
 
 
@@ -0,0 +1,254 @@
+"""
+Load data from files using CrateDB's `COPY FROM` statement.
+
+Parsing and indexing takes place on the cluster nodes, in parallel across shards.
+Remote resources, i.e. `http(s)://`, `s3://`, and `az://` URLs, are read by the
+cluster directly. Local files need to be staged where the cluster can read them,
+either by serving them from a short-lived HTTP server, or by using a path on a
+filesystem shared with the cluster nodes.
+
+https://cratedb.com/docs/crate/reference/en/latest/sql/statements/copy-from.html
+"""
+
+import dataclasses
+import http.server
+import logging
+import socket
+import threading
+import typing as t
+import uuid
+from pathlib import Path
+
+from boltons.urlutils import URL
+
+from cratedb_toolkit.io.file import FileReader, ensure_table, resolve_paths, table_name_from_path
+from cratedb_toolkit.model import DatabaseAddress, InputOutputResource, TableAddress
+from cratedb_toolkit.util.database import DatabaseAdapter
+from cratedb_toolkit.util.executor import bounded_map
+
+logger = logging.getLogger(__name__)
+
+
+class CopyFromSpecs:
+    """
+    Define capabilities of the `COPY FROM` loader.
+    """
+
+    # Map file formats to the format names of `COPY FROM`.
+    formats = {
+        "csv": "csv",
+        "ndjson": "json",
+    }
+
+    # `COPY FROM` decompresses gzip only.
+    compressions = ["gzip"]
+
+    # Number of `COPY FROM` statements running concurrently.
+    concurrency = 4
+
+
+@dataclasses.dataclass
+class CopyFromSummary:
+    """
+    Aggregate the outcome of a `COPY FROM ... RETURN SUMMARY` statement for a single file.
+    """
+
+    uri: str
+    success_count: int = 0
+    error_count: int = 0
+    errors: t.Dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def add(self, record: t.Dict[str, t.Any]):
+        """
+        Add a record of the summary, i.e. the outcome of reading the file on a single node.
+        """
+        self.success_count += record.get("success_count") or 0
+        self.error_count += record.get("error_count") or 0
+        for message, details in (record.get("errors") or {}).items():
+            self.errors[message] = self.errors.get(message, 0) + (details or {}).get("count", 0)
+
+
+def copy_from(
+    resource: InputOutputResource, target_url: str, target: t.Optional[TableAddress] = None, progress: bool = False
+):
+    """
+    Synopsis
+    --------
+    export CRATEDB_SQLALCHEMY_URL=crate://crate@localhost:4200/testdrive/demo
+    ctk load table "file+copy:///path/to/data/*.csv"
+    ctk load table "file+copy:///path/to/data/*.csv?stage_host=192.168.1.42"
+    ctk load table "file+copy:///mnt/shared/data/*.ndjson.gz?stage=shared"
+    ctk load table https://github.com/crate/cratedb-datasets/raw/main/cloud-tutorials/data_weather.csv.gz
+    """
+    from tqdm import tqdm
+
+    logger.info("Running COPY FROM")
+
+    cratedb_address = DatabaseAddress.from_string(target_url)
+    cratedb_uri, cratedb_table_address = cratedb_address.decode()
+    target = target or TableAddress()
+    schema = target.schema or cratedb_table_address.schema or "doc"
+    table = target.table or cratedb_table_address.table
+    cratedb = DatabaseAdapter(dburi=str(cratedb_uri))
+
+    source = URL(resource.url)
+    source.scheme = source.scheme.replace("+copy", "")
+
+    # Map URIs readable by the cluster to file paths, used for deriving format and table name.
+    local = source.scheme == "file"
+    stage: t.Optional[HttpStage] = None
+    try:
+        if local:
+            # Query parameters of local file URLs are options of the loader.
+            options = dict(source.query_params)
+            source.query_params.clear()
+            paths = resolve_paths(source.to_text())
+            if not paths:
+                logger.error(f"No files found: {resource.url}")
+                return False
+            if options.get("stage", "http") == "shared":
+                uris = {path.as_uri(): path for path in paths}
+            else:
+                stage = HttpStage(paths=paths, host=options.get("stage_host") or advertised_host(cratedb_uri.host))
+                uris = {stage.uri(path): path for path in paths}
+        else:
+            uris = {source.to_text(): Path(source.path)}
+
+        jobs = []
+        for uri, path in uris.items():
+            table_address = TableAddress(schema=schema, table=table or table_name_from_path(path))
+            reader = FileReader(path=path, format_=resource.format, compression=resource.compression)
+            if reader.format not in CopyFromSpecs.formats:
+                raise NotImplementedError(f"File format not supported by COPY FROM: {reader.format}")
+            if reader.compression is not None and reader.compression not in CopyFromSpecs.compressions:
+                raise NotImplementedError(f"Compression not supported by COPY FROM: {reader.compression}")
+            if local:
+                ensure_table(cratedb, table_address, reader.sample())
+            elif not cratedb.table_exists(table_address.fullname):
+                logger.error(f"Table does not exist: {table_address.fullname}. Loading remote resources needs it")
+                return False
+            sql = copy_from_sql(
+                table=cratedb.quote_relation_name(table_address.fullname),
+                uri=uri,
+                format_=CopyFromSpecs.formats[reader.format],
+                compression=reader.compression,
+                shared=local and stage is None,
+            )
+            jobs.append((uri, table_address, sql))
+
+        def load(job) -> t.List[CopyFromSummary]:
+            uri, _, sql = job
+            summaries: t.Dict[str, CopyFromSummary] = {}
+            for record in cratedb.run_sql(sql, records=True):
+                # Summary records designate the file they refer to, so globs are reported per file.
+                file_uri = record.get("uri") or uri
+                summaries.setdefault(file_uri, CopyFromSummary(uri=file_uri)).add(record)
+            return list(summaries.values())
+
+        if stage is not None:
+            stage.start()
+        summaries = []
+        for job_summaries in tqdm(bounded_map(load, jobs, workers=CopyFromSpecs.concurrency), disable=not progress):
+            for summary in job_summaries:
+                summaries.append(summary)
+                for message, count in summary.errors.items():
+                    logger.error(f"Failed to load {count} records from {summary.uri}: {message}")
+    finally:
+        if stage is not None:
+            stage.stop()
+
+    for tablename in sorted({job[1].fullname for job in jobs}):
+        cratedb.refresh_table(tablename)
+
+    success_count = sum(summary.success_count for summary in summaries)
+    error_count = sum(summary.error_count for summary in summaries)
+    logger.info(f"Loaded {success_count} of {success_count + error_count} records from {len(summaries)} files")
+    return error_count == 0
+
+
+def copy_from_sql(table: str, uri: str, format_: str, compression: t.Optional[str] = None, shared: bool = False):
+    """
+    Render `COPY FROM ... RETURN SUMMARY` statement.
+    """
+    options = [f"format = '{format_}'"]
+    if compression is not None:
+        options.append(f"compression = '{compression}'")
+    if shared:
+        options.append("shared = true")
+    uri = uri.replace("'", "''")
+    return f"COPY {table} FROM '{uri}' WITH ({', '.join(options)}) RETURN SUMMARY;"
+
+
+def advertised_host(database_host: t.Optional[str]) -> str:
+    """
+    Return the address of the network interface used to reach the database host.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.connect((database_host or "localhost", 4200))
+            return sock.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
+
+
+class HttpStage:
+    """
+    Serve local files to the cluster, using a short-lived HTTP server.
+
+    The server only listens on the address advertised to the cluster, and only
+    serves the staged files, under a random URL prefix, while it is running.
+    """
+
+    def __init__(self, paths: t.List[Path], host: str, port: int = 0):
+        self.host = host
+        self.prefix = uuid.uuid4().hex
+        self.files = {f"/{self.prefix}/{index}/{path.name}": path for index, path in enumerate(paths)}
+        handler = type("HttpStageHandler", (HttpStageHandler,), {"files": self.files})
+        try:
+            self.server = http.server.ThreadingHTTPServer((host, port), handler)
+        except OSError as ex:
+            raise OSError(
+                f"Unable to serve files on {host}: {ex}. "
+                "Use the `stage_host` option to designate the address of a local network interface"
+            ) from ex
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def uri(self, path: Path) -> str:
+        for name, candidate in self.files.items():
+            if candidate == path:
+                return f"http://{self.host}:{self.port}{name}"
+        raise KeyError(f"File not staged: {path}")
+
+    def start(self):
+        logger.info(f"Serving {len(self.files)} files on http://{self.host}:{self.port}/")
+        self.thread.start()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpStageHandler(http.server.BaseHTTPRequestHandler):
+    files: t.Dict[str, Path] = {}
+    chunk_size = 1024 * 1024
+
+    def do_GET(self) -> None:
+        path = self.files.get(self.path)
+        if path is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.end_headers()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                self.wfile.write(chunk)
+
+    def log_message(self, format, *args):  # noqa: A002
+        logger.debug(format, *args)
@@ -0,0 +1,256 @@
+"""
+Load data from files in CSV, NDJSON, and Parquet formats into CrateDB.
+
+Files are read in a streaming manner, and submitted to the database using CrateDB's
+bulk operations, by a pool of concurrent workers. Uncompressed CSV files are partitioned
+by byte ranges, and Parquet files by row groups, so they are also parsed in parallel.
+Compressed CSV and NDJSON files are read as a stream, in chunks of rows.
+"""
+
+import glob
+import logging
+import os
+import typing as t
+from pathlib import Path
+
+from cratedb_toolkit.model import DatabaseAddress, InputOutputResource, TableAddress
+from cratedb_toolkit.util.bulk import BulkResponse
+from cratedb_toolkit.util.data import path_from_url
+from cratedb_toolkit.util.database import DatabaseAdapter
+from cratedb_toolkit.util.executor import bounded_map
+
+logger = logging.getLogger(__name__)
+
+
+class FileLoaderSpecs:
+    """
+    Define capabilities of the file loader.
+    """
+
+    formats = {
+        ".csv": "csv",
+        ".json": "ndjson",
+        ".jsonl": "ndjson",
+        ".ndjson": "ndjson",
+        ".parquet": "parquet",
+        ".pq": "parquet",
+    }
+    compressions = {
+        ".gz": "gzip",
+        ".zst": "zstd",
+    }
+
+    # Number of records per chunk when reading files as a stream, and per bulk request.
+    chunk_size = 10_000
+
+    # Number of workers running concurrently.
+    concurrency = os.cpu_count() or 1
+
+    # Size of byte ranges when partitioning uncompressed CSV files.
+    blocksize = 64 * 1024 * 1024
+
+
+def file_copy(
+    resource: InputOutputResource, target_url: str, target: t.Optional[TableAddress] = None, progress: bool = False
+):
+    """
+    Synopsis
+    --------
+    export CRATEDB_SQLALCHEMY_URL=crate://crate@localhost:4200/testdrive/demo
+    ctk load table file:///path/to/data.csv
+    ctk load table "file:///path/to/data/*.parquet"
+    ctk load table file:///path/to/data.ndjson.gz
+    """
+    from tqdm import tqdm
+
+    logger.info("Running file copy")
+
+    paths = resolve_paths(resource.url)
+    if not paths:
+        logger.error(f"No files found: {resource.url}")
+        return False
+
+    cratedb_address = DatabaseAddress.from_string(target_url)
+    cratedb_uri, cratedb_table_address = cratedb_address.decode()
+    target = target or TableAddress()
+    schema = target.schema or cratedb_table_address.schema or "doc"
+    table = target.table or cratedb_table_address.table
+    cratedb = DatabaseAdapter(dburi=str(cratedb_uri))
+
+    failed_count = 0
+    record_count = 0
+    for path in paths:
+        table_address = TableAddress(schema=schema, table=table or table_name_from_path(path))
+        reader = FileReader(path=path, format_=resource.format, compression=resource.compression)
+        logger.info(f"Loading data. source={path}, target={table_address.fullname}, format={reader.format}")
+
+        def load(partition, table_address=table_address, reader=reader) -> BulkResponse:
+            return cratedb.insert_bulk(
+                tablename=table_address.fullname, data=reader.read(partition), batch_size=FileLoaderSpecs.chunk_size
+            )
+
+        partitions = reader.partitions()
+        ensure_table(cratedb, table_address, reader.sample())
+        for response in tqdm(
+            bounded_map(load, partitions, workers=FileLoaderSpecs.concurrency), disable=not progress, desc=path.name
+        ):
+            record_count += response.record_count
+            failed_count += len(response.failed_records)
+        cratedb.refresh_table(table_address.fullname)
+
+    logger.info(f"Loaded {record_count - failed_count} of {record_count} records from {len(paths)} files")
+    if failed_count:
+        logger.error(f"Failed to load {failed_count} records")
+        return False
+    return True
+
+
+class FileReader:
+    """
+    Read a single file in partitions, for loading them concurrently.
+    """
+
+    def __init__(self, path: Path, format_: t.Optional[str] = None, compression: t.Optional[str] = None):
+        self.path = path
+        suffixes = [suffix.lower() for suffix in path.suffixes]
+        self.compression = compression
+        if suffixes and suffixes[-1] in FileLoaderSpecs.compressions:
+            self.compression = compression or FileLoaderSpecs.compressions[suffixes.pop()]
+        self.format: t.Optional[str] = None
+        if format_:
+            self.format = FileLoaderSpecs.formats.get(f".{format_.lower()}", format_)
+        elif suffixes:
+            self.format = FileLoaderSpecs.formats.get(suffixes[-1])
+        if self.format not in FileLoaderSpecs.formats.values():
+            raise NotImplementedError(f"File format not supported: {path}")
+
+    def sample(self):
+        """
+        Return a pandas data frame of a few records, used to derive the table schema.
+        """
+        import pandas as pd
+
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            batch = next(pq.ParquetFile(self.path).iter_batches(batch_size=100), None)
+            sample = pd.DataFrame() if batch is None else batch.to_pandas()
+        elif self.format == "csv":
+            try:
+                sample = pd.read_csv(self.path, compression=self.compression, nrows=100)
+            except pd.errors.EmptyDataError:
+                sample = pd.DataFrame()
+        else:
+            sample = pd.read_json(self.path, compression=self.compression, lines=True, nrows=100)
+        if sample.empty:
+            raise ValueError(f"Unable to derive table schema, file contains no records: {self.path}")
+        return sample
+
+    def partitions(self) -> t.Iterator[t.Any]:
+        """
+        Yield partitions of the file.
+
+        Row groups and byte ranges are only references, resolved by `read()` within
+        the workers. Streamed chunks are parsed here, and submitted as data frames.
+        """
+        import pandas as pd
+
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            yield from range(pq.ParquetFile(self.path).num_row_groups)
+        elif self.format == "csv" and self.compression is None:
+            import dask.dataframe as dd
+
+            ddf = dd.read_csv(self.path, blocksize=FileLoaderSpecs.blocksize)
+            yield from (ddf.partitions[number] for number in range(ddf.npartitions))
+        elif self.format == "csv":
+            yield from pd.read_csv(self.path, compression=self.compression, chunksize=FileLoaderSpecs.chunk_size)
+        else:
+            yield from pd.read_json(
+                self.path, compression=self.compression, lines=True, chunksize=FileLoaderSpecs.chunk_size
+            )
+
+    def read(self, partition: t.Any) -> t.Any:
+        """
+        Resolve partition reference into data, i.e. a pandas data frame or a pyarrow table.
+        """
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.ParquetFile(self.path).read_row_group(partition)
+        if hasattr(partition, "compute"):
+            return partition.compute(scheduler="synchronous")
+        return partition
+
+
+def resolve_paths(url: str) -> t.List[Path]:
+    """
+    Resolve `file://` URL to list of files, expanding glob patterns and directories.
+    """
+    path = path_from_url(url)
+    if path.is_dir():
+        candidates = sorted(path.iterdir())
+    else:
+        candidates = [Path(item) for item in sorted(glob.glob(str(path)))]
+    return [candidate for candidate in candidates if candidate.is_file()]
+
+
+def table_name_from_path(path: Path) -> str:
+    """
+    Derive table name from file name, stripping all suffixes.
+    """
+    return path.name.split(".")[0]
+
+
+def ensure_table(cratedb: DatabaseAdapter, table: TableAddress, sample):
+    """
+    Create database table when it does not exist, using the schema of a data sample.
+
+    Columns holding objects are defined as `OBJECT`, whose nested columns are
+    added on demand by CrateDB, using the `dynamic` column policy.
+    """
+    from sqlalchemy_cratedb.support import table_kwargs
+
+    with table_kwargs(crate_column_policy="'dynamic'"):
+        sample.iloc[:0].to_sql(
+            name=table.table,
+            schema=table.schema,
+            con=cratedb.engine,
+            index=False,
+            if_exists="append",
+            dtype=nested_types(sample),
+        )
+
+
+def nested_types(sample) -> t.Dict[str, t.Any]:
+    """
+    Derive SQLAlchemy types of columns holding nested data, i.e. objects or arrays.
+
+    Objects are mapped to `OBJECT`, and arrays to arrays of the type of their
+    first element, like `ARRAY(OBJECT)` or `ARRAY(BIGINT)`.
+    """
+    import numpy as np
+    import sqlalchemy as sa
+    from sqlalchemy_cratedb import ObjectArray, ObjectType
+
+    scalar_types = {bool: sa.Boolean, int: sa.BigInteger, float: sa.Float, str: sa.Text}
+    types: t.Dict[str, t.Any] = {}
+    for column in sample.columns:
+        if sample[column].dtype != object:
+            continue
+        for value in sample[column]:
+            if isinstance(value, dict):
+                types[column] = ObjectType
+                break
+            if isinstance(value, (list, np.ndarray)):
+                elements = [element for element in value if element is not None]
+                if not elements:
+                    continue
+                if isinstance(elements[0], dict):
+                    types[column] = ObjectArray
+                else:
+                    element = elements[0].item() if isinstance(elements[0], np.generic) else elements[0]
+                    types[column] = sa.ARRAY(scalar_types.get(type(element), sa.Text))
+                break
+    return types
@@ -1,11 +1,15 @@
 import argparse
+import itertools
 import logging
+import os
+import typing as t
 
 from cratedb_toolkit.io.mongodb.cdc import MongoDBCDCRelayCrateDB
-from cratedb_toolkit.io.mongodb.core import export, extract, translate
+from cratedb_toolkit.io.mongodb.core import BATCH_SIZE, export_records, extract, translate
 from cratedb_toolkit.model import DatabaseAddress
-from cratedb_toolkit.util.cr8 import cr8_insert_json
+from cratedb_toolkit.util.bulk import BulkResponse
 from cratedb_toolkit.util.database import DatabaseAdapter
+from cratedb_toolkit.util.executor import bounded_map, prefetch
 
 logger = logging.getLogger(__name__)
 
@@ -56,18 +60,40 @@ def mongodb_copy(source_url, target_url, progress: bool = False):
         cratedb.run_sql(query)
 
     # 4. Transfer data to CrateDB.
-    """
-    migr8 export --host localhost --port 27017 --database test_db --collection test | \
-        cr8 insert-json --hosts localhost:4200 --table test
-    """
+    #    Batches of documents are read and converted by a background thread, or a
+    #    pool of processes, and loaded by a pool of concurrent bulk writers. Both
+    #    sides are connected by bounded queues, so reading overlaps with writing,
+    #    and memory usage stays constant, independently of the collection size.
     logger.info(
         f"Transferring data from MongoDB to CrateDB: "
         f"source={mongodb_collection_address.fullname}, target={cratedb_table_address.fullname}"
     )
+    from tqdm import tqdm
+
+    concurrency = os.cpu_count() or 1
     export_args = argparse.Namespace(url=str(mongodb_uri), database=mongodb_database, collection=mongodb_collection)
-    buffer = export(export_args)
-    cr8_insert_json(infile=buffer, hosts=cratedb_address.httpuri, table=cratedb_table_address.fullname)
 
+    def load(records: t.List[t.Dict[str, t.Any]]) -> BulkResponse:
+        # Documents do not necessarily share the same fields, so insert the union of them.
+        columns = list(dict.fromkeys(itertools.chain.from_iterable(records)))
+        return cratedb.insert_bulk(
+            tablename=cratedb_table_address.fullname, data=records, columns=columns, batch_size=BATCH_SIZE
+        )
+
+    failed_count = 0
+    record_count = 0
+    batches = prefetch(export_records(export_args), size=concurrency)
+    with tqdm(total=count, disable=not progress, desc=mongodb_collection) as progressbar:
+        for response in bounded_map(load, batches, workers=concurrency):
+            record_count += response.record_count
+            failed_count += len(response.failed_records)
+            progressbar.update(response.record_count)
+    cratedb.refresh_table(cratedb_table_address.fullname)
+
+    logger.info(f"Loaded {record_count - failed_count} of {record_count} records")
+    if failed_count:
+        logger.error(f"Failed to load {failed_count} records")
+        return False
     return True
 
 
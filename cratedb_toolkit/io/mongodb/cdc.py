@@ -42,7 +42,7 @@ class MongoDBCDCRelayCrateDB:
         Subscribe to change stream events, convert to SQL, and submit to CrateDB.
         """
         # FIXME: Note that the function does not perform any sensible error handling yet.
-        with self.cratedb_adapter.engine.connect() as connection:
+        with self.cratedb_adapter.checkout() as connection:
             connection.execute(sa.text(self.cdc.sql_ddl))
             for sql in self.cdc_to_sql():
                 if sql:
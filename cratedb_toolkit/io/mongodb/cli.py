@@ -1,5 +1,6 @@
 import argparse
 import json
+import sys
 
 import rich
 
@@ -16,8 +17,22 @@ def extract_parser(subargs):
     parser.add_argument("--collection", help="MongoDB collection to create a schema for")
     parser.add_argument(
         "--scan",
-        choices=["full", "partial"],
-        help="Whether to fully scan the MongoDB collections or only partially.",
+        choices=["full", "partial", "sample"],
+        help="Whether to fully scan the MongoDB collections, only partially, or a random sample of documents.",
+    )
+    parser.add_argument("--sample-size", type=int, help="Number of documents to scan when sampling")
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.99,
+        help="Confidence level used to derive the sample size, when not given explicitly",
+    )
+    parser.add_argument("--workers", type=int, help="Number of processes scanning large collections concurrently")
+    parser.add_argument(
+        "--engine",
+        choices=["client", "server"],
+        default="client",
+        help="Whether to extract schemas on the client, or within MongoDB, using aggregation pipelines",
     )
     parser.add_argument("-o", "--out", default="mongodb_schema.json")
 
@@ -37,6 +52,7 @@ def export_parser(subargs):
     parser.add_argument("--host", default="localhost", help="MongoDB host")
     parser.add_argument("--port", default=27017, help="MongoDB port")
     parser.add_argument("--database", required=True, help="MongoDB database")
+    parser.add_argument("--workers", type=int, help="Number of processes exporting large collections concurrently")
 
 
 def get_args():
@@ -78,7 +94,7 @@ def translate_from_file(args):
 
 
 def export_to_stdout(args):
-    export(args)
+    export(args, file=sys.stdout.buffer)
 
 
 def main():
@@ -1,20 +1,47 @@
+import functools
 import io
+import itertools
 import logging
+import os
 import typing as t
 
 import pymongo
+import pymongo.collection
 import pymongo.database
 import rich
 from bson.raw_bson import RawBSONDocument
 from rich.syntax import Syntax
 
-from .export import collection_to_json
-from .extract import extract_schema_from_collection
+from cratedb_toolkit.util.executor import bounded_map
+
+from .export import collection_to_json_lines, collection_to_records, partition_queries
+from .extract import (
+    extract_schema_from_aggregation,
+    extract_schema_from_collection,
+    extract_schema_from_documents,
+    merge_schemas,
+    progressbar,
+    sample_size_for,
+)
 from .translate import translate as translate_schema
 from .util import parse_input_numbers
 
 logger = logging.getLogger(__name__)
 
+T = t.TypeVar("T")
+
+# Collections smaller than this are exported using a single cursor.
+PARTITION_MIN_DOCUMENTS = 100_000
+
+# Split collections into more ranges than workers, to balance uneven ranges.
+PARTITIONS_PER_WORKER = 4
+
+# Number of documents per range at most, bounding memory usage of workers.
+PARTITION_SIZE = 20_000
+
+# Number of documents per batch.
+BATCH_SIZE = 5_000
+
 
 def gather_collections(database) -> t.List[str]:
     """
@@ -76,22 +103,136 @@ def extract(args) -> t.Dict[str, t.Any]:
         exit(0)
 
     if args.scan:
-        partial = args.scan == "partial"
+        scan = args.scan
     else:
         rich.print("\nDo a [red bold]full[/red bold] collection scan?")
         rich.print("A full scan will iterate over all documents in the collection, a partial only one document. (Y/n)")
         full = input(">  ").strip().lower()
 
-        partial = full != "y"
+        scan = "full" if full == "y" else "partial"
 
-        rich.print(f"\nExecuting a [red bold]{'partial' if partial else 'full'}[/red bold] scan...")
+        rich.print(f"\nExecuting a [red bold]{scan}[/red bold] scan...")
 
     schemas = {}
     for collection in filtered_collections:
-        schemas[collection] = extract_schema_from_collection(db[collection], partial)
+        schemas[collection] = extract_collection(args, db[collection], scan)
     return schemas
 
 
+def extract_collection(args, collection: pymongo.collection.Collection, scan: str) -> t.Dict[str, t.Any]:
+    """
+    Extract schema from a MongoDB collection, scanning one document, a random sample, or all documents.
+
+    When many documents need to be scanned, they are split into ranges of `_id`
+    values. Partial schemas of them are extracted by a pool of processes, and
+    merged. Progress advances per scanned range. When sampling, `_id` values of
+    the sample are drawn once, using a random cursor within MongoDB, and split
+    into disjoint parts, which are looked up using the `_id` index.
+
+    With the `server` engine, schemas are extracted within MongoDB, using
+    aggregation pipelines, so documents are not transferred to the client.
+    Then, a pool of threads runs the pipelines concurrently.
+    """
+    engine = getattr(args, "engine", None) or "client"
+    if engine not in ["client", "server"]:
+        raise ValueError(f"Schema extraction engine not supported: {engine}")
+    if scan == "partial":
+        if engine == "server":
+            return extract_schema_from_aggregation(collection, [{"$limit": 1}])
+        return extract_schema_from_collection(collection, partial=True)
+
+    count = collection.estimated_document_count()
+    sample_size: t.Optional[int] = None
+    if scan == "sample":
+        sample_size = getattr(args, "sample_size", None) or sample_size_for(
+            count, confidence=getattr(args, "confidence", None) or 0.99
+        )
+        # Scanning all documents is cheaper than sampling most of them.
+        if sample_size >= count:
+            sample_size = None
+
+    workers = getattr(args, "workers", None) or os.cpu_count() or 1
+    total = sample_size or count
+    pipelines: t.List[t.List[t.Dict[str, t.Any]]] = []
+    if workers > 1 and total >= PARTITION_MIN_DOCUMENTS:
+        if sample_size is not None:
+            # MongoDB only uses a random cursor when `$sample` is the first stage of a
+            # pipeline, so `_id` values are sampled once, and split into disjoint parts.
+            ids = sample_ids(collection, sample_size)
+            total = len(ids)
+            offsets = list(itertools.accumulate([0, *split_evenly(total, workers * PARTITIONS_PER_WORKER)]))
+            pipelines = [
+                [{"$match": {"_id": {"$in": ids[start:stop]}}}]
+                for start, stop in zip(offsets, offsets[1:])
+                if stop > start
+            ]
+        else:
+            partitions = max(workers * PARTITIONS_PER_WORKER, -(-count // PARTITION_SIZE))
+            queries = partition_queries(collection, partitions=partitions)
+            if len(queries) > 1:
+                pipelines = [[{"$match": query}] for query in queries]
+    if not pipelines:
+        if engine == "server":
+            logger.info(f"Extracting schema of collection '{collection.name}' within MongoDB")
+            return extract_schema_from_aggregation(
+                collection, [{"$sample": {"size": sample_size}}] if sample_size else []
+            )
+        return extract_schema_from_collection(collection, partial=False, sample_size=sample_size)
+
+    logger.info(
+        f"Extracting schema of collection '{collection.name}' from {len(pipelines)} parts using {workers} workers"
+    )
+    schema: t.Dict[str, t.Any] = {"count": 0, "document": {}}
+    fn = functools.partial(extract_partition, args, collection.name, engine=engine)
+    with progressbar:
+        task = progressbar.add_task(collection.name, total=total)
+        try:
+            for partial_schema in bounded_map(fn, pipelines, workers=workers, processes=engine == "client"):
+                merge_schemas(schema, partial_schema)
+                progressbar.update(task, advance=partial_schema["count"])
+        except KeyboardInterrupt:
+            return schema
+    return schema
+
+
+def extract_partition(
+    args, name: str, pipeline: t.List[t.Dict[str, t.Any]], engine: str = "client"
+) -> t.Dict[str, t.Any]:
+    """
+    Extract schema from documents of a MongoDB collection selected by an aggregation pipeline.
+
+    This runs within a worker process, so it uses its own client.
+    """
+    client, db = get_mongodb_client_database(args)
+    try:
+        if engine == "server":
+            return extract_schema_from_aggregation(db[name], pipeline)
+        return extract_schema_from_documents(db[name].aggregate(pipeline))
+    finally:
+        client.close()
+
+
+def sample_ids(collection: pymongo.collection.Collection, size: int) -> t.List[t.Any]:
+    """
+    Return `_id` values of a random sample of documents, without duplicates.
+
+    When `$sample` uses a random cursor, it may return the same document more than once.
+    """
+    ids: t.Dict[t.Tuple[str, str], t.Any] = {}
+    for document in collection.aggregate([{"$sample": {"size": size}}, {"$project": {"_id": 1}}]):
+        # `_id` values may be documents, which are not hashable.
+        ids.setdefault((type(document["_id"]).__name__, repr(document["_id"])), document["_id"])
+    return list(ids.values())
+
+
+def split_evenly(total: int, parts: int) -> t.List[int]:
+    """
+    Split `total` into `parts` integers, which differ by one at most.
+    """
+    quotient, remainder = divmod(total, parts)
+    return [quotient + 1] * remainder + [quotient] * (parts - remainder)
+
+
 def translate(schemas, schemaname: str = None) -> t.Dict[str, str]:
     """
     Translate a given schema into SQL DDL statements compatible with CrateDB.
@@ -107,14 +248,80 @@ def translate(schemas, schemaname: str = None) -> t.Dict[str, str]:
     return result
 
 
-def export(args) -> t.IO[bytes]:
+def export(args, file: t.Optional[t.IO[bytes]] = None) -> t.IO[bytes]:
     """
-    Export MongoDB collection into JSON format.
+    Export MongoDB collection into JSON format, writing to `file`, or into an in-memory buffer.
 
     TODO: Run on multiple collections, like `extract`.
     """
-    buffer = io.BytesIO()
-    client, db = get_mongodb_client_database(args, document_class=RawBSONDocument)
-    collection_to_json(db[args.collection], file=buffer)
-    buffer.seek(0)
+    buffer = file or io.BytesIO()
+    for batch in export_batches(args):
+        buffer.write(b"".join(line + b"\n" for line in batch))
+    if file is None:
+        buffer.seek(0)
     return buffer
+
+
+def export_batches(args, batch_size: int = BATCH_SIZE) -> t.Iterator[t.List[bytes]]:
+    """
+    Read documents of a MongoDB collection, and yield them as JSON, in batches of `batch_size` documents.
+    """
+    return read_batches(args, reader=collection_to_json_lines, batch_size=batch_size)
+
+
+def export_records(args, batch_size: int = BATCH_SIZE) -> t.Iterator[t.List[t.Dict[str, t.Any]]]:
+    """
+    Read documents of a MongoDB collection, and yield them as records, in batches of `batch_size` documents.
+
+    Records consist of plain values, so they can be submitted to CrateDB right away,
+    without serializing them to JSON and parsing them again.
+    """
+    return read_batches(args, reader=collection_to_records, batch_size=batch_size)
+
+
+def read_batches(args, reader: t.Callable[..., t.Iterator[T]], batch_size: int) -> t.Iterator[t.List[T]]:
+    """
+    Read documents of a MongoDB collection using `reader`, and yield results in batches of `batch_size`.
+
+    Large collections are split into ranges of `_id` values of bounded size, which
+    are read concurrently, each using its own cursor, within a pool of processes.
+    Ranges are consumed lazily, so memory usage does not grow with the collection.
+    """
+    client, db = get_mongodb_client_database(args, document_class=RawBSONDocument)
+    try:
+        collection = db[args.collection]
+        workers = getattr(args, "workers", None) or os.cpu_count() or 1
+        queries: t.List[t.Dict[str, t.Any]] = [{}]
+        count = collection.estimated_document_count()
+        if workers > 1 and count >= PARTITION_MIN_DOCUMENTS:
+            partitions = max(workers * PARTITIONS_PER_WORKER, -(-count // PARTITION_SIZE))
+            queries = partition_queries(collection, partitions=partitions)
+        if len(queries) == 1:
+            yield from batched(reader(collection), batch_size)
+            return
+    finally:
+        client.close()
+
+    logger.info(f"Exporting {len(queries)} ranges of collection '{args.collection}' using {workers} workers")
+    fn = functools.partial(export_partition, args, reader=reader)
+    for items in bounded_map(fn, queries, workers=workers, processes=True):
+        yield from batched(items, batch_size)
+
+
+def export_partition(args, query: t.Dict[str, t.Any], reader: t.Callable[..., t.Iterator[T]]) -> t.List[T]:
+    """
+    Export documents of a MongoDB collection matching `query`, using `reader`.
+
+    This runs within a worker process, so it uses its own client.
+    """
+    client, db = get_mongodb_client_database(args, document_class=RawBSONDocument)
+    try:
+        return list(reader(db[args.collection], query=query))
+    finally:
+        client.close()
+
+
+def batched(items: t.Iterable[T], size: int) -> t.Iterator[t.List[T]]:
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
@@ -22,76 +22,128 @@
 
 """
 Export the documents from a MongoDB collection as JSON, to be ingested into CrateDB.
+
+Documents are decoded from BSON by the C extension of PyMongo, and serialized to
+JSON by orjson, in a single pass. Only values of BSON types which orjson can not
+serialize natively are converted, for example dates to epoch milliseconds.
+
+When loading documents into CrateDB directly, they are converted into records of
+plain values instead, which are serialized by the database driver only once.
 """
 
+import base64
 import calendar
 import re
 import sys
 import typing as t
-from datetime import datetime, timedelta
+from datetime import datetime
 
-import bsonjs
+import bson
 import orjson as json
 import pymongo.collection
+from bson.binary import UuidRepresentation
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 
-_TZINFO_RE = re.compile(r"([+\-])?(\d\d):?(\d\d)")
-
-
-def date_converter(value):
-    if isinstance(value, int):
-        return value
-    dt = datetime.strptime(value[:-5], "%Y-%m-%dT%H:%M:%S.%f")
-    iso_match = _TZINFO_RE.match(value[-5:])
-    if iso_match:
-        sign, hours, minutes = iso_match.groups()
-        tzoffset = int(hours) * 3600 + int(minutes) * 60
-        if sign == "-":
-            dt = dt + timedelta(seconds=tzoffset)
-        else:
-            dt = dt - timedelta(seconds=tzoffset)
-    else:
-        raise Exception("Can't parse datetime string {0}".format(value))
-    return calendar.timegm(dt.utctimetuple()) * 1000
-
-
-def timestamp_converter(value):
-    if len(str(value)) <= 10:
-        return value * 1000
-    return value
+CODEC_OPTIONS: CodecOptions
+try:
+    from bson.codec_options import DatetimeConversion
+
+    # Decode dates to epoch milliseconds right away, also beyond the range of `datetime`.
+    CODEC_OPTIONS = CodecOptions(
+        datetime_conversion=DatetimeConversion.DATETIME_MS, uuid_representation=UuidRepresentation.STANDARD
+    )
+except ImportError:  # pragma: nocover
+    # PyMongo < 4.3.
+    CODEC_OPTIONS = CodecOptions(tz_aware=True, uuid_representation=UuidRepresentation.STANDARD)
+
+JSON_OPTIONS = json.OPT_PASSTHROUGH_DATETIME
 
 
-type_converter = {
-    "date": date_converter,
-    "timestamp": timestamp_converter,
-    "undefined": lambda x: None,
+def datetime_to_epoch_ms(value: datetime) -> int:
+    return calendar.timegm(value.utctimetuple()) * 1000 + value.microsecond // 1000
+
+
+# Map flags of regular expressions to their inline notation.
+REGEX_FLAGS = {re.IGNORECASE: "i", re.LOCALE: "l", re.MULTILINE: "m", re.DOTALL: "s", re.UNICODE: "u", re.VERBOSE: "x"}
+
+
+def regex_to_string(value: bson.Regex) -> str:
+    """
+    Convert regular expression to a string, using inline flags, like `(?i)^foo`.
+    """
+    flags = "".join(letter for flag, letter in REGEX_FLAGS.items() if value.flags & flag)
+    if not flags:
+        return value.pattern
+    return f"(?{flags}){value.pattern}"
+
+
+# Convert values of BSON types, which orjson can not serialize natively.
+VALUE_CONVERTERS: t.Dict[t.Type, t.Callable[[t.Any], t.Any]] = {
+    bson.ObjectId: str,
+    bson.Decimal128: str,
+    # Keep the increment, which orders operations within the same second.
+    bson.Timestamp: lambda value: {"t": value.time * 1000, "i": value.inc},
+    bytes: lambda value: base64.b64encode(value).decode(),
+    bson.Binary: lambda value: base64.b64encode(value).decode(),
+    bson.Regex: regex_to_string,
+    bson.DBRef: lambda value: {"ref": value.collection, "id": value.id},
+    bson.MinKey: lambda value: None,
+    bson.MaxKey: lambda value: None,
+    datetime: datetime_to_epoch_ms,
 }
+if hasattr(bson, "DatetimeMS"):
+    VALUE_CONVERTERS[bson.DatetimeMS] = int
+
+
+def convert_value(value: t.Any) -> t.Any:
+    """
+    Convert a value of a BSON type to a value CrateDB can ingest, used as `default` hook of orjson.
+    """
+    converter = VALUE_CONVERTERS.get(type(value))
+    if converter is None:
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+    return converter(value)
+
+
+def document_to_json(document: t.Union[t.Dict[str, t.Any], RawBSONDocument]) -> bytes:
+    """
+    Convert a document to JSON, omitting its `_id` field.
+
+    Decoded documents are modified in place, in order not to copy them.
+    """
+    data = bson.decode(document.raw, codec_options=CODEC_OPTIONS) if isinstance(document, RawBSONDocument) else document
+    data.pop("_id", None)
+    return json.dumps(data, default=convert_value, option=JSON_OPTIONS)
 
 
-def extract_value(value, parent_type=None):
-    if isinstance(value, dict):
-        if len(value) == 1:
-            for k, v in value.items():
-                if k.startswith("$"):
-                    return extract_value(v, k.lstrip("$"))
-        return {k.lstrip("$"): extract_value(v, parent_type) for (k, v) in value.items()}
-    if isinstance(value, list):
-        return [extract_value(v, parent_type) for v in value]
-    if parent_type:
-        converter = type_converter.get(parent_type)
-        if converter:
-            return converter(value)
+def convert_values(value: t.Any) -> t.Any:
+    """
+    Convert values of BSON types within a decoded document, like `convert_value` does for orjson.
+    """
+    type_ = type(value)
+    if type_ is dict:
+        return {key: convert_values(item) for key, item in value.items()}
+    if type_ is list:
+        return [convert_values(item) for item in value]
+    converter = VALUE_CONVERTERS.get(type_)
+    if converter is not None:
+        return convert_values(converter(value))
     return value
 
 
-def convert(d):
-    newdict = {}
-    del d["_id"]
-    for k, v in d.items():
-        newdict[k] = extract_value(v)
-    return newdict
+def document_to_record(document: t.Union[t.Dict[str, t.Any], RawBSONDocument]) -> t.Dict[str, t.Any]:
+    """
+    Convert a document to a record of values CrateDB can ingest, omitting its `_id` field.
+    """
+    data = bson.decode(document.raw, codec_options=CODEC_OPTIONS) if isinstance(document, RawBSONDocument) else document
+    data.pop("_id", None)
+    return convert_values(data)
 
 
-def collection_to_json(collection: pymongo.collection.Collection, file: t.IO[t.Any] = None):
+def collection_to_json(
+    collection: pymongo.collection.Collection, file: t.IO[t.Any] = None, query: t.Dict[str, t.Any] = None
+):
     """
     Export a MongoDB collection's documents to standard JSON.
     The output is suitable to be consumed by the `cr8` program.
@@ -101,10 +153,67 @@ def collection_to_json(collection: pymongo.collection.Collection, file: t.IO[t.A
 
     file
       a file-like object (stream); defaults to the current sys.stdout.
+
+    query
+      a filter selecting the documents to export; defaults to all documents.
     """
     file = file or sys.stdout.buffer
-    for document in collection.find():
-        bson_json = bsonjs.dumps(document.raw)
-        json_object = json.loads(bson_json)
-        file.write(json.dumps(convert(json_object)))
+    for line in collection_to_json_lines(collection, query=query):
+        file.write(line)
         file.write(b"\n")
+
+
+def collection_to_json_lines(
+    collection: pymongo.collection.Collection, query: t.Dict[str, t.Any] = None
+) -> t.Iterator[bytes]:
+    """
+    Read documents of a MongoDB collection, and yield them as JSON, one at a time.
+    """
+    collection = collection.with_options(codec_options=CODEC_OPTIONS)
+    for document in collection.find(query or {}):
+        yield document_to_json(document)
+
+
+def collection_to_records(
+    collection: pymongo.collection.Collection, query: t.Dict[str, t.Any] = None
+) -> t.Iterator[t.Dict[str, t.Any]]:
+    """
+    Read documents of a MongoDB collection, and yield them as records, one at a time.
+    """
+    collection = collection.with_options(codec_options=CODEC_OPTIONS)
+    for document in collection.find(query or {}):
+        yield document_to_record(document)
+
+
+def partition_queries(
+    collection: pymongo.collection.Collection, partitions: int, oversampling: int = 32
+) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Split a collection into ranges of `_id` values of about equal size, and return a query for each range.
+
+    The boundaries of the ranges are quantiles of a random sample of `_id` values,
+    like `splitVector` computes them for sharding. When the sample contains values
+    of different types, or values which can not be ordered, the collection is not
+    split, and a single query matching all documents is returned.
+    """
+    if partitions <= 1:
+        return [{}]
+    pipeline = [{"$sample": {"size": partitions * oversampling}}, {"$project": {"_id": 1}}]
+    sample = [document["_id"] for document in collection.aggregate(pipeline)]
+    if len({type(value) for value in sample}) != 1:
+        return [{}]
+    try:
+        values = sorted(set(sample))
+    except TypeError:
+        return [{}]
+    boundaries = sorted({values[len(values) * index // partitions] for index in range(1, partitions)})
+    if not boundaries:
+        return [{}]
+
+    # Range operators only match values of the same type as the operand, so the
+    # first range matches all other values, in order not to miss any document.
+    queries = [{"_id": {"$not": {"$gte": boundaries[0]}}}]
+    for lower, upper in zip(boundaries, boundaries[1:]):
+        queries.append({"_id": {"$gte": lower, "$lt": upper}})
+    queries.append({"_id": {"$gte": boundaries[-1]}})
+    return queries
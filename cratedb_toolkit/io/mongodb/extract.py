@@ -62,8 +62,18 @@ An example schema may look like:
         }
     }
 }
+
+Large collections can be scanned using a random sample of documents, and in
+parallel, by extracting partial schemas from separate sets of documents, and
+merging them using `merge_schemas`.
+
+Alternatively, the schema can be extracted within MongoDB, using an aggregation
+pipeline counting types of values per path, see `extract_schema_from_aggregation`.
 """
 
+import copy
+import math
+import statistics
 import typing as t
 
 import bson
@@ -79,33 +89,98 @@ progressbar = progress.Progress(
 )
 
 
-def extract_schema_from_collection(collection: Collection, partial: bool) -> t.Dict[str, t.Any]:
+# Number of documents extracted between progress updates.
+PROGRESS_BATCH_SIZE = 1_000
+
+
+def extract_schema_from_collection(
+    collection: Collection, partial: bool, sample_size: t.Optional[int] = None
+) -> t.Dict[str, t.Any]:
     """
     Extract a schema definition from a collection.
 
     If the extraction is partial, only the first document in the collection is
-    used to create the schema.
+    used to create the schema. If `sample_size` is given, a random sample of
+    that many documents is used.
     """
 
     schema: dict = {"count": 0, "document": {}}
+    documents: t.Iterable[t.Dict[str, t.Any]]
     if partial:
         count = 1
+        documents = collection.find(limit=1)
+    elif sample_size is not None:
+        count = min(sample_size, collection.estimated_document_count())
+        documents = collection.aggregate([{"$sample": {"size": sample_size}}])
     else:
         count = collection.estimated_document_count()
+        documents = collection.find()
     with progressbar:
-        t = progressbar.add_task(collection.name, total=count)
+        task = progressbar.add_task(collection.name, total=count)
         try:
-            for document in collection.find():
+            for document in documents:
                 schema["count"] += 1
                 schema["document"] = extract_schema_from_document(document, schema["document"])
-                progressbar.update(t, advance=1)
-                if partial:
-                    break
+                if schema["count"] % PROGRESS_BATCH_SIZE == 0:
+                    progressbar.update(task, completed=schema["count"])
         except KeyboardInterrupt:
             return schema
+        finally:
+            progressbar.update(task, completed=schema["count"])
+    return schema
+
+
+def extract_schema_from_documents(documents: t.Iterable[t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+    """
+    Extract a schema definition from a set of documents, for example a partition of a collection.
+    """
+
+    schema: dict = {"count": 0, "document": {}}
+    for document in documents:
+        schema["count"] += 1
+        schema["document"] = extract_schema_from_document(document, schema["document"])
+    return schema
+
+
+def merge_schemas(schema: dict, other: dict) -> dict:
+    """
+    Merge a schema definition into another one, and return it.
+
+    Counts are added up, and fields and types, including the schemas of nested
+    objects and arrays, are merged recursively. `other` is not modified.
+    """
+
+    for key, value in other.items():
+        if key == "count":
+            schema["count"] = schema.get("count", 0) + value
+        else:
+            # Mappings of field names or type names to nested schema definitions.
+            entries = schema.setdefault(key, {})
+            for name, entry in value.items():
+                if name in entries:
+                    merge_schemas(entries[name], entry)
+                else:
+                    entries[name] = copy.deepcopy(entry)
     return schema
 
 
+def sample_size_for(total: int, confidence: float = 0.99, margin: float = 0.01) -> int:
+    """
+    Return number of documents to sample, in order to estimate type proportions of fields.
+
+    The proportions observed within the sample are within `margin` of the
+    proportions within the whole collection of `total` documents, with the
+    given `confidence` level, using Cochran's formula with finite population
+    correction.
+    """
+
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence level must be between 0 and 1, not {confidence}")
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    size = z**2 * 0.25 / margin**2
+    return min(total, math.ceil(size / (1 + (size - 1) / max(total, 1))))
+
+
 def extract_schema_from_document(document: dict, schema: dict):
     """
     Extract and update schema definition from a given document.
@@ -179,3 +254,159 @@ TYPES_MAP = {
 
 def get_type(o):
     return TYPES_MAP.get(type(o), "UNKNOWN")
+
+
+# Map type names of MongoDB's `$type` aggregation operator to the ones of `TYPES_MAP`.
+SERVER_TYPES_MAP = {
+    "objectId": "OID",
+    "date": "DATETIME",
+    "timestamp": "TIMESTAMP",
+    "long": "INT64",
+    "string": "STRING",
+    "bool": "BOOLEAN",
+    "int": "INTEGER",
+    "double": "FLOAT",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+# Number of levels of nested objects and arrays described by server-side extraction.
+SERVER_DEPTH = 10
+
+
+def extract_schema_from_aggregation(
+    collection: Collection, pipeline: t.Optional[t.List[t.Dict[str, t.Any]]] = None, depth: int = SERVER_DEPTH
+) -> t.Dict[str, t.Any]:
+    """
+    Extract a schema definition from a collection within MongoDB, using an aggregation pipeline.
+
+    Documents are not transferred to the client. Instead, MongoDB flattens them
+    into values per path, and counts types of values per path. Only those counts
+    are returned, and assembled into a schema definition.
+
+    Documents can be selected by `pipeline`, for example using `$sample`.
+    Nested objects and arrays are described down to `depth` levels. Deeper
+    values are counted, but not described.
+    """
+
+    stages = [*(pipeline or []), *schema_pipeline(depth)]
+    return schema_from_type_counts(collection.aggregate(stages, allowDiskUse=True))
+
+
+def schema_pipeline(depth: int = SERVER_DEPTH) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Return aggregation pipeline stages counting types of values per path.
+
+    Each document is turned into a record `{p, v, i}` of the value `v` at path `p`,
+    which is a list of field names, where `None` designates array elements, and
+    its position `i` within the enclosing document. Each stage replaces records
+    of objects and arrays by records of their members, and keeps the type of
+    their own value as `t`. At last, records are grouped by path and type.
+    """
+
+    expand = {
+        "$switch": {
+            "branches": [
+                {
+                    "case": {"$eq": [{"$type": "$v"}, "object"]},
+                    "then": {
+                        "$let": {
+                            "vars": {"kv": {"$objectToArray": "$v"}},
+                            "in": {
+                                "$map": {
+                                    "input": {"$range": [0, {"$size": "$$kv"}]},
+                                    "as": "n",
+                                    "in": {
+                                        "p": {"$concatArrays": ["$p", [{"$arrayElemAt": ["$$kv.k", "$$n"]}]]},
+                                        "v": {"$arrayElemAt": ["$$kv.v", "$$n"]},
+                                        "i": "$$n",
+                                    },
+                                }
+                            },
+                        }
+                    },
+                },
+                {
+                    "case": {"$eq": [{"$type": "$v"}, "array"]},
+                    "then": {
+                        "$map": {
+                            "input": "$v",
+                            "as": "item",
+                            "in": {"p": {"$concatArrays": ["$p", [None]]}, "v": "$$item", "i": 0},
+                        }
+                    },
+                },
+            ],
+            "default": [],
+        }
+    }
+    level: t.List[t.Dict[str, t.Any]] = [
+        {
+            "$project": {
+                "r": {
+                    "$cond": [
+                        # Records of values which have already been expanded are kept as they are.
+                        {"$ne": [{"$type": "$t"}, "missing"]},
+                        ["$$ROOT"],
+                        {"$concatArrays": [[{"p": "$p", "t": {"$type": "$v"}, "i": "$i"}], expand]},
+                    ]
+                }
+            }
+        },
+        {"$unwind": "$r"},
+        {"$replaceRoot": {"newRoot": "$r"}},
+    ]
+    return [
+        {"$replaceRoot": {"newRoot": {"p": [], "v": "$$ROOT", "i": 0}}},
+        *(level * depth),
+        {
+            "$group": {
+                "_id": {"p": "$p", "t": {"$ifNull": ["$t", {"$type": "$v"}]}},
+                "count": {"$sum": 1},
+                "i": {"$min": "$i"},
+            }
+        },
+    ]
+
+
+def schema_from_type_counts(results: t.Iterable[t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+    """
+    Assemble a schema definition from counts of types per path.
+
+    Fields are ordered by their position within documents, types by their count.
+    """
+
+    schema: dict = {"count": 0, "document": {}}
+    counts: t.List[t.Tuple[t.Tuple[t.Optional[str], ...], str, int]] = []
+    positions: t.Dict[t.Tuple[t.Optional[str], ...], int] = {}
+    for result in results:
+        path = tuple(result["_id"]["p"])
+        counts.append((path, SERVER_TYPES_MAP.get(result["_id"]["t"], "UNKNOWN"), result["count"]))
+        positions[path] = min(positions.get(path, result["i"]), result["i"])
+
+    def order(item):
+        path, _, count = item
+        return [positions.get(path[: n + 1], 0) for n in range(len(path))], -count
+
+    for path, type_, count in sorted(counts, key=order):
+        if not path:
+            schema["count"] += count
+            continue
+        # Descend through the schemas of enclosing objects and arrays.
+        node = schema
+        for segment, member in zip(path, path[1:]):
+            types = node["types"] if segment is None else node["document"][segment]["types"]
+            node = types["ARRAY" if member is None else "OBJECT"]
+        if path[-1] is None:
+            types = node["types"]
+        else:
+            field = node["document"].setdefault(path[-1], {"count": 0, "types": {}})
+            field["count"] += count
+            types = field["types"]
+        entry = types.setdefault(type_, {"count": 0})
+        entry["count"] += count
+        if type_ == "OBJECT":
+            entry.setdefault("document", {})
+        elif type_ == "ARRAY":
+            entry.setdefault("types", {})
+    return schema
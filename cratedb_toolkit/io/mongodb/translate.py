@@ -35,7 +35,7 @@ from functools import reduce
 
 TYPES = {
     "DATETIME": "TIMESTAMP WITH TIME ZONE",
-    "INT64": "INTEGER",
+    "INT64": "BIGINT",
     "STRING": "TEXT",
     "BOOLEAN": "BOOLEAN",
     "INTEGER": "INTEGER",
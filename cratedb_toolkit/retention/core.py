@@ -11,7 +11,6 @@ from cratedb_toolkit.retention.store import RetentionPolicyStore
 from cratedb_toolkit.retention.strategy.delete import DeleteRetentionTask
 from cratedb_toolkit.retention.strategy.reallocate import ReallocateRetentionJob, ReallocateRetentionTask
 from cratedb_toolkit.retention.strategy.snapshot import SnapshotRetentionTask
-from cratedb_toolkit.util.database import run_sql
 
 logger = logging.getLogger(__name__)
 
@@ -69,7 +68,7 @@ class RetentionJob:
                     logger.info(f"Pretending to execute SQL statement:\n{sql}")
                     continue
                 try:
-                    run_sql(dburi=self.settings.database.dburi, sql=sql)
+                    self.store.database.run_sql(sql)
                 except Exception:
                     logger.exception(f"Data retention SQL statement failed: {sql}")
                     break
@@ -0,0 +1,419 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+"""
+Write and read tar archives as streams, compressed using zstd or multi-threaded gzip.
+
+Members are appended to the compressed stream one after another, so the archive
+is never staged as a whole. However, tar headers need to know the size of a
+member up front, so each member is buffered completely before it is appended:
+in memory up to `spool_size` bytes, and in an uncompressed temporary file
+beyond that, within the directory designated by `TMPDIR`. Writing large members
+therefore needs temporary disk space of up to their uncompressed size, for each
+member written concurrently.
+
+Multi-threaded gzip compression splits the stream into blocks, and compresses
+them into consecutive gzip members in parallel. The outcome is a regular gzip
+file, which can be decompressed by any gzip implementation.
+
+Members of archives are read without extracting them. Each member is exposed as
+a seekable file object, decompressing the archive on demand.
+"""
+
+import contextlib
+import fnmatch
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal  # type: ignore[assignment]
+
+
+Compression = Literal["gzip", "zstd"]
+
+# Map archive file name suffixes to compression methods.
+ARCHIVE_SUFFIXES: t.Dict[str, t.Optional[Compression]] = {
+    ".tar": None,
+    ".tar.gz": "gzip",
+    ".tgz": "gzip",
+    ".tar.zst": "zstd",
+    ".tzst": "zstd",
+}
+
+
+def is_archive(path: Path) -> bool:
+    """
+    Check whether the file name of `path` designates a tar archive.
+    """
+    return any(path.name.endswith(suffix) for suffix in ARCHIVE_SUFFIXES)
+
+
+def archive_compression(path: Path) -> t.Optional[Compression]:
+    """
+    Return compression method of a tar archive, derived from its file name.
+    """
+    for suffix, compression in ARCHIVE_SUFFIXES.items():
+        if path.name.endswith(suffix):
+            return compression
+    raise ValueError(f"Archive format not supported: {path.name}")
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """
+    Compress a stream into consecutive gzip members, using a pool of threads.
+
+    `zlib` releases the GIL while compressing, so blocks are compressed in parallel.
+    At most two blocks per thread are in flight, to keep memory usage bounded.
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, fileobj: t.BinaryIO, level: int = 6, threads: t.Optional[int] = None):
+        super().__init__()
+        self.fileobj = fileobj
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self.futures: t.Deque[Future] = deque()
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self.buffer += data
+        while len(self.buffer) >= self.BLOCK_SIZE:
+            self.submit(bytes(self.buffer[: self.BLOCK_SIZE]))
+            del self.buffer[: self.BLOCK_SIZE]
+        return len(data)
+
+    def submit(self, block: bytes):
+        if len(self.futures) >= 2 * self.threads:
+            self.fileobj.write(self.futures.popleft().result())
+        self.futures.append(self.executor.submit(gzip.compress, block, self.level, mtime=0))
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self.submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.futures:
+                self.fileobj.write(self.futures.popleft().result())
+        finally:
+            self.executor.shutdown()
+            super().close()
+
+
+class ArchiveWriter:
+    """
+    Write a tar archive as a stream, optionally compressed using zstd or multi-threaded gzip.
+
+    Members can be written concurrently from multiple threads. They are buffered
+    up to `spool_size` bytes in memory, and in temporary files beyond that, and
+    appended to the archive when closed.
+
+    The archive is written to a new file at `path`, or into `fileobj`, which is
+    not closed with the archive.
+    """
+
+    SPOOL_SIZE = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        compression: t.Optional[Compression] = None,
+        threads: t.Optional[int] = None,
+        spool_size: int = SPOOL_SIZE,
+        fileobj: t.Optional[t.BinaryIO] = None,
+    ):
+        self.path = path
+        self.compression = compression or archive_compression(path)
+        self.spool_size = spool_size
+        self.lock = threading.Lock()
+        self.closed = False
+        self.owns_file = fileobj is None
+        self.file = fileobj or open(path, "xb")
+        self.stream: t.BinaryIO
+        if self.compression == "zstd":
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor(threads=threads or -1)
+            self.stream = compressor.stream_writer(self.file, closefd=False)  # type: ignore[assignment]
+        elif self.compression == "gzip":
+            self.stream = ParallelGzipWriter(self.file, threads=threads)  # type: ignore[assignment]
+        else:
+            self.stream = self.file
+        self.tar = tarfile.open(fileobj=self.stream, mode="w|")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @contextlib.contextmanager
+    def open(self, name: str) -> t.Iterator[t.BinaryIO]:
+        """
+        Return a binary file object for writing an archive member, which is appended when closed.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_size) as buffer:
+            yield t.cast(t.BinaryIO, buffer)
+            self.add(name, t.cast(t.BinaryIO, buffer))
+
+    def add(self, name: str, fileobj: t.BinaryIO):
+        """
+        Append content of a seekable file object as archive member.
+        """
+        info = tarfile.TarInfo(name)
+        info.size = fileobj.seek(0, io.SEEK_END)
+        info.mtime = int(time.time())
+        fileobj.seek(0)
+        with self.lock:
+            self.tar.addfile(info, fileobj)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.tar.close()
+        finally:
+            if self.stream is not self.file:
+                self.stream.close()
+            if self.owns_file:
+                self.file.close()
+
+
+class ArchiveReader:
+    """
+    Read members of a tar archive, optionally compressed using gzip or zstd, without extracting it.
+
+    Members are indexed by scanning the archive once. Each opened member gets its
+    own decompression stream, so members can be read concurrently. Seeking within
+    a member is supported, but seeking backwards restarts decompression.
+    """
+
+    def __init__(self, path: Path, compression: t.Optional[Compression] = None):
+        self.path = path
+        self.compression = compression or archive_compression(path)
+        self.members: t.Dict[str, t.Tuple[int, int]] = {}
+        with self.open_stream() as stream, tarfile.open(fileobj=stream, mode="r|") as tar:
+            for member in tar:
+                if member.isfile():
+                    self.members[member.name] = (member.offset_data, member.size)
+
+    def open_stream(self) -> t.BinaryIO:
+        """
+        Return decompressed content of the whole archive as a seekable stream.
+        """
+        if self.compression == "zstd":
+            return t.cast(t.BinaryIO, io.BufferedReader(ZstdReader(self.path)))
+        elif self.compression == "gzip":
+            return t.cast(t.BinaryIO, gzip.open(self.path, "rb"))
+        return open(self.path, "rb")
+
+    def names(self) -> t.List[str]:
+        return list(self.members)
+
+    def size(self, name: str) -> int:
+        return self.members[name][1]
+
+    def open(self, name: str) -> t.BinaryIO:
+        """
+        Return a seekable binary file object for reading an archive member.
+        """
+        offset, size = self.members[name]
+        return t.cast(t.BinaryIO, io.BufferedReader(MemberReader(self.open_stream(), offset=offset, size=size)))
+
+    def root(self) -> "ArchivePath":
+        return ArchivePath(self)
+
+
+class ArchivePath:
+    """
+    Address members of an archive, offering the subset of `pathlib.Path` used for reading files.
+    """
+
+    def __init__(self, archive: ArchiveReader, name: str = ""):
+        self.archive = archive
+        self.path = PurePosixPath(name)
+
+    def __truediv__(self, other: str) -> "ArchivePath":
+        return ArchivePath(self.archive, str(self.path / other))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ArchivePath) and (self.archive, self.path) == (other.archive, other.path)
+
+    def __hash__(self):
+        return hash((self.archive, self.path))
+
+    def __str__(self):
+        return f"{self.archive.path}/{self.path}"
+
+    def __repr__(self):
+        return f"ArchivePath({str(self)!r})"
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def suffix(self) -> str:
+        return self.path.suffix
+
+    @property
+    def parent(self) -> "ArchivePath":
+        return ArchivePath(self.archive, str(self.path.parent))
+
+    def exists(self) -> bool:
+        name = str(self.path)
+        prefix = "" if name == "." else name + "/"
+        return name in self.archive.members or any(member.startswith(prefix) for member in self.archive.members)
+
+    def glob(self, pattern: str) -> t.Iterator["ArchivePath"]:
+        """
+        Yield members within this directory matching `pattern`, without descending into subdirectories.
+        """
+        for member in self.archive.names():
+            path = PurePosixPath(member)
+            if path.parent == self.path and fnmatch.fnmatch(path.name, pattern):
+                yield ArchivePath(self.archive, member)
+
+    def stat(self) -> os.stat_result:
+        return os.stat_result((0o100644, 0, 0, 1, 0, 0, self.archive.size(str(self.path)), 0, 0, 0))
+
+    def open(self, mode: str = "rb") -> t.BinaryIO:
+        if mode != "rb":
+            raise ValueError(f"Archive members can only be opened for reading in binary mode, not {mode!r}")
+        return self.archive.open(str(self.path))
+
+    def read_bytes(self) -> bytes:
+        with self.open() as file:
+            return file.read()
+
+    def read_text(self, encoding: str = "utf-8") -> str:
+        return self.read_bytes().decode(encoding)
+
+
+class MemberReader(io.RawIOBase):
+    """
+    Read a range of bytes of a seekable stream, i.e. a single member of a tar archive.
+    """
+
+    def __init__(self, stream: t.BinaryIO, offset: int, size: int):
+        super().__init__()
+        self.stream = stream
+        self.offset = offset
+        self.size = size
+        self.position = 0
+        self.stream.seek(offset)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), self.size - self.position)
+        if count <= 0:
+            return 0
+        data = self.stream.read(count)
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, min(offset, self.size))
+        self.stream.seek(self.offset + self.position)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+class ZstdReader(io.RawIOBase):
+    """
+    Decompress a zstd file as a seekable stream.
+
+    Seeking forwards skips decompressed data, seeking backwards restarts decompression.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self.file: t.Optional[t.BinaryIO] = None
+        self.stream: t.Any = None
+        self.position = 0
+        self.restart()
+
+    def restart(self):
+        import zstandard
+
+        self.release()
+        self.file = open(self.path, "rb")
+        self.stream = zstandard.ZstdDecompressor().stream_reader(self.file, closefd=False)
+        self.position = 0
+
+    def release(self):
+        if self.stream is not None:
+            self.stream.close()
+        if self.file is not None:
+            self.file.close()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            raise io.UnsupportedOperation("Seeking relative to the end of a zstd stream is not supported")
+        if offset < self.position:
+            self.restart()
+        while self.position < offset:
+            data = self.stream.read(min(offset - self.position, self.CHUNK_SIZE))
+            if not data:
+                break
+            self.position += len(data)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            self.release()
+        super().close()
@@ -0,0 +1,187 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+"""
+Decode responses of CrateDB's HTTP endpoint into Apache Arrow tables.
+
+Values are converted column by column, using the `col_types` information of the
+response. For example, timestamps are transferred as epoch milliseconds, and are
+reinterpreted as Arrow timestamps without converting each value individually.
+
+The type information of a response does not describe the structure of objects,
+so their types are inferred from the values of each page. In order to convert
+multiple pages consistently, an Arrow schema can be supplied, for example derived
+from `information_schema.columns` using `arrow_type_from_name`.
+
+The response body is row-major JSON, which is decoded into Python objects by the
+database driver, and transposed into columns here. Arrow's and polars' JSON
+readers can not decode it directly, because rows are arrays of mixed types.
+
+https://cratedb.com/docs/crate/reference/en/latest/interfaces/http.html#column-types
+"""
+
+import functools
+import json
+import typing as t
+
+if t.TYPE_CHECKING:
+    import pyarrow as pa
+
+
+@functools.lru_cache(maxsize=None)
+def arrow_types() -> t.Dict[int, "pa.DataType"]:
+    """
+    Map CrateDB data type identifiers to Arrow data types.
+
+    pyarrow is imported on demand, because it is an optional dependency.
+    """
+    import pyarrow as pa
+
+    return {
+        0: pa.null(),  # NULL
+        2: pa.string(),  # CHAR
+        3: pa.bool_(),  # BOOLEAN
+        4: pa.string(),  # TEXT
+        5: pa.string(),  # IP
+        6: pa.float64(),  # DOUBLE
+        7: pa.float32(),  # REAL
+        8: pa.int16(),  # SMALLINT
+        9: pa.int32(),  # INTEGER
+        10: pa.int64(),  # BIGINT
+        11: pa.timestamp("ms", tz="UTC"),  # TIMESTAMP WITH TIME ZONE
+        13: pa.list_(pa.float64()),  # GEO_POINT
+        15: pa.timestamp("ms"),  # TIMESTAMP WITHOUT TIME ZONE
+        19: pa.string(),  # REGPROC
+        23: pa.string(),  # REGCLASS
+        24: pa.date32(),  # DATE
+        25: pa.string(),  # BIT
+        27: pa.string(),  # CHARACTER
+        29: pa.string(),  # UUID
+        30: pa.string(),  # REGTYPE
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def arrow_type_names() -> t.Dict[str, "pa.DataType"]:
+    """
+    Map CrateDB data type names, as reported by `information_schema.columns`, to Arrow data types.
+    """
+    import pyarrow as pa
+
+    return {
+        "bigint": pa.int64(),
+        "bit": pa.string(),
+        "boolean": pa.bool_(),
+        "byte": pa.int8(),
+        "char": pa.string(),
+        "character": pa.string(),
+        "character varying": pa.string(),
+        "date": pa.date32(),
+        "double precision": pa.float64(),
+        "geo_point": pa.list_(pa.float64()),
+        "integer": pa.int32(),
+        "ip": pa.string(),
+        "real": pa.float32(),
+        "regclass": pa.string(),
+        "regproc": pa.string(),
+        "regtype": pa.string(),
+        "smallint": pa.int16(),
+        "text": pa.string(),
+        "timestamp with time zone": pa.timestamp("ms", tz="UTC"),
+        "timestamp without time zone": pa.timestamp("ms"),
+        "uuid": pa.string(),
+    }
+
+
+# Data type identifier of CrateDB's ARRAY type.
+ARRAY = 100
+
+# Data types transferred as epoch milliseconds.
+TEMPORAL_TYPES = [11, 15, 24]
+
+
+def arrow_from_response(response: t.Dict[str, t.Any], schema: t.Optional["pa.Schema"] = None) -> "pa.Table":
+    """
+    Convert a response of CrateDB's HTTP endpoint, requested with `?types=true`, into an Arrow table.
+
+    Types of columns present in `schema` take precedence over the type information of the response.
+    """
+    import pyarrow as pa
+
+    columns = response["cols"]
+    col_types = response.get("col_types") or [None] * len(columns)
+    rows = response["rows"]
+    arrays = [
+        arrow_array([row[index] for row in rows], col_types[index], type_=schema_type(schema, columns[index]))
+        for index in range(len(columns))
+    ]
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def arrow_array(
+    values: t.List[t.Any], col_type: t.Union[int, t.List[t.Any], None], type_: t.Optional["pa.DataType"] = None
+) -> "pa.Array":
+    """
+    Convert values of a single column into an Arrow array, using CrateDB's type information.
+
+    When `type_` is given, it is used instead of the type derived from `col_type`.
+    When values do not fit the designated type, the type is inferred from the values.
+    Container values which can not be represented uniformly are serialized to JSON.
+    """
+    import pyarrow as pa
+
+    type_ = type_ or arrow_type(col_type)
+    try:
+        if type_ is not None and isinstance(col_type, int) and col_type in TEMPORAL_TYPES:
+            timestamps = pa.array(values, type=pa.int64()).view(pa.timestamp("ms", tz=getattr(type_, "tz", None)))
+            return timestamps.cast(type_)
+        if type_ is not None:
+            return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        pass
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.array([value if value is None else json.dumps(value) for value in values], type=pa.string())
+
+
+def arrow_type(col_type: t.Union[int, t.List[t.Any], None]) -> t.Optional["pa.DataType"]:
+    """
+    Map CrateDB data type identifier to Arrow data type, or return `None` to infer it from the values.
+
+    Array types are designated by a list like `[100, <inner type>]`. Arrays of
+    temporal types are inferred, because their values are not reinterpreted.
+    """
+    import pyarrow as pa
+
+    if isinstance(col_type, list) and len(col_type) == 2 and col_type[0] == ARRAY:
+        inner = col_type[1]
+        if isinstance(inner, int) and inner in TEMPORAL_TYPES:
+            return None
+        inner_type = arrow_type(inner)
+        return inner_type and pa.list_(inner_type)
+    if isinstance(col_type, int):
+        return arrow_types().get(col_type)
+    return None
+
+
+def arrow_type_from_name(data_type: str) -> t.Optional["pa.DataType"]:
+    """
+    Map CrateDB data type name to Arrow data type, or return `None` to infer it from the values.
+
+    Array types are designated by an `_array` suffix, like `text_array`.
+    """
+    import pyarrow as pa
+
+    if data_type.endswith("_array"):
+        inner_type = arrow_type_from_name(data_type[: -len("_array")])
+        return inner_type and pa.list_(inner_type)
+    return arrow_type_names().get(data_type)
+
+
+def schema_type(schema: t.Optional["pa.Schema"], name: str) -> t.Optional["pa.DataType"]:
+    """
+    Return the type of the column `name` within `schema`, or `None`.
+    """
+    if schema is None or schema.get_field_index(name) == -1:
+        return None
+    return schema.field(name).type
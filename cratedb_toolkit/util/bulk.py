@@ -0,0 +1,153 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+"""
+Support for CrateDB bulk operations.
+
+Converge different kinds of input data, i.e. iterables of records, pandas or polars
+data frames, and pyarrow tables, into sequences of rows, and split them into batches
+bounded by number of rows and by approximate payload size.
+
+https://cratedb.com/docs/crate/reference/en/latest/interfaces/http.html#bulk-operations
+"""
+
+import dataclasses
+import itertools
+import json
+import sys
+import typing as t
+
+from cratedb_toolkit.util.sqlalchemy import CrateJsonEncoderWithNumPy, patch_encoder
+
+Row = t.Sequence[t.Any]
+
+
+@dataclasses.dataclass
+class BulkResponse:
+    """
+    Manage the per-row outcome of one or more bulk operations.
+
+    Each item of `results` is an element of the `results` array of CrateDB's bulk
+    response, i.e. `{"rowcount": 1}` on success, and `{"rowcount": -2}` on failure.
+    """
+
+    results: t.List[t.Dict[str, t.Any]] = dataclasses.field(default_factory=list)
+
+    @property
+    def record_count(self) -> int:
+        return len(self.results)
+
+    @property
+    def failed_records(self) -> t.List[int]:
+        """
+        Return indexes of rows which failed to be processed.
+        """
+        return [index for index, result in enumerate(self.results) if result.get("rowcount") == -2]
+
+    @property
+    def success_count(self) -> int:
+        return self.record_count - len(self.failed_records)
+
+    def extend(self, results: t.Union[t.List[t.Dict[str, t.Any]], None]):
+        self.results += results or []
+
+
+def rows_from_data(
+    data: t.Any, columns: t.Optional[t.List[str]] = None, chunk_size: int = 10_000
+) -> t.Tuple[t.List[str], t.Iterator[Row]]:
+    """
+    Return column names and an iterator of rows for given input data.
+
+    Supported inputs are pandas and polars data frames, pyarrow tables, iterables
+    of dictionaries, and iterables of sequences, the latter requiring `columns`.
+    Data frames and tables are converted column-wise, one chunk at a time. When
+    `columns` is given, only those columns are selected, in the given order.
+    """
+    if is_instance_of(data, "pandas", "DataFrame"):
+        if columns is not None:
+            data = data[list(columns)]
+        return list(data.columns), rows_from_pandas(data, chunk_size=chunk_size)
+    if is_instance_of(data, "polars", "DataFrame"):
+        if columns is not None:
+            data = data.select(list(columns))
+        return list(data.columns), rows_from_polars(data, chunk_size=chunk_size)
+    if is_instance_of(data, "pyarrow", "Table"):
+        if columns is not None:
+            data = data.select(list(columns))
+        return list(data.column_names), rows_from_arrow(data, chunk_size=chunk_size)
+
+    iterator = iter(data)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return list(columns or []), iter([])
+    records = itertools.chain([first], iterator)
+    if isinstance(first, t.Mapping):
+        columns = list(columns or first.keys())
+        return columns, (tuple(record.get(column) for column in columns) for record in records)
+    if columns is None:
+        raise ValueError("Inserting sequences of values needs column names")
+    return list(columns), records
+
+
+def rows_from_pandas(df, chunk_size: int) -> t.Iterator[Row]:
+    """
+    Convert pandas data frame into rows, one chunk at a time, converting `NaN` values to `None`.
+    """
+    for offset in range(0, len(df), chunk_size):
+        chunk = df.iloc[offset : offset + chunk_size]
+        yield from map(tuple, chunk.to_numpy(dtype=object, na_value=None))
+
+
+def rows_from_polars(df, chunk_size: int) -> t.Iterator[Row]:
+    """
+    Convert polars data frame into rows, one chunk at a time.
+    """
+    for chunk in df.iter_slices(n_rows=chunk_size):
+        yield from chunk.iter_rows()
+
+
+def rows_from_arrow(table, chunk_size: int) -> t.Iterator[Row]:
+    """
+    Convert pyarrow table into rows, one record batch at a time.
+    """
+    for batch in table.to_batches(max_chunksize=chunk_size):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def batched_by_size(
+    rows: t.Iterable[Row], max_rows: int, max_bytes: int, sample_size: int = 100
+) -> t.Iterator[t.List[Row]]:
+    """
+    Split rows into batches, bounded by number of rows, and by approximate payload size in bytes.
+
+    The payload size is estimated by serializing the first `sample_size` rows of each
+    batch, and extrapolating their average size to the remaining rows of the batch.
+    """
+    iterator = iter(rows)
+    while True:
+        batch: t.List[Row] = []
+        size = 0
+        size_sampled = 0
+        for row in iterator:
+            batch.append(row)
+            if len(batch) <= sample_size:
+                size += len(json.dumps(row, cls=CrateJsonEncoderWithNumPy))
+            else:
+                size += size_sampled // sample_size
+            if len(batch) == sample_size:
+                size_sampled = size
+            if len(batch) >= max_rows or size >= max_bytes:
+                break
+        if not batch:
+            return
+        yield batch
+
+
+def is_instance_of(thing: t.Any, module: str, name: str) -> bool:
+    """
+    Check whether `thing` is an instance of `module.name`, without importing the module.
+    """
+    return module in sys.modules and isinstance(thing, getattr(sys.modules[module], name))
+
+
+patch_encoder()
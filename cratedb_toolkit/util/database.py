@@ -1,25 +1,37 @@
 # Copyright (c) 2023-2024, Crate.io Inc.
 # Distributed under the terms of the AGPLv3 license, see LICENSE.
+import contextlib
+import functools
 import io
+import logging
 import os
+import threading
+import time
 import typing as t
+import uuid
 from pathlib import Path
 
 import sqlalchemy as sa
 import sqlparse
 from boltons.urlutils import URL
+from crate.client.exceptions import Error as CrateError
 from cratedb_sqlparse import sqlparse as sqlparse_cratedb
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.sql.elements import AsBoolean
 from sqlalchemy_cratedb.dialect import CrateDialect
 
+from cratedb_toolkit.util.bulk import BulkResponse, batched_by_size, rows_from_data
 from cratedb_toolkit.util.data import str_contains
+from cratedb_toolkit.util.executor import bounded_map
+from cratedb_toolkit.util.instrumentation import sql_profiler
 
 try:
     from typing import Literal
 except ImportError:
     from typing_extensions import Literal  # type: ignore[assignment]
 
+logger = logging.getLogger(__name__)
+
 
 def run_sql(dburi: str, sql: str, records: bool = False):
     return DatabaseAdapter(dburi=dburi).run_sql(sql=sql, records=records)
@@ -28,17 +40,116 @@ def run_sql(dburi: str, sql: str, records: bool = False):
 # Just an instance of the dialect used for quoting purposes.
 dialect = CrateDialect()
 
+# Compile statements using positional parameters, as expected by CrateDB's HTTP endpoint.
+dialect_qmark = CrateDialect(paramstyle="qmark")
+
+
+class EngineRegistry:
+    """
+    Manage SQLAlchemy engines process-wide, keyed by database URI and engine options.
+
+    All `DatabaseAdapter` instances addressing the same database share a single
+    engine, and with it a single connection pool, so connections are established
+    once and reused across subsystems, instead of being set up from scratch by
+    each component.
+    """
+
+    # Number of connections to keep in the SQLAlchemy connection pool, which
+    # is also used as the size of the HTTP connection pool of each connection.
+    DEFAULT_POOL_SIZE = 10
+
+    def __init__(self):
+        self.engines: t.Dict[t.Tuple, sa.engine.Engine] = {}
+        self.lock = threading.Lock()
+
+    def get(
+        self, dburi: str, echo: bool = False, pool_size: t.Optional[int] = None, keepalive: bool = True
+    ) -> sa.engine.Engine:
+        """
+        Return engine for given database URI and options, creating it on first access.
+
+        Creating an engine does not connect to the database. Connections are
+        established lazily, when they are checked out from the pool.
+        """
+        pool_size = pool_size or self.DEFAULT_POOL_SIZE
+        key = (dburi, echo, pool_size, keepalive)
+        with self.lock:
+            if key not in self.engines:
+                self.engines[key] = self.create_engine(dburi, echo=echo, pool_size=pool_size, keepalive=keepalive)
+            return self.engines[key]
+
+    @staticmethod
+    def create_engine(dburi: str, echo: bool, pool_size: int, keepalive: bool) -> sa.engine.Engine:
+        """
+        Create SQLAlchemy engine with a connection pool of the given size.
+
+        On CrateDB, the options are also propagated to the DBAPI driver, in
+        order to configure its HTTP connection pool and TCP keepalive.
+        """
+        kwargs: t.Dict[str, t.Any] = {}
+        if sa.engine.make_url(dburi).get_backend_name() == "crate":
+            kwargs["pool_size"] = pool_size
+            kwargs["max_overflow"] = pool_size
+            kwargs["connect_args"] = {"pool_size": pool_size, "socket_keepalive": keepalive}
+        return sa.create_engine(dburi, echo=echo, **kwargs)
+
+    def dispose(self):
+        """
+        Close all pooled connections, and forget about all engines.
+        """
+        with self.lock:
+            for engine in self.engines.values():
+                engine.dispose()
+            self.engines.clear()
+
+
+engine_registry = EngineRegistry()
+
 
 class DatabaseAdapter:
     """
     Wrap SQLAlchemy connection to database.
     """
 
-    def __init__(self, dburi: str, echo: bool = False):
+    # File name suffixes of compressed CSV files, which can not be partitioned by byte ranges.
+    COMPRESSION_SUFFIXES = [".bz2", ".gz", ".xz", ".zip", ".zst"]
+
+    # Approximate ratio of in-memory size of a pandas data frame to the size of its CSV representation.
+    CSV_MEMORY_FACTOR = 4
+
+    def __init__(self, dburi: str, echo: bool = False, pool_size: t.Optional[int] = None, keepalive: bool = True):
         self.dburi = dburi
-        self.engine = sa.create_engine(self.dburi, echo=echo)
-        # TODO: Make that go away.
-        self.connection = self.engine.connect()
+        self.engine = engine_registry.get(self.dburi, echo=echo, pool_size=pool_size, keepalive=keepalive)
+        self._connection: t.Optional[sa.engine.Connection] = None
+
+    @property
+    def connection(self) -> sa.engine.Connection:
+        """
+        Return a connection to the database, established on first access.
+
+        TODO: Make that go away.
+        """
+        if self._connection is None:
+            self._connection = self.engine.connect()
+        return self._connection
+
+    @contextlib.contextmanager
+    def checkout(self, begin: bool = False) -> t.Iterator[sa.engine.Connection]:
+        """
+        Check out a connection from the pool, optionally within a transaction.
+
+        When profiling, the time spent waiting for the connection is recorded,
+        which indicates contention on the connection pool.
+        """
+        start = time.perf_counter()
+        with self.engine.connect() as connection:
+            if sql_profiler.enabled:
+                sql_profiler.record_checkout(time.perf_counter() - start)
+            if begin:
+                with connection.begin():
+                    yield connection
+            else:
+                yield connection
 
     @staticmethod
     def quote_relation_name(ident: str) -> str:
@@ -84,9 +195,14 @@ class DatabaseAdapter:
         parameters: t.Mapping[str, str] = None,
         records: bool = False,
         ignore: str = None,
+        output: t.Optional[Literal["arrow", "polars"]] = None,
     ):
         """
         Run SQL statement, and return results, optionally ignoring exceptions.
+
+        By default, rows are returned as tuples, or as dictionaries when using
+        `records=True`. With `output="arrow"` or `output="polars"`, results are
+        returned as `pyarrow.Table` or `polars.DataFrame`, decoded column-wise.
         """
 
         sql_effective: str
@@ -100,6 +216,8 @@ class DatabaseAdapter:
             raise TypeError("SQL statement type must be either string, Path, or IO handle")
 
         try:
+            if output is not None:
+                return self.run_sql_columnar(sql=sql_effective, parameters=parameters, output=output)
             return self.run_sql_real(sql=sql_effective, parameters=parameters, records=records)
         except Exception as ex:
             if not ignore:
@@ -112,8 +230,8 @@ class DatabaseAdapter:
         Invoke SQL statement, and return results.
         """
         results = []
-        with self.engine.connect() as connection:
-            for statement in sqlparse.split(sql):
+        with self.checkout() as connection:
+            for statement in split_sql(sql):
                 result = connection.execute(sa.text(statement), parameters)
                 data: t.Any
                 if records:
@@ -129,6 +247,257 @@ class DatabaseAdapter:
         else:
             return results
 
+    def run_sql_columnar(
+        self, sql: str, parameters: t.Mapping[str, t.Any] = None, output: Literal["arrow", "polars"] = "arrow"
+    ):
+        """
+        Invoke SQL statement, and return results as Arrow tables or polars data frames.
+
+        On CrateDB, statements are submitted using the HTTP client of the DBAPI
+        driver, and its response is converted column-wise, using the type
+        information of the response, without creating SQLAlchemy rows, and
+        without converting values individually.
+        """
+        from cratedb_toolkit.util.arrow import arrow_from_response
+
+        if output not in ["arrow", "polars"]:
+            raise ValueError(f"Unknown output format: {output}")
+
+        results = []
+        with self.checkout() as connection:
+            for statement in split_sql(sql):
+                response = self._execute_raw(connection, statement, parameters)
+                data: t.Any = arrow_from_response(response)
+                if output == "polars":
+                    import polars as pl
+
+                    data = pl.from_arrow(data)
+                results.append(data)
+
+        # Backward-compatibility.
+        if len(results) == 1:
+            return results[0]
+        else:
+            return results
+
+    def _execute_raw(
+        self, connection: sa.engine.Connection, statement: str, parameters: t.Mapping[str, t.Any] = None
+    ) -> t.Dict[str, t.Any]:
+        """
+        Invoke a single SQL statement, and return the response like CrateDB's HTTP endpoint does.
+
+        On CrateDB, the response includes type information (`col_types`).
+        """
+        if self.engine.dialect.name != "crate":
+            result = connection.execute(sa.text(statement), parameters)
+            return {"cols": list(result.keys()), "rows": result.fetchall()}
+
+        compiled = sa.text(statement).compile(dialect=dialect_qmark)
+        args = [(parameters or {}).get(name) for name in compiled.positiontup or []]
+        client = connection.connection.dbapi_connection.client  # type: ignore[union-attr]
+        if sql_profiler.enabled:
+            # Forget the size of previous responses.
+            sql_profiler.response_size()
+        start = time.perf_counter()
+        try:
+            response = client.sql(str(compiled), args)
+        except CrateError as ex:
+            raise sa.exc.DBAPIError.instance(str(compiled), args, ex, CrateError) from ex
+        if sql_profiler.enabled:
+            sql_profiler.record(
+                str(compiled),
+                duration=time.perf_counter() - start,
+                rows=len(response.get("rows", [])),
+                size=sql_profiler.response_size(),
+            )
+        return response
+
+    def iter_sql(
+        self,
+        sql: str,
+        parameters: t.Mapping[str, t.Any] = None,
+        page_size: int = 10_000,
+        key: t.Optional[str] = None,
+        output: Literal["tuples", "dicts", "arrow"] = "tuples",
+        schema: t.Any = None,
+    ) -> t.Generator[t.Any, None, None]:
+        """
+        Invoke a single SQL query, and stream its results in pages of bounded size.
+
+        Results are fetched using a server-side cursor (`DECLARE ... CURSOR`),
+        available on CrateDB 5.1 and newer. When cursors are not supported, the
+        query is paginated by using the `key` column, which must be unique and
+        sortable (keyset pagination).
+
+        Depending on `output`, it yields individual rows as tuples or dictionaries,
+        or one `pyarrow.RecordBatch` per page. On CrateDB, record batches are
+        decoded column-wise, using the type information of the response.
+
+        The types of objects, or of any column of other databases, are inferred
+        from the values of each page. In order to get consistent schemas across
+        pages, for example when a column is NULL on a whole page, supply a
+        `pyarrow.Schema` using `schema`.
+        """
+        sql = sql.strip().rstrip(";")
+        if output == "arrow" and self.engine.dialect.name == "crate":
+            try:
+                batches = self._iter_batches_cursor(sql=sql, parameters=parameters, page_size=page_size, schema=schema)
+                batch = next(batches)
+            except StopIteration:
+                return
+            except sa.exc.DatabaseError:
+                if key is None:
+                    raise
+            else:
+                yield batch
+                yield from batches
+                return
+        try:
+            pages = self._iter_pages_cursor(sql=sql, parameters=parameters, page_size=page_size)
+            columns, rows = next(pages)
+        except sa.exc.DatabaseError:
+            if key is None:
+                raise
+            logger.info("Server-side cursors not supported, falling back to keyset pagination")
+            pages = self._iter_pages_keyset(sql=sql, parameters=parameters, page_size=page_size, key=key)
+            columns, rows = next(pages)
+
+        while True:
+            if output == "tuples":
+                yield from rows
+            elif output == "dicts":
+                for row in rows:
+                    yield dict(zip(columns, row))
+            elif output == "arrow":
+                import pyarrow as pa
+
+                from cratedb_toolkit.util.arrow import arrow_array, schema_type
+
+                if rows:
+                    arrays = [
+                        arrow_array(list(values), None, type_=schema_type(schema, name))
+                        for name, values in zip(columns, zip(*rows))
+                    ]
+                    yield pa.RecordBatch.from_arrays(arrays, names=columns)
+            else:
+                raise ValueError(f"Unknown output format: {output}")
+            try:
+                columns, rows = next(pages)
+            except StopIteration:
+                break
+
+    def _iter_pages_cursor(
+        self, sql: str, parameters: t.Mapping[str, t.Any] = None, page_size: int = 10_000
+    ) -> t.Generator[t.Tuple[t.List[str], t.Sequence[t.Any]], None, None]:
+        """
+        Yield result pages of an SQL query, using a server-side cursor.
+
+        All statements run on the same connection, because cursors are bound
+        to the database session.
+        """
+        cursor_name = f"ctk_cursor_{uuid.uuid4().hex}"
+        with self.checkout() as connection:
+            connection.execute(sa.text(f"DECLARE {cursor_name} NO SCROLL CURSOR WITH HOLD FOR {sql}"), parameters)
+            try:
+                while True:
+                    result = connection.execute(sa.text(f"FETCH FORWARD {int(page_size)} FROM {cursor_name}"))
+                    columns = list(result.keys())
+                    rows = result.fetchall()
+                    yield columns, rows
+                    if len(rows) < page_size:
+                        break
+            finally:
+                connection.execute(sa.text(f"CLOSE {cursor_name}"))
+
+    def _iter_batches_cursor(
+        self, sql: str, parameters: t.Mapping[str, t.Any] = None, page_size: int = 10_000, schema: t.Any = None
+    ) -> t.Generator[t.Any, None, None]:
+        """
+        Yield result pages of an SQL query as `pyarrow.RecordBatch`, using a server-side cursor.
+        """
+        from cratedb_toolkit.util.arrow import arrow_from_response
+
+        cursor_name = f"ctk_cursor_{uuid.uuid4().hex}"
+        with self.checkout() as connection:
+            self._execute_raw(connection, f"DECLARE {cursor_name} NO SCROLL CURSOR WITH HOLD FOR {sql}", parameters)
+            try:
+                while True:
+                    response = self._execute_raw(connection, f"FETCH FORWARD {int(page_size)} FROM {cursor_name}")
+                    if response["rows"]:
+                        yield from arrow_from_response(response, schema=schema).to_batches()
+                    if len(response["rows"]) < page_size:
+                        break
+            finally:
+                self._execute_raw(connection, f"CLOSE {cursor_name}")
+
+    def _iter_pages_keyset(
+        self, sql: str, key: str, parameters: t.Mapping[str, t.Any] = None, page_size: int = 10_000
+    ) -> t.Generator[t.Tuple[t.List[str], t.Sequence[t.Any]], None, None]:
+        """
+        Yield result pages of an SQL query, using keyset pagination on the `key` column.
+        """
+        key_quoted = dialect.identifier_preparer.quote(key)
+        sql_first = f"SELECT * FROM ({sql}) AS _ctk_page ORDER BY {key_quoted} LIMIT {int(page_size)}"  # noqa: S608
+        sql_next = (
+            f"SELECT * FROM ({sql}) AS _ctk_page "  # noqa: S608
+            f"WHERE {key_quoted} > :_ctk_last ORDER BY {key_quoted} LIMIT {int(page_size)}"
+        )
+        parameters = dict(parameters or {})
+        statement = sql_first
+        with self.checkout() as connection:
+            while True:
+                result = connection.execute(sa.text(statement), parameters)
+                columns = list(result.keys())
+                rows = result.fetchall()
+                yield columns, rows
+                if len(rows) < page_size:
+                    break
+                parameters["_ctk_last"] = rows[-1][columns.index(key)]
+                statement = sql_next
+
+    def insert_bulk(
+        self,
+        tablename: str,
+        data: t.Any,
+        columns: t.Optional[t.List[str]] = None,
+        batch_size: int = 5_000,
+        batch_bytes: int = 8 * 1024 * 1024,
+    ) -> BulkResponse:
+        """
+        Insert data into table using CrateDB's bulk operations, and return per-row results.
+
+        `data` can be an iterable of dictionaries, an iterable of sequences together
+        with `columns`, a pandas or polars data frame, or a pyarrow table. Batches are
+        bounded by number of rows (`batch_size`), and by approximate size in bytes
+        (`batch_bytes`).
+        """
+        columns, rows = rows_from_data(data, columns=columns, chunk_size=batch_size)
+        column_names = ", ".join(dialect.identifier_preparer.quote(column) for column in columns)
+        placeholders = ", ".join(["?"] * len(columns))
+        sql = f"INSERT INTO {self.quote_relation_name(tablename)} ({column_names}) VALUES ({placeholders})"  # noqa: S608
+
+        response = BulkResponse()
+        with self.checkout(begin=True) as connection:
+            cursor = connection.connection.cursor()
+            try:
+                for batch in batched_by_size(rows, max_rows=batch_size, max_bytes=batch_bytes):
+                    logger.debug(f"Inserting batch of {len(batch)} records into table {tablename}")
+                    if sql_profiler.enabled:
+                        sql_profiler.response_size()
+                    start = time.perf_counter()
+                    response.extend(cursor.executemany(sql, batch))
+                    # The DBAPI cursor bypasses SQLAlchemy's engine events, so record the operation here.
+                    if sql_profiler.enabled:
+                        sql_profiler.record(
+                            sql,
+                            duration=time.perf_counter() - start,
+                            rows=len(batch),
+                            size=sql_profiler.response_size(),
+                        )
+            finally:
+                cursor.close()
+        return response
+
     def count_records(self, name: str, errors: Literal["raise", "ignore"] = "raise"):
         """
         Return number of records in table.
@@ -301,7 +670,7 @@ class DatabaseAdapter:
             from crate.client.sqlalchemy.support import insert_bulk
 
         df = pd.read_csv(filepath)
-        with self.engine.connect() as connection:
+        with self.checkout() as connection:
             return df.to_sql(
                 tablename, connection, index=index, chunksize=chunksize, if_exists=if_exists, method=insert_bulk
             )
@@ -315,39 +684,63 @@ class DatabaseAdapter:
         if_exists="replace",
         npartitions: int = None,
         progress: bool = False,
+        blocksize: t.Optional[int] = None,
+        memory_limit: int = 1024 * 1024 * 1024,
     ):
         """
-        Import CSV data using Dask.
+        Import CSV data using Dask, within bounded memory.
+
+        The file is read lazily, partitioned by byte ranges of `blocksize` bytes, and
+        the partitions are submitted to the database using bulk operations by a fixed
+        pool of `npartitions` workers, sharing the adapter's connection pool. At most
+        one partition per worker is held in memory at any time. When `blocksize` is
+        not given, it is derived from `memory_limit`.
+
+        Compressed files can not be partitioned by byte ranges. They are read as a
+        stream, in chunks of rows sized to fit into the same memory budget.
         """
         import dask.dataframe as dd
         import pandas as pd
-
-        try:
-            from sqlalchemy_cratedb.support import insert_bulk
-        except ImportError:  # pragma: nocover
-            from crate.client.sqlalchemy.support import insert_bulk
+        from tqdm import tqdm
 
         # Set a few defaults.
-        npartitions = npartitions or os.cpu_count()
+        workers = npartitions or os.cpu_count() or 1
+        memory_per_worker = memory_limit // workers
+        blocksize = blocksize or max(memory_per_worker // self.CSV_MEMORY_FACTOR, 1024 * 1024)
+
+        # Define how to read partitions. Byte-range partitions are read within the workers.
+        partitions: t.Iterable[t.Union[pd.DataFrame, dd.DataFrame]]
+        total: t.Optional[int] = None
+        if Path(filepath).suffix in self.COMPRESSION_SUFFIXES:
+            sample = pd.read_csv(filepath, nrows=1_000)
+            row_size = max(int(sample.memory_usage(deep=True).sum() / max(len(sample), 1)), 1)
+            partitions = pd.read_csv(filepath, chunksize=max(memory_per_worker // row_size, 1))
+            meta = sample.iloc[:0]
+        else:
+            ddf = dd.read_csv(filepath, blocksize=blocksize)
+            partitions = (ddf.partitions[number] for number in range(ddf.npartitions))
+            total = ddf.npartitions
+            meta = ddf._meta
 
-        if progress:
-            from dask.diagnostics import ProgressBar
+        def load(partition: t.Union[pd.DataFrame, dd.DataFrame]) -> BulkResponse:
+            if isinstance(partition, dd.DataFrame):
+                partition = partition.compute(scheduler="synchronous")
+            if index:
+                partition = partition.reset_index()
+            return self.insert_bulk(tablename=tablename, data=partition, batch_size=chunksize)
 
-            pbar = ProgressBar()
-            pbar.register()
+        # Create database table using the schema of the CSV file.
+        if index:
+            meta = meta.reset_index()
+        meta.to_sql(tablename, self.engine, index=False, if_exists=if_exists)
 
-        # Load data into database.
-        df = pd.read_csv(filepath)
-        ddf = dd.from_pandas(df, npartitions=npartitions)
-        return ddf.to_sql(
-            tablename,
-            uri=self.dburi,
-            index=index,
-            chunksize=chunksize,
-            if_exists=if_exists,
-            method=insert_bulk,
-            parallel=True,
-        )
+        # Load data into database, keeping only a bounded number of partitions in flight.
+        failed_count = 0
+        for response in tqdm(bounded_map(load, partitions, workers=workers), total=total, disable=not progress):
+            failed_count += len(response.failed_records)
+
+        if failed_count:
+            logger.error(f"Failed to import {failed_count} records into table {tablename}")
 
 
 def sa_is_empty(thing):
@@ -385,12 +778,36 @@ def decode_database_table(url: str) -> t.Tuple[str, str]:
     return database, table
 
 
+# Number of distinct SQL texts to keep split and parsed statements for.
+SQL_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=SQL_CACHE_SIZE)
+def split_sql(sql: str) -> t.Tuple[str, ...]:
+    """
+    Split SQL text into individual statements, caching the outcome by SQL text.
+
+    When there is no semicolon other than a trailing one, the text holds a single
+    statement, so running the tokenizer is skipped.
+    """
+    sql = sql.strip()
+    semicolon = sql.find(";")
+    if semicolon == -1 or semicolon == len(sql) - 1:
+        return (sql,) if sql else ()
+    return tuple(sqlparse.split(sql))
+
+
 def get_table_names(sql: str) -> t.List[t.List[str]]:
     """
     Decode table names from SQL statements.
     """
+    return [list(names) for names in _get_table_names(sql)]
+
+
+@functools.lru_cache(maxsize=SQL_CACHE_SIZE)
+def _get_table_names(sql: str) -> t.Tuple[t.Tuple[str, ...], ...]:
     names = []
     statements = sqlparse_cratedb(sql)
     for statement in statements:
-        names.append([statement.metadata.table_name])
-    return names
+        names.append((statement.metadata.table_name,))
+    return tuple(names)
@@ -0,0 +1,206 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+"""
+Asynchronous database adapter, talking to CrateDB's HTTP endpoint.
+
+It offers the same `run_sql`, `count_records`, `table_exists`, and `refresh_table`
+methods as the synchronous `DatabaseAdapter`, but does not block the event loop,
+so many queries can be issued concurrently from a single process.
+
+https://cratedb.com/docs/crate/reference/en/latest/interfaces/http.html
+"""
+
+import asyncio
+import io
+import logging
+import typing as t
+from pathlib import Path
+
+import httpx
+import sqlalchemy as sa
+from crate.client.exceptions import ConnectionError, ProgrammingError
+
+from cratedb_toolkit.util.database import DatabaseAdapter, dialect_qmark, split_sql
+
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseAdapter:
+    """
+    Submit SQL statements to CrateDB's HTTP endpoint, using a pooled asynchronous HTTP client.
+    """
+
+    DEFAULT_POOL_SIZE = 10
+
+    def __init__(self, dburi: str, pool_size: t.Optional[int] = None, timeout: t.Optional[float] = None):
+        self.dburi = dburi
+        self.pool_size = pool_size or self.DEFAULT_POOL_SIZE
+        self.timeout = timeout
+        url = sa.engine.make_url(dburi)
+        scheme = "https" if str(url.query.get("ssl", "false")).lower() == "true" else "http"
+        self.sql_url = f"{scheme}://{url.host or 'localhost'}:{url.port or 4200}/_sql"
+        self.auth = (url.username, url.password or "") if url.username else None
+        self.headers = {}
+        schema = url.query.get("schema")
+        if schema:
+            self.headers["Default-Schema"] = str(schema)
+        self._clients: t.Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Return HTTP client for the running event loop, created on first access.
+
+        Pooled connections are bound to the event loop they have been opened on,
+        so each event loop gets its own client. Clients of event loops which have
+        been closed in the meanwhile are discarded, because their connections can
+        not be used, nor closed gracefully, from another event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            for other in [other for other in self._clients if other.is_closed()]:
+                logger.debug("Discarding HTTP client of closed event loop")
+                del self._clients[other]
+            client = self._clients[loop] = httpx.AsyncClient(
+                auth=self.auth,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=self.timeout,
+            )
+        return client
+
+    async def close(self):
+        """
+        Close all pooled connections, of the HTTP clients of all event loops.
+
+        Clients of other event loops are closed on their own loop, either by
+        submitting it to the running loop, or by running the loop in a thread.
+        """
+        running = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            if loop is running:
+                await client.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            elif not loop.is_closed():
+                await running.run_in_executor(None, loop.run_until_complete, client.aclose())
+
+    async def run_sql(
+        self,
+        sql: t.Union[str, Path, io.IOBase],
+        parameters: t.Mapping[str, t.Any] = None,
+        records: bool = False,
+        ignore: str = None,
+    ):
+        """
+        Run SQL statement, and return results, optionally ignoring exceptions.
+        """
+
+        sql_effective: str
+        if isinstance(sql, str):
+            sql_effective = sql
+        elif isinstance(sql, Path):
+            sql_effective = sql.read_text()
+        elif isinstance(sql, io.IOBase):
+            sql_effective = sql.read()
+        else:
+            raise TypeError("SQL statement type must be either string, Path, or IO handle")
+
+        try:
+            return await self.run_sql_real(sql=sql_effective, parameters=parameters, records=records)
+        except Exception as ex:
+            if not ignore:
+                raise
+            if ignore not in str(ex):
+                raise
+
+    async def run_sql_real(self, sql: str, parameters: t.Mapping[str, t.Any] = None, records: bool = False):
+        """
+        Invoke SQL statement, and return results.
+        """
+        results = []
+        for statement in split_sql(sql):
+            response = await self.execute(statement, parameters)
+            data: t.Any
+            if records:
+                data = [dict(zip(response["cols"], row)) for row in response["rows"]]
+            else:
+                data = [tuple(row) for row in response["rows"]]
+            results.append(data)
+
+        # Backward-compatibility.
+        if len(results) == 1:
+            return results[0]
+        else:
+            return results
+
+    async def execute(self, statement: str, parameters: t.Mapping[str, t.Any] = None) -> t.Dict[str, t.Any]:
+        """
+        Submit a single SQL statement, and return the decoded response of the HTTP endpoint.
+
+        Named parameters in `:name` notation are converted to positional arguments,
+        in the same way SQLAlchemy does it for the synchronous adapter.
+        """
+        compiled = sa.text(statement).compile(dialect=dialect_qmark)
+        sql = str(compiled)
+        args = [(parameters or {}).get(name) for name in compiled.positiontup or []]
+        try:
+            response = await self.client.post(self.sql_url, json={"stmt": sql, "args": args})
+        except httpx.TransportError as ex:
+            raise sa.exc.OperationalError(sql, args, ConnectionError(str(ex))) from ex
+        if response.status_code == 503:
+            raise sa.exc.OperationalError(sql, args, ConnectionError(f"503 Server Error: {response.reason_phrase}"))
+        if response.status_code >= 400:
+            try:
+                error = response.json().get("error", {})
+                message = error.get("message", "") if isinstance(error, dict) else str(error)
+            except ValueError:
+                message = f"{response.status_code} Error: {response.reason_phrase}"
+            raise sa.exc.ProgrammingError(sql, args, ProgrammingError(message))
+        return response.json()
+
+    async def count_records(self, name: str, errors: Literal["raise", "ignore"] = "raise"):
+        """
+        Return number of records in table.
+        """
+        sql = f"SELECT COUNT(*) AS count FROM {DatabaseAdapter.quote_relation_name(name)};"  # noqa: S608
+        try:
+            results = await self.run_sql(sql=sql)
+        except sa.exc.ProgrammingError as ex:
+            is_candidate = "RelationUnknown" not in str(ex)
+            if is_candidate and errors == "raise":
+                raise
+            return 0
+        return results[0][0]
+
+    async def table_exists(self, name: str) -> bool:
+        """
+        Check whether given table exists.
+        """
+        sql = f"SELECT 1 FROM {DatabaseAdapter.quote_relation_name(name)} LIMIT 1;"  # noqa: S608
+        try:
+            await self.run_sql(sql=sql)
+            return True
+        except Exception:
+            return False
+
+    async def refresh_table(self, name: str):
+        """
+        Run a `REFRESH TABLE ...` command.
+        """
+        sql = f"REFRESH TABLE {DatabaseAdapter.quote_relation_name(name)};"  # noqa: S608
+        await self.run_sql(sql=sql)
+        return True
@@ -0,0 +1,81 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+import multiprocessing
+import threading
+import typing as t
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from queue import Full, Queue
+
+T = t.TypeVar("T")
+R = t.TypeVar("R")
+
+
+def bounded_map(fn: t.Callable[[T], R], items: t.Iterable[T], workers: int, processes: bool = False) -> t.Iterator[R]:
+    """
+    Apply `fn` to all items, using a pool of worker threads, and yield results in order.
+
+    Items are consumed lazily, and at most `workers` items are in flight at any
+    time, so memory usage stays bounded even when items are produced by a stream.
+
+    CPU-bound work can use a pool of worker processes instead. Then, `fn`, items,
+    and results need to be picklable. Processes are spawned, not forked, so they
+    do not inherit threads and connections of the parent process.
+    """
+    executor: Executor
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        futures: t.Deque[Future] = deque()
+        for item in items:
+            if len(futures) >= workers:
+                yield futures.popleft().result()
+            futures.append(executor.submit(fn, item))
+        while futures:
+            yield futures.popleft().result()
+
+
+def prefetch(items: t.Iterable[T], size: int = 1) -> t.Iterator[T]:
+    """
+    Consume items on a background thread, keeping up to `size` items ahead of the consumer.
+
+    This lets producing items, for example fetching them from a database, overlap
+    with processing them. Exceptions of the producer are re-raised to the consumer.
+    """
+    queue: Queue = Queue(maxsize=size)
+    done = object()
+    stop = threading.Event()
+
+    def put(entry: t.Tuple[t.Any, t.Optional[BaseException]]) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(entry, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except Exception as ex:
+            put((done, ex))
+        else:
+            put((done, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
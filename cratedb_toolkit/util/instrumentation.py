@@ -0,0 +1,224 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+"""
+Instrument SQL statements, in order to find out where time is spent.
+
+Per-statement wall time, number of rows returned, and response payload size are
+recorded using SQLAlchemy engine events, and aggregated by statement text within
+an in-process registry. The payload size is the length of the response body of
+CrateDB's HTTP endpoint, which is taken from the HTTP client of the CrateDB
+driver, so results are not serialized again. The time spent establishing database connections, and
+waiting for checking out connections from the pool, is recorded as well.
+
+Bulk operations, which are submitted using the DBAPI cursor directly, bypass the
+engine events, so they are recorded explicitly, using `record()`.
+
+https://docs.sqlalchemy.org/en/20/faq/performance.html#query-profiling
+"""
+
+import dataclasses
+import json
+import sys
+import threading
+import time
+import typing as t
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal  # type: ignore[assignment]
+
+
+@dataclasses.dataclass
+class StatementStats:
+    """
+    Aggregated measurements of a single SQL statement.
+    """
+
+    statement: str
+    calls: int = 0
+    duration: float = 0.0
+    duration_max: float = 0.0
+    rows: int = 0
+    size: int = 0
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.duration * 1000, 3),
+            "mean_ms": round(self.duration * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.duration_max * 1000, 3),
+            "rows": self.rows,
+            "bytes": self.size,
+        }
+
+
+class SqlProfiler:
+    """
+    Record measurements of SQL statements, using SQLAlchemy engine and pool events.
+
+    Listeners are registered on the `Engine` and `Pool` classes, so they apply to
+    all engines, including those created after enabling the profiler.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.statements: t.Dict[str, StatementStats] = {}
+        self.connect_count = 0
+        self.connect_duration = 0.0
+        self.checkout_count = 0
+        self.checkout_duration = 0.0
+        self.checkout_duration_max = 0.0
+        self.local = threading.local()
+        self.request_original: t.Optional[t.Callable] = None
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.patch_client()
+        event.listen(sa.engine.Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(sa.engine.Engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(sa.engine.Engine, "do_connect", self.before_connect)
+        event.listen(sa.pool.Pool, "connect", self.after_connect)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        event.remove(sa.engine.Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(sa.engine.Engine, "after_cursor_execute", self.after_cursor_execute)
+        event.remove(sa.engine.Engine, "do_connect", self.before_connect)
+        event.remove(sa.pool.Pool, "connect", self.after_connect)
+        self.unpatch_client()
+        self.enabled = False
+
+    def patch_client(self):
+        """
+        Record the size of response bodies received by the HTTP client of the CrateDB driver, per thread.
+        """
+        import crate.client.http
+
+        request_original = crate.client.http.Client._request
+        local = self.local
+
+        def request(client, *args, **kwargs):
+            response = request_original(client, *args, **kwargs)
+            local.response_size = len(response.data or b"")
+            return response
+
+        self.request_original = request_original
+        crate.client.http.Client._request = request  # type: ignore[method-assign]
+
+    def unpatch_client(self):
+        import crate.client.http
+
+        if self.request_original is not None:
+            crate.client.http.Client._request = self.request_original  # type: ignore[method-assign]
+            self.request_original = None
+
+    def response_size(self) -> int:
+        """
+        Return the size of the last response body received by the current thread, and forget it.
+        """
+        size = getattr(self.local, "response_size", 0)
+        self.local.response_size = 0
+        return size
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.connect_count = 0
+            self.connect_duration = 0.0
+            self.checkout_count = 0
+            self.checkout_duration = 0.0
+            self.checkout_duration_max = 0.0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.local.response_size = 0
+        conn.info.setdefault("ctk_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["ctk_query_start"].pop()
+        rows = max(cursor.rowcount, 0) if not executemany else 0
+        self.record(statement, duration=duration, rows=rows, size=self.response_size())
+
+    def before_connect(self, dialect, conn_rec, cargs, cparams):
+        conn_rec.info["ctk_connect_start"] = time.perf_counter()
+
+    def after_connect(self, dbapi_connection, connection_record):
+        start = connection_record.info.pop("ctk_connect_start", None)
+        if start is None:
+            return
+        with self.lock:
+            self.connect_count += 1
+            self.connect_duration += time.perf_counter() - start
+
+    def record_checkout(self, duration: float):
+        """
+        Record time spent waiting for a connection from the pool, including establishing it.
+        """
+        with self.lock:
+            self.checkout_count += 1
+            self.checkout_duration += duration
+            self.checkout_duration_max = max(self.checkout_duration_max, duration)
+
+    def record(self, statement: str, duration: float, rows: int = 0, size: int = 0):
+        """
+        Record a single invocation of an SQL statement.
+        """
+        statement = " ".join(statement.split())
+        with self.lock:
+            stats = self.statements.setdefault(statement, StatementStats(statement=statement))
+            stats.calls += 1
+            stats.duration += duration
+            stats.duration_max = max(stats.duration_max, duration)
+            stats.rows += rows
+            stats.size += size
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        with self.lock:
+            statements = sorted(self.statements.values(), key=lambda stats: stats.duration, reverse=True)
+            return {
+                "statements": [stats.to_dict() for stats in statements],
+                "connections": {
+                    "count": self.connect_count,
+                    "total_ms": round(self.connect_duration * 1000, 3),
+                },
+                "checkouts": {
+                    "count": self.checkout_count,
+                    "total_ms": round(self.checkout_duration * 1000, 3),
+                    "max_ms": round(self.checkout_duration_max * 1000, 3),
+                },
+            }
+
+    def report(self, format_: Literal["table", "json"] = "table", file: t.Optional[t.TextIO] = None):
+        """
+        Write measurements, ordered by total time spent, to stderr by default.
+        """
+        import polars as pl
+
+        file = file or sys.stderr
+        data = self.to_dict()
+        if format_ == "json":
+            print(json.dumps(data, indent=2), file=file)
+        elif format_ == "table":
+            with pl.Config(tbl_rows=-1, fmt_str_lengths=80, tbl_hide_dataframe_shape=True):
+                print(pl.DataFrame(data["statements"]), file=file)
+            connections = data["connections"]
+            print(f"Connections: count={connections['count']}, total_ms={connections['total_ms']}", file=file)
+            checkouts = data["checkouts"]
+            print(
+                f"Checkouts: count={checkouts['count']}, "
+                f"total_ms={checkouts['total_ms']}, max_ms={checkouts['max_ms']}",
+                file=file,
+            )
+        else:
+            raise ValueError(f"Unknown report format: {format_}")
+
+
+sql_profiler = SqlProfiler()
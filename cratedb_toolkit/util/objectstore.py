@@ -0,0 +1,332 @@
+# Copyright (c) 2024, Crate.io Inc.
+# Distributed under the terms of the AGPLv3 license, see LICENSE.
+"""
+Write objects to S3-compatible object storage, or Azure Blob Storage, as streams.
+
+Content is split into parts, which are uploaded concurrently using a pool of
+threads, as soon as they are complete. No local copy of the content is needed
+on disk, and the number of parts held in memory is bounded by the number of
+threads.
+
+Objects smaller than a single part are uploaded using a single request.
+
+Uploads to S3 drive multipart uploads using the lower-level methods of the MinIO
+client, because its `put_object` API does not bound the parts queued in memory.
+Uploads to Azure Blob Storage stage and commit blocks.
+
+- https://docs.aws.amazon.com/AmazonS3/latest/userguide/mpuoverview.html
+- https://learn.microsoft.com/en-us/rest/api/storageservices/put-block-list
+"""
+
+import abc
+import contextlib
+import io
+import os
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from boltons.urlutils import URL
+
+# URL schemes of supported object stores.
+OBJECT_STORE_SCHEMES = ["s3", "az"]
+
+
+def is_object_store_url(url: str) -> bool:
+    """
+    Check whether `url` addresses an object store, like `s3://bucket/prefix`.
+    """
+    return URL(url).scheme in OBJECT_STORE_SCHEMES
+
+
+class ObjectWriter(io.RawIOBase):
+    """
+    Upload a stream as an object.
+
+    The upload is completed when the writer is closed. When writing fails,
+    call `abort()` instead, in order to discard the parts uploaded so far.
+    """
+
+    def writable(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def abort(self):
+        """
+        Discard the upload, without creating the object.
+        """
+        raise NotImplementedError()
+
+
+class MultipartWriter(ObjectWriter):
+    """
+    Upload a stream as an object, in parts, using a pool of threads.
+
+    At most two parts per thread are held in memory.
+    """
+
+    # S3 needs parts of at least 5 MiB, except the last one.
+    PART_SIZE = 8 * 1024 * 1024
+    THREADS = 4
+
+    def __init__(self, part_size: t.Optional[int] = None, threads: t.Optional[int] = None):
+        super().__init__()
+        self.part_size = part_size or self.PART_SIZE
+        self.threads = threads or self.THREADS
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self.parts: t.List[Future] = []
+        self.pending: t.Deque[Future] = deque()
+        self.buffer = bytearray()
+        self.started = False
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self.submit(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+        return len(data)
+
+    def submit(self, data: bytes):
+        if not self.started:
+            self.begin_upload()
+            self.started = True
+        if len(self.pending) >= 2 * self.threads:
+            self.pending.popleft().result()
+        future = self.executor.submit(self.upload_part, len(self.parts) + 1, data)
+        self.parts.append(future)
+        self.pending.append(future)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if not self.started:
+                self.upload_object(bytes(self.buffer))
+            else:
+                if self.buffer:
+                    self.submit(bytes(self.buffer))
+                self.complete_upload([future.result() for future in self.parts])
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self.buffer.clear()
+            self.executor.shutdown()
+            super().close()
+
+    def abort(self):
+        if self.closed:
+            return
+        for future in self.parts:
+            future.cancel()
+        self.executor.shutdown()
+        try:
+            if self.started:
+                self.abort_upload()
+        finally:
+            self.buffer.clear()
+            super().close()
+
+    @abc.abstractmethod
+    def begin_upload(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def upload_part(self, number: int, data: bytes) -> t.Any:
+        """
+        Upload a single part, and return the reference needed for completing the upload.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def complete_upload(self, parts: t.List[t.Any]):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def abort_upload(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def upload_object(self, data: bytes):
+        """
+        Upload the whole object using a single request.
+        """
+        raise NotImplementedError()
+
+
+class S3MultipartWriter(MultipartWriter):
+    """
+    Upload an object to S3-compatible object storage, using a multipart upload.
+
+    The public `put_object` API of the MinIO client queues parts of content with
+    unknown length without bounds, while uploading them in parallel. In order to
+    bound the parts held in memory, the multipart upload is driven here, using the
+    lower-level methods of the client, which are covered by the version range of
+    the `minio` dependency.
+    """
+
+    def __init__(self, client, bucket: str, key: str, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id: t.Optional[str] = None
+
+    def begin_upload(self):
+        self.upload_id = self.client._create_multipart_upload(self.bucket, self.key, self.headers())
+
+    def upload_part(self, number: int, data: bytes):
+        from minio.datatypes import Part
+
+        etag = self.client._upload_part(self.bucket, self.key, data, None, self.upload_id, number)
+        return Part(number, etag)
+
+    def complete_upload(self, parts: t.List[t.Any]):
+        self.client._complete_multipart_upload(self.bucket, self.key, self.upload_id, parts)
+
+    def abort_upload(self):
+        self.client._abort_multipart_upload(self.bucket, self.key, self.upload_id)
+
+    def upload_object(self, data: bytes):
+        self.client.put_object(self.bucket, self.key, io.BytesIO(data), len(data))
+
+    @staticmethod
+    def headers() -> t.Dict[str, str]:
+        return {"Content-Type": "application/octet-stream"}
+
+
+class AzureBlockWriter(MultipartWriter):
+    """
+    Upload a block blob to Azure Blob Storage, staging blocks, and committing them at once.
+
+    Uncommitted blocks of aborted uploads are discarded by the service.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    def begin_upload(self):
+        pass
+
+    def upload_part(self, number: int, data: bytes):
+        from azure.storage.blob import BlobBlock
+
+        # All block identifiers of a blob need to have the same length.
+        block_id = f"{number:08d}"
+        self.client.stage_block(block_id, data, length=len(data))
+        return BlobBlock(block_id)
+
+    def complete_upload(self, parts: t.List[t.Any]):
+        self.client.commit_block_list(parts)
+
+    def abort_upload(self):
+        pass
+
+    def upload_object(self, data: bytes):
+        self.client.upload_blob(data, length=len(data), overwrite=True)
+
+
+class ObjectStore(abc.ABC):
+    """
+    Write objects into a bucket or container of an object store, below a common prefix.
+    """
+
+    def __init__(self, url: str):
+        self.url = URL(url)
+        self.bucket = self.url.host
+        if not self.bucket:
+            raise ValueError(f"Object store URL lacks bucket or container name: {url}")
+        self.prefix = self.url.path.strip("/")
+
+    @classmethod
+    def from_url(cls, url: str) -> "ObjectStore":
+        """
+        Return object store matching the scheme of the URL, i.e. `s3://` or `az://`.
+        """
+        scheme = URL(url).scheme
+        if scheme == "s3":
+            return S3ObjectStore(url)
+        if scheme == "az":
+            return AzureObjectStore(url)
+        raise ValueError(f"Object store not supported: {scheme}")
+
+    def location(self, key: t.Union[str, PurePosixPath]) -> str:
+        """
+        Return URL of an object, without query parameters and credentials.
+        """
+        return f"{self.url.scheme}://{self.bucket}/{PurePosixPath(key).as_posix()}"
+
+    @contextlib.contextmanager
+    def open(self, key: t.Union[str, PurePosixPath]) -> t.Iterator[t.BinaryIO]:
+        """
+        Return a binary file object for writing an object, which is completed when closed.
+
+        When an exception is raised while writing, the upload is aborted.
+        """
+        writer = self.writer(PurePosixPath(key).as_posix())
+        try:
+            yield t.cast(t.BinaryIO, writer)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+    @abc.abstractmethod
+    def writer(self, key: str) -> ObjectWriter:
+        raise NotImplementedError()
+
+
+class S3ObjectStore(ObjectStore):
+    """
+    Write objects to S3-compatible object storage, addressed by `s3://[key:secret@]bucket/prefix`.
+
+    The endpoint defaults to AWS S3. Use the `endpoint` query parameter, or the
+    `AWS_ENDPOINT_URL` environment variable, for other services, for example
+    `s3://bucket/prefix?endpoint=http://localhost:9000`. Credentials are read
+    from the URL, or from the `AWS_ACCESS_KEY_ID` and `AWS_SECRET_ACCESS_KEY`
+    environment variables.
+    """
+
+    def __init__(self, url: str):
+        super().__init__(url)
+        from minio import Minio
+
+        options = self.url.query_params
+        endpoint_url = options.get("endpoint") or os.environ.get("AWS_ENDPOINT_URL") or "s3.amazonaws.com"
+        if "://" not in endpoint_url:
+            endpoint_url = f"https://{endpoint_url}"
+        endpoint = URL(endpoint_url)
+        self.client = Minio(
+            f"{endpoint.host}:{endpoint.port}" if endpoint.port else endpoint.host,
+            access_key=self.url.username or os.environ.get("AWS_ACCESS_KEY_ID"),
+            secret_key=self.url.password or os.environ.get("AWS_SECRET_ACCESS_KEY"),
+            session_token=os.environ.get("AWS_SESSION_TOKEN"),
+            secure=endpoint.scheme == "https",
+            region=options.get("region") or os.environ.get("AWS_REGION"),
+        )
+
+    def writer(self, key: str) -> ObjectWriter:
+        return S3MultipartWriter(self.client, bucket=self.bucket, key=key)
+
+
+class AzureObjectStore(ObjectStore):
+    """
+    Write blobs to Azure Blob Storage, addressed by `az://container/prefix`.
+
+    The storage account is defined by the `AZURE_STORAGE_CONNECTION_STRING`
+    environment variable.
+    """
+
+    def __init__(self, url: str):
+        super().__init__(url)
+        from azure.storage.blob import ContainerClient
+
+        connection_string = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
+        if not connection_string:
+            raise ValueError("Writing to Azure Blob Storage needs AZURE_STORAGE_CONNECTION_STRING")
+        self.client = ContainerClient.from_connection_string(connection_string, container_name=self.bucket)
+
+    def writer(self, key: str) -> ObjectWriter:
+        return AzureBlockWriter(self.client.get_blob_client(key))
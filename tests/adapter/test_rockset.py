@@ -67,6 +67,36 @@ def test_rockset_add_documents(cratedb, mocker):
     # TODO: Query back data from database, and verify it.
 
 
+def test_rockset_add_documents_threadpool(mocker):
+    """
+    Verify documents are inserted on a worker thread, without blocking the event loop.
+    """
+    import asyncio
+
+    from cratedb_toolkit.adapter.rockset.server.api import document
+    from cratedb_toolkit.adapter.rockset.server.dependencies import database_adapter
+
+    def insert_documents_blocking(*args):
+        # Worker threads do not run an event loop.
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+
+    insert_documents = mocker.patch.object(document, "insert_documents", side_effect=insert_documents_blocking)
+    app.dependency_overrides[database_adapter] = lambda: "adapter"
+    try:
+        with TestClient(app) as http_client:
+            response = http_client.post(
+                "/v1/orgs/self/ws/testdrive/collections/foobar/docs",
+                json={"data": [{"id": "foo", "field": "value"}]},
+            )
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    (cratedb, workspace, collection, data), _ = insert_documents.call_args
+    assert (cratedb, workspace, collection) == ("adapter", "testdrive", "foobar")
+    assert data.to_dict(orient="records") == [{"id": "foo", "field": "value"}]
+
+
 def test_rockset_query(cratedb, mocker):
     """
     Verify querying documents.
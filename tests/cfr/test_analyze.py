@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from cratedb_toolkit.cfr.analyze import ExportAnalyzer, ExportBundle
+from cratedb_toolkit.cfr.cli import cli
+from cratedb_toolkit.cfr.systable import ExportManifest
+
+
+def write_export(path: Path, tables: dict) -> Path:
+    (path / "schema").mkdir(parents=True)
+    (path / "data").mkdir(parents=True)
+    for tablename, records in tables.items():
+        (path / "schema" / f"sys-{tablename}.sql").write_text("CREATE TABLE foo;")
+        with open(path / "data" / f"sys-{tablename}.jsonl", "w") as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+    return path
+
+
+def job(id_: int, stmt: str, duration: int, username: str = "crate"):
+    return {
+        "id": str(id_),
+        "stmt": stmt,
+        "started": f"2024-01-01T00:00:{id_:02d}+00:00",
+        "ended": f"2024-01-01T00:00:{id_:02d}.{duration:03d}+00:00",
+        "username": username,
+    }
+
+
+@pytest.fixture
+def export(tmp_path) -> Path:
+    return write_export(
+        tmp_path / "sys",
+        {
+            "cluster": [{"name": "testdrive"}],
+            "nodes": [{"hostname": "node-b"}, {"hostname": "node-a"}],
+            "shards": [
+                {
+                    "id": 0,
+                    "primary": True,
+                    "node": {"name": "node-a"},
+                    "seq_no_stats": {"local_checkpoint": 5, "global_checkpoint": 3},
+                },
+                {
+                    "id": 1,
+                    "primary": True,
+                    "node": {"name": "node-b"},
+                    "seq_no_stats": {"local_checkpoint": 2, "global_checkpoint": 2},
+                },
+                {
+                    "id": 0,
+                    "primary": False,
+                    "node": {"name": "node-b"},
+                    "seq_no_stats": {"local_checkpoint": 5, "global_checkpoint": 5},
+                },
+            ],
+            "jobs_log": [
+                job(1, "SELECT 1", 100),
+                job(2, "SELECT 1", 300),
+                job(3, "CREATE SNAPSHOT foo", 500, username="admin"),
+            ],
+        },
+    )
+
+
+def test_analyze_export(export):
+    """
+    Verify diagnostics are evaluated on exported system tables.
+    """
+    data = ExportAnalyzer(ExportBundle(export)).render()
+    assert data["cluster_name"] == "testdrive"
+    assert data["cluster_nodes_count"] == 2
+    assert [node["hostname"] for node in data["cluster_nodes_list"]] == ["node-a", "node-b"]
+    assert data["node_shard_distribution"] == [
+        {"node_name": "node-a", "num_shards": 1},
+        {"node_name": "node-b", "num_shards": 1},
+    ]
+    assert data["max_checkpoint_delta"] == 2
+    assert data["shard_total_count"] == 3
+    assert data["history_count"] == 3
+    assert data["by_user"] == [{"username": "crate", "count": 2}, {"username": "admin", "count": 1}]
+    assert data["top100_count"][0] == {
+        "stmt": "SELECT 1",
+        "stmt_count": 2,
+        "max_duration": 300,
+        "min_duration": 100,
+        "avg_duration": 200.0,
+        "p90": 300.0,
+    }
+    assert [item["stmt"] for item in data["history"]] == ["SELECT 1", "SELECT 1"]
+
+    # Tables not included in the export yield no results.
+    assert data["shard_not_started_count"] is None
+    assert data["running_count"] is None
+
+
+def test_analyze_chain(tmp_path):
+    """
+    Verify append-only tables are combined from a chain of incremental exports.
+    """
+    write_export(tmp_path / "first" / "sys", {"jobs_log": [job(1, "SELECT 1", 100)], "nodes": [{"hostname": "a"}]})
+    write_export(tmp_path / "second" / "sys", {"jobs_log": [job(2, "SELECT 2", 200)], "nodes": [{"hostname": "b"}]})
+    ExportManifest(exports=["first/sys", "second/sys"]).save(tmp_path)
+    data = ExportAnalyzer(ExportBundle(tmp_path)).render()
+    assert data["history_count"] == 2
+    assert data["cluster_nodes_count"] == 1
+
+
+def test_analyze_cli(export):
+    """
+    Verify `ctk cfr analyze` works without a database.
+    """
+    runner = CliRunner(env={"CRATEDB_SQLALCHEMY_URL": ""})
+    result = runner.invoke(cli, args=f"analyze {export}", catch_exceptions=False)
+    assert result.exit_code == 0
+    data = json.loads(result.output)
+    assert data["meta"]["source"] == str(export)
+    assert data["data"]["cluster_name"] == "testdrive"
@@ -0,0 +1,594 @@
+import io
+import tarfile
+import threading
+import time
+
+import pytest
+
+from cratedb_toolkit.cfr import systable
+from cratedb_toolkit.cfr.systable import (
+    ExportManifest,
+    SystemTableExporter,
+    SystemTableImporter,
+    SystemTableInspector,
+    csv_frame,
+)
+from cratedb_toolkit.exception import OperationFailed
+
+
+@pytest.fixture
+def exporter(mocker, tmp_path):
+    mocker.patch("cratedb_toolkit.cfr.systable.SystemTableInspector")
+    mocker.patch("cratedb_toolkit.cfr.systable.InfoContainer")
+    exporter = SystemTableExporter(dburi="crate://localhost:4200/", target=tmp_path)
+    exporter.info.cluster_name = "testdrive"
+    exporter.inspector.table_names.return_value = ["shards", "jobs_log", "summits", "cluster", "nodes"]
+    return exporter
+
+
+def test_export_concurrent(exporter, mocker, caplog):
+    """
+    Verify system tables are exported concurrently, and failures are reported after all tables are processed.
+
+    Files of failing tables are discarded, and the export fails, because it is incomplete.
+    """
+    active = []
+    active_max = []
+    lock = threading.Lock()
+
+    def save_table(tablename, path_schema, path_data):
+        with lock:
+            active.append(tablename)
+            active_max.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.remove(tablename)
+        (path_schema / f"sys-{tablename}.sql").write_text("CREATE TABLE foo;")
+        if tablename == "jobs_log":
+            raise ValueError("Something failed")
+        return tablename != "nodes"
+
+    save_table_mock = mocker.patch.object(exporter, "save_table", side_effect=save_table)
+    with pytest.raises(OperationFailed) as ex:
+        exporter.save()
+    assert ex.match("Export is incomplete: .+ Failed to export 1 system tables: jobs_log")
+
+    [path_schema] = (exporter.path / "testdrive").glob("*/sys/schema")
+    assert sorted(item.name for item in path_schema.iterdir()) == [
+        "sys-cluster.sql",
+        "sys-nodes.sql",
+        "sys-shards.sql",
+        "sys-summits.sql",
+    ]
+    assert sorted(call.args[0] for call in save_table_mock.call_args_list) == [
+        "cluster",
+        "jobs_log",
+        "nodes",
+        "shards",
+        "summits",
+    ]
+    assert max(active_max) > 1
+    assert "Exporting table failed: jobs_log. Reason: Something failed" in caplog.text
+    assert "Failed to export 1 system tables: jobs_log" in caplog.text
+    assert "Successfully exported 3 system tables" in caplog.text
+
+
+def test_export_all_failed(exporter, mocker):
+    """
+    Verify the export fails when no table could be exported.
+    """
+    mocker.patch.object(exporter, "save_table", side_effect=ValueError("Connection refused"))
+    with pytest.raises(ValueError) as ex:
+        exporter.save()
+    assert ex.match("Connection refused")
+
+
+@pytest.mark.parametrize("data_format", ["csv", "jsonl", "parquet"])
+def test_dump_batches(exporter, tmp_path, data_format):
+    """
+    Verify record batches are written one at a time, and read back completely.
+    """
+    pa = pytest.importorskip("pyarrow")
+    import polars as pl
+
+    exporter.data_format = data_format
+    batches = [
+        pa.RecordBatch.from_pydict({"id": [1, 2], "data": [{"a": 1}, {"a": 2}]}),
+        pa.RecordBatch.from_pydict({"id": [], "data": []}),
+        pa.RecordBatch.from_pydict({"id": [3], "data": [{"a": 3}]}),
+    ]
+    path = tmp_path / f"sys-foo.{data_format}"
+    assert exporter.dump_batches(batches, path) == 3
+
+    if data_format == "csv":
+        frame = pl.read_csv(path)
+        assert frame.columns == ["id", "data"]
+        assert frame["data"].to_list() == ['{"a":1}', '{"a":2}', '{"a":3}']
+    elif data_format == "jsonl":
+        frame = pl.read_ndjson(path)
+        assert frame["data"].to_list() == [{"a": 1}, {"a": 2}, {"a": 3}]
+    else:
+        import pyarrow.parquet as pq
+
+        assert pq.ParquetFile(path).num_row_groups == 2
+        frame = pl.read_parquet(path)
+    assert frame["id"].to_list() == [1, 2, 3]
+
+
+def test_csv_frame():
+    """
+    Verify nested columns are encoded as JSON strings, retaining null values.
+    """
+    import polars as pl
+
+    frame = pl.DataFrame(
+        {
+            "id": [1, 2],
+            "data": [{"a": 1, "b": "x"}, {"a": 2, "b": None}],
+            "tags": [["foo", "bar"], None],
+            "items": [[{"a": 1}], []],
+        }
+    )
+    encoded = csv_frame(frame)
+    assert encoded["id"].to_list() == [1, 2]
+    assert encoded["data"].to_list() == ['{"a":1,"b":"x"}', '{"a":2,"b":null}']
+    assert encoded["tags"].to_list() == ['["foo","bar"]', None]
+    assert encoded["items"].to_list() == ['[{"a":1}]', "[]"]
+
+
+def test_csv_round_trip(exporter, mocker, tmp_path):
+    """
+    Verify nested columns exported to CSV are imported as objects and arrays again, in blocks of bounded size.
+    """
+    import datetime as dt
+
+    pa = pytest.importorskip("pyarrow")
+    from cratedb_toolkit.cfr.systable import ExportSettings
+    from cratedb_toolkit.util.bulk import BulkResponse, rows_from_data
+
+    ended = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+    records = [
+        {"id": 1, "node": {"id": "a", "name": "x"}, "tags": ["foo", "bar"], "items": [{"a": 1}], "stmt": "SELECT\n1"},
+        {"id": 2, "node": {"id": "b", "name": None}, "tags": None, "items": [], "stmt": 'SELECT "a,b"'},
+        {"id": 3, "node": None, "tags": [], "items": None, "stmt": ""},
+    ] * 20
+    schema = pa.schema(
+        [
+            ("id", pa.int32()),
+            ("ended", pa.timestamp("ms", tz="UTC")),
+            ("node", pa.struct([("id", pa.string()), ("name", pa.string())])),
+            ("tags", pa.list_(pa.string())),
+            ("items", pa.list_(pa.struct([("a", pa.int64())]))),
+            ("stmt", pa.string()),
+        ]
+    )
+    records = [{**record, "ended": ended} for record in records]
+    exporter.data_format = "csv"
+    (tmp_path / "schema").mkdir()
+    (tmp_path / "data").mkdir()
+    (tmp_path / "schema" / "sys-jobs_log.sql").write_text("CREATE TABLE foo;")
+    exporter.dump_batches([pa.RecordBatch.from_pylist(records, schema=schema)], tmp_path / "data" / "sys-jobs_log.csv")
+
+    def run_sql(sql, parameters=None):
+        if "information_schema.columns" in sql:
+            assert parameters == {"name": "sys-jobs_log"}
+            return [
+                ("id", "integer"),
+                ("ended", "timestamp with time zone"),
+                ("node", "object"),
+                ("node['id']", "text"),
+                ("node['name']", "text"),
+                ("tags", "text_array"),
+                ("items", "object_array"),
+                ("stmt", "text"),
+            ]
+        return None
+
+    batches = []
+
+    def insert_bulk(tablename, data, **kwargs):
+        columns, rows = rows_from_data(data)
+        batches.append([dict(zip(columns, row)) for row in rows])
+        return BulkResponse(results=[{"rowcount": 1}] * len(data))
+
+    importer = SystemTableImporter(dburi="crate://localhost:4200/", source=tmp_path, data_format="csv")
+    mocker.patch.object(importer.adapter, "run_sql", side_effect=run_sql)
+    mocker.patch.object(importer.adapter, "insert_bulk", side_effect=insert_bulk)
+    mocker.patch.object(ExportSettings, "CSV_BLOCK_SIZE", 1024)
+    importer.load()
+    assert len(batches) > 1
+    assert [record for batch in batches for record in batch] == records
+
+
+def test_dump_batches_empty(exporter, tmp_path):
+    path = tmp_path / "sys-foo.jsonl"
+    assert exporter.dump_batches([], path) == 0
+    assert not path.exists()
+
+
+def test_save_table_streaming(exporter, mocker, tmp_path):
+    """
+    Verify tables are read in batches, and written to disk.
+    """
+    pa = pytest.importorskip("pyarrow")
+    batches = [pa.RecordBatch.from_pydict({"id": [1, 2]}), pa.RecordBatch.from_pydict({"id": [3]})]
+    mocker.patch.object(exporter, "read_table_batches", return_value=iter(batches))
+    read_table = mocker.patch.object(exporter, "read_table")
+    exporter.inspector.ddl.return_value = "CREATE TABLE foo;"
+    assert exporter.save_table("foo", path_schema=tmp_path, path_data=tmp_path) is True
+    assert (tmp_path / "sys-foo.jsonl").read_text() == '{"id":1}\n{"id":2}\n{"id":3}\n'
+    read_table.assert_not_called()
+
+
+def test_export_incremental(exporter, mocker):
+    """
+    Verify incremental exports only read records of append-only tables beyond their high-water marks.
+    """
+    pa = pytest.importorskip("pyarrow")
+    exporter.incremental = True
+    exporter.inspector.table_names.return_value = ["jobs_log", "nodes"]
+    exporter.inspector.ddl.return_value = "CREATE TABLE foo;"
+
+    def iter_sql(sql, parameters=None, **kwargs):
+        if "jobs_log" in sql:
+            ended = pa.array([1_000, 3_000, 2_000], type=pa.int64()).view(pa.timestamp("ms", tz="UTC"))
+            yield pa.RecordBatch.from_arrays([pa.array([1, 2, 3]), ended], names=["id", "ended"])
+        else:
+            yield pa.RecordBatch.from_pydict({"id": [1]})
+
+    iter_sql_mock = mocker.patch.object(exporter.adapter, "iter_sql", side_effect=iter_sql)
+
+    mocker.patch("cratedb_toolkit.cfr.systable.dt.datetime", **{"now.return_value.strftime.return_value": "first"})
+    path = exporter.save()
+    assert (path / "data" / "sys-jobs_log.jsonl").exists()
+    manifest = ExportManifest.load(exporter.path / "testdrive")
+    assert manifest.exports == ["first/sys"]
+    assert manifest.watermarks == {"jobs_log": 3_000}
+    assert all("WHERE" not in call.args[0] for call in iter_sql_mock.call_args_list)
+
+    iter_sql_mock.reset_mock()
+    mocker.patch("cratedb_toolkit.cfr.systable.dt.datetime", **{"now.return_value.strftime.return_value": "second"})
+    exporter.save()
+    calls = {call.args[0]: call.kwargs["parameters"] for call in iter_sql_mock.call_args_list}
+    assert calls == {
+        'SELECT * FROM "sys"."jobs_log" WHERE "ended" > :watermark': {"watermark": 3_000},
+        'SELECT * FROM "sys"."nodes"': {},
+    }
+    assert ExportManifest.load(exporter.path / "testdrive").exports == ["first/sys", "second/sys"]
+
+
+def test_export_incremental_failure(exporter, mocker):
+    """
+    Verify tables failing an incremental export are marked in the manifest, and keep their high-water marks.
+    """
+    exporter.incremental = True
+    exporter.watermarks = {}
+    exporter.inspector.table_names.return_value = ["jobs_log", "nodes"]
+    (exporter.path / "testdrive").mkdir(parents=True)
+    ExportManifest(exports=["first/sys"], watermarks={"jobs_log": 42}).save(exporter.path / "testdrive")
+
+    def save_table(tablename, path_schema, path_data):
+        if tablename == "jobs_log":
+            raise ValueError("Something failed")
+        return True
+
+    mocker.patch.object(exporter, "save_table", side_effect=save_table)
+    mocker.patch("cratedb_toolkit.cfr.systable.dt.datetime", **{"now.return_value.strftime.return_value": "second"})
+    with pytest.raises(OperationFailed):
+        exporter.save()
+    manifest = ExportManifest.load(exporter.path / "testdrive")
+    assert manifest.exports == ["first/sys", "second/sys"]
+    assert manifest.watermarks == {"jobs_log": 42}
+    assert manifest.failed == {"second/sys": ["jobs_log"]}
+
+
+def test_import_chain(mocker, tmp_path):
+    """
+    Verify a chain of incremental exports is replayed in order.
+    """
+    for export in ["first/sys", "second/sys"]:
+        (tmp_path / export / "schema").mkdir(parents=True)
+        for tablename in ["jobs_log", "nodes"]:
+            (tmp_path / export / "schema" / f"sys-{tablename}.sql").write_text("CREATE TABLE foo;")
+    ExportManifest(exports=["first/sys", "second/sys"], watermarks={"jobs_log": 42}).save(tmp_path)
+
+    importer = SystemTableImporter(dburi="crate://localhost:4200/", source=tmp_path)
+    load_export = mocker.patch.object(importer, "load_export", return_value={"jobs_log"})
+    importer.load()
+    assert [(call.args[0], sorted(call.kwargs["tablenames"])) for call in load_export.call_args_list] == [
+        (tmp_path / "first/sys", ["jobs_log"]),
+        (tmp_path / "second/sys", ["jobs_log", "nodes"]),
+    ]
+
+
+def test_import_chain_failed(mocker, tmp_path):
+    """
+    Verify tables marked as failed in the manifest are not imported from that export.
+    """
+    for export in ["first/sys", "second/sys"]:
+        (tmp_path / export / "schema").mkdir(parents=True)
+        for tablename in ["jobs_log", "nodes"]:
+            (tmp_path / export / "schema" / f"sys-{tablename}.sql").write_text("CREATE TABLE foo;")
+    ExportManifest(exports=["first/sys", "second/sys"], failed={"second/sys": ["jobs_log", "nodes"]}).save(tmp_path)
+
+    importer = SystemTableImporter(dburi="crate://localhost:4200/", source=tmp_path)
+    load_export = mocker.patch.object(importer, "load_export", return_value={"jobs_log"})
+    importer.load()
+    assert [(call.args[0], sorted(call.kwargs["tablenames"])) for call in load_export.call_args_list] == [
+        (tmp_path / "first/sys", ["jobs_log", "nodes"]),
+        (tmp_path / "second/sys", []),
+    ]
+
+
+def test_import_concurrent(mocker, tmp_path, caplog):
+    """
+    Verify tables are loaded concurrently using bulk operations, and failures are reported separately.
+    """
+    from cratedb_toolkit.util.bulk import BulkResponse
+
+    (tmp_path / "schema").mkdir()
+    (tmp_path / "data").mkdir()
+    for tablename in ["cluster", "jobs_log", "nodes", "shards"]:
+        (tmp_path / "schema" / f"sys-{tablename}.sql").write_text("CREATE TABLE foo;")
+        (tmp_path / "data" / f"sys-{tablename}.jsonl").write_text('{"id":1}\n{"id":2}\n')
+    (tmp_path / "data" / "sys-shards.jsonl").write_text("")
+
+    active = []
+    active_max = []
+    lock = threading.Lock()
+
+    def insert_bulk(tablename, data, **kwargs):
+        with lock:
+            active.append(tablename)
+            active_max.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.remove(tablename)
+        if tablename == "sys-jobs_log":
+            raise ValueError("Something failed")
+        return BulkResponse(results=[{"rowcount": 1}] * len(data))
+
+    importer = SystemTableImporter(dburi="crate://localhost:4200/", source=tmp_path)
+    mocker.patch.object(importer.adapter, "run_sql")
+    insert_bulk_mock = mocker.patch.object(importer.adapter, "insert_bulk", side_effect=insert_bulk)
+    with pytest.raises(OperationFailed) as ex:
+        importer.load()
+    assert ex.match("Import is incomplete. Failed to import 1 system tables: jobs_log")
+
+    assert sorted(call.args[0] for call in insert_bulk_mock.call_args_list) == [
+        "sys-cluster",
+        "sys-jobs_log",
+        "sys-nodes",
+    ]
+    assert max(active_max) > 1
+    assert "Importing table failed: jobs_log. Reason: Something failed" in caplog.text
+    assert "Failed to import 1 system tables: jobs_log" in caplog.text
+    assert "Successfully imported 2 system tables" in caplog.text
+
+
+def test_inspector_ddl(mocker, tmp_path):
+    """
+    Verify DDL of all system tables is derived from a single query, and cached per CrateDB version.
+    """
+    columns = [
+        ("jobs_log", "id", "text"),
+        ("jobs_log", "node", "object"),
+        ("jobs_log", "node['id']", "text"),
+        ("jobs_log", "ended", "timestamp with time zone"),
+        ("summits", "coordinates", "geo_point"),
+        ("summits", "tags", "text_array"),
+    ]
+
+    def run_sql(sql, parameters=None):
+        if "sys.nodes" in sql:
+            return [("5.8.1",)]
+        return columns
+
+    inspector = SystemTableInspector(dburi="crate://localhost:4200/", cache_path=tmp_path)
+    run_sql_mock = mocker.patch.object(inspector.adapter, "run_sql", side_effect=run_sql)
+    assert inspector.table_names() == ["jobs_log", "summits"]
+    assert inspector.ddl(tablename_in="summits", tablename_out="sys-summits") == (
+        'CREATE TABLE IF NOT EXISTS "sys-summits" (\n\tcoordinates GEO_POINT,\n\ttags ARRAY(TEXT)\n);\n'
+    )
+    assert inspector.ddl(tablename_in="jobs_log", tablename_out="jobs_log", with_drop_table=True) == (
+        "DROP TABLE IF EXISTS jobs_log;\n"
+        "CREATE TABLE IF NOT EXISTS jobs_log (\n\tid TEXT,\n\tnode OBJECT,\n\tended TIMESTAMP WITH TIME ZONE\n);\n"
+    )
+    assert inspector.ddl(tablename_in="jobs_log", tablename_out="jobs_log") == inspector.ddl("jobs_log", "jobs_log")
+    assert run_sql_mock.call_count == 2
+    assert (tmp_path / "sys-columns-5.8.1.json").exists()
+
+    # Another inspector reads column definitions from the cache.
+    inspector = SystemTableInspector(dburi="crate://localhost:4200/", cache_path=tmp_path)
+    run_sql_mock = mocker.patch.object(inspector.adapter, "run_sql", side_effect=run_sql)
+    assert inspector.table_names() == ["jobs_log", "summits"]
+    assert "ARRAY(TEXT)" in inspector.ddl(tablename_in="summits", tablename_out="sys-summits")
+    assert run_sql_mock.call_count == 1
+
+
+def test_inspector_arrow_schema(mocker, tmp_path):
+    """
+    Verify the Arrow schema of a system table is derived from its columns, including nested columns of objects.
+    """
+    pa = pytest.importorskip("pyarrow")
+    columns = [
+        ("jobs_log", "id", "text"),
+        ("jobs_log", "node", "object"),
+        ("jobs_log", "node['id']", "text"),
+        ("jobs_log", "node['stats']", "object"),
+        ("jobs_log", "node['stats']['count']", "bigint"),
+        ("jobs_log", "settings", "object"),
+        ("jobs_log", "ended", "timestamp with time zone"),
+        ("jobs_log", "tags", "text_array"),
+    ]
+    inspector = SystemTableInspector(dburi="crate://localhost:4200/", cache_path=tmp_path)
+    mocker.patch.object(inspector, "version", return_value=None)
+    mocker.patch.object(inspector.adapter, "run_sql", return_value=columns)
+    assert inspector.arrow_schema("jobs_log") == pa.schema(
+        [
+            pa.field("id", pa.string()),
+            pa.field(
+                "node",
+                pa.struct([pa.field("id", pa.string()), pa.field("stats", pa.struct([pa.field("count", pa.int64())]))]),
+            ),
+            pa.field("ended", pa.timestamp("ms", tz="UTC")),
+            pa.field("tags", pa.list_(pa.string())),
+        ]
+    )
+    assert inspector.arrow_schema("unknown") == pa.schema([])
+
+
+def test_save_archive(mocker, tmp_path):
+    """
+    Verify tables are streamed into an archive file, without writing them to disk first.
+    """
+    pa = pytest.importorskip("pyarrow")
+    mocker.patch("cratedb_toolkit.cfr.systable.SystemTableInspector")
+    mocker.patch("cratedb_toolkit.cfr.systable.InfoContainer")
+    exporter = SystemTableExporter(dburi="crate://localhost:4200/", target=tmp_path / "cfr.tgz")
+    exporter.info.cluster_name = "testdrive"
+    exporter.inspector.table_names.return_value = ["jobs_log", "nodes"]
+    exporter.inspector.ddl.return_value = "CREATE TABLE foo;"
+    mocker.patch.object(
+        exporter, "read_table_batches", side_effect=lambda tablename: iter([pa.RecordBatch.from_pydict({"id": [1]})])
+    )
+
+    assert exporter.save() == tmp_path / "cfr.tgz"
+    assert [path.name for path in tmp_path.iterdir()] == ["cfr.tgz"]
+    with tarfile.open(tmp_path / "cfr.tgz") as tar:
+        names = sorted(name.split("/", 2)[2] for name in tar.getnames())
+        member = next(name for name in tar.getnames() if name.endswith("data/sys-nodes.jsonl"))
+        assert tar.extractfile(member).read() == b'{"id":1}\n'  # type: ignore[union-attr]
+    assert names == [
+        "sys/data/sys-jobs_log.jsonl",
+        "sys/data/sys-nodes.jsonl",
+        "sys/schema/sys-jobs_log.sql",
+        "sys/schema/sys-nodes.sql",
+    ]
+
+
+def test_save_archive_table_failure(mocker, tmp_path):
+    """
+    Verify tables failing to export are omitted from archive files, including their schema.
+    """
+    pa = pytest.importorskip("pyarrow")
+    mocker.patch("cratedb_toolkit.cfr.systable.SystemTableInspector")
+    mocker.patch("cratedb_toolkit.cfr.systable.InfoContainer")
+    exporter = SystemTableExporter(dburi="crate://localhost:4200/", target=tmp_path / "cfr.tgz", spool_size=1024)
+    exporter.info.cluster_name = "testdrive"
+    exporter.inspector.table_names.return_value = ["jobs_log", "nodes"]
+    exporter.inspector.ddl.return_value = "CREATE TABLE foo;"
+    archive_writer = mocker.spy(systable, "ArchiveWriter")
+
+    def read_table_batches(tablename):
+        yield pa.RecordBatch.from_pydict({"id": [1]})
+        if tablename == "jobs_log":
+            raise ValueError("Connection refused")
+
+    mocker.patch.object(exporter, "read_table_batches", side_effect=read_table_batches)
+
+    with pytest.raises(OperationFailed):
+        exporter.save()
+    assert archive_writer.call_args.kwargs["spool_size"] == 1024
+    with tarfile.open(tmp_path / "cfr.tgz") as tar:
+        names = sorted(name.split("/", 2)[2] for name in tar.getnames())
+    assert names == ["sys/data/sys-nodes.jsonl", "sys/schema/sys-nodes.sql"]
+
+
+@pytest.mark.parametrize("target", ["s3://bucket/cfr", "s3://bucket/cfr.tgz"])
+def test_save_object_store(mocker, tmp_path, target):
+    """
+    Verify files, or the archive, are uploaded to an object store, without writing them to disk.
+    """
+    pa = pytest.importorskip("pyarrow")
+    from cratedb_toolkit.util.objectstore import ObjectStore
+
+    mocker.patch("cratedb_toolkit.cfr.systable.SystemTableInspector")
+    mocker.patch("cratedb_toolkit.cfr.systable.InfoContainer")
+    store = ObjectStore.from_url(f"{target}?endpoint=http://localhost:9000")
+    store.client = mocker.MagicMock()  # type: ignore[attr-defined]
+    objects = {}
+    store.client.put_object.side_effect = lambda bucket, key, data, length, **kwargs: objects.update({key: data.read()})  # type: ignore[attr-defined]
+    exporter = SystemTableExporter(dburi="crate://localhost:4200/", target=store)
+    exporter.info.cluster_name = "testdrive"
+    exporter.inspector.table_names.return_value = ["nodes"]
+    exporter.inspector.ddl.return_value = "CREATE TABLE foo;"
+    mocker.patch.object(
+        exporter, "read_table_batches", side_effect=lambda tablename: iter([pa.RecordBatch.from_pydict({"id": [1]})])
+    )
+
+    location = exporter.save()
+    assert list(tmp_path.iterdir()) == []
+    if target.endswith(".tgz"):
+        assert location == "s3://bucket/cfr.tgz"
+        assert list(objects) == ["cfr.tgz"]
+        with tarfile.open(fileobj=io.BytesIO(objects["cfr.tgz"])) as tar:
+            assert sorted(name.split("/", 2)[2] for name in tar.getnames()) == [
+                "sys/data/sys-nodes.jsonl",
+                "sys/schema/sys-nodes.sql",
+            ]
+    else:
+        assert str(location).startswith("s3://bucket/cfr/testdrive/")
+        assert sorted(key.split("/", 3)[3] for key in objects) == [
+            "sys/data/sys-nodes.jsonl",
+            "sys/schema/sys-nodes.sql",
+        ]
+        assert next(data for key, data in objects.items() if key.endswith(".jsonl")) == b'{"id":1}\n'
+
+
+def test_save_archive_failure(exporter, mocker, tmp_path):
+    """
+    Verify incomplete archive files are removed.
+    """
+    exporter.path = tmp_path / "cfr.tar.zst"
+    mocker.patch.object(exporter, "save_table", side_effect=ValueError("Connection refused"))
+    with pytest.raises(ValueError):
+        exporter.save()
+    assert not exporter.path.exists()
+
+
+@pytest.mark.parametrize("filename", ["cfr.tgz", "cfr.tar.zst"])
+def test_import_archive(mocker, tmp_path, filename):
+    """
+    Verify tables are imported from archive files without extracting them, streaming data files in batches.
+    """
+    from cratedb_toolkit.util.archive import ArchiveWriter
+    from cratedb_toolkit.util.bulk import BulkResponse
+
+    if filename.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = tmp_path / filename
+    with ArchiveWriter(path) as archive:
+        with archive.open("testdrive/2024-01-01T00-00-00/sys/schema/sys-nodes.sql") as file:
+            file.write(b"CREATE TABLE foo;")
+        with archive.open("testdrive/2024-01-01T00-00-00/sys/data/sys-nodes.jsonl") as file:
+            file.write(b'{"id":1}\n{"id":2}\n{"id":3}\n')
+
+    mocker.patch("cratedb_toolkit.cfr.systable.ExportSettings.BATCH_SIZE", 2)
+    importer = SystemTableImporter(dburi="crate://localhost:4200/", source=path)
+    run_sql_mock = mocker.patch.object(importer.adapter, "run_sql")
+    frames = []
+
+    def insert_bulk(tablename, data, **kwargs):
+        frames.append(data)
+        return BulkResponse(results=[{"rowcount": 1}] * len(data))
+
+    mocker.patch.object(importer.adapter, "insert_bulk", side_effect=insert_bulk)
+    importer.load()
+
+    run_sql_mock.assert_called_once_with("CREATE TABLE foo;")
+    assert [frame["id"].to_list() for frame in frames] == [[1, 2], [3]]
+    assert not [item for item in tmp_path.iterdir() if item != path]
+
+
+def test_import_archive_ambiguous(tmp_path):
+    from cratedb_toolkit.util.archive import ArchiveWriter
+
+    path = tmp_path / "cfr.tgz"
+    with ArchiveWriter(path) as archive:
+        for export in ["first", "second"]:
+            with archive.open(f"testdrive/{export}/sys/schema/sys-nodes.sql") as file:
+                file.write(b"CREATE TABLE foo;")
+    with pytest.raises(ValueError) as ex:
+        SystemTableImporter(dburi="crate://localhost:4200/", source=path)
+    assert ex.match("Archive file must contain exactly one export, found 2")
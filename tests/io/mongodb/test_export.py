@@ -0,0 +1,220 @@
+# ruff: noqa: E402
+import argparse
+import datetime as dt
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.mongodb
+
+pytest.importorskip("bson", reason="Skipping tests because bson is not installed")
+pytest.importorskip("pymongo", reason="Skipping tests because pymongo is not installed")
+pytest.importorskip("rich", reason="Skipping tests because rich is not installed")
+
+import bson
+import orjson
+from bson.raw_bson import RawBSONDocument
+
+from cratedb_toolkit.io.mongodb import api, core
+from cratedb_toolkit.io.mongodb.export import document_to_json, document_to_record, partition_queries
+
+
+def sample_collection(mocker, values):
+    collection = mocker.MagicMock()
+    collection.aggregate.return_value = [{"_id": value} for value in values]
+    return collection
+
+
+def test_document_to_json():
+    document = RawBSONDocument(bson.encode({"_id": bson.ObjectId(), "name": "foo", "count": bson.Int64(42)}))
+    assert orjson.loads(document_to_json(document)) == {"name": "foo", "count": 42}
+
+
+def test_document_to_json_types():
+    """
+    Verify values of BSON types are converted to values CrateDB can ingest.
+    """
+    oid = bson.ObjectId("55153a8014829a865bbf700d")
+    document = {
+        "_id": oid,
+        "oid": oid,
+        "date": dt.datetime(2024, 1, 2, 3, 4, 5, 678000),
+        "date_old": dt.datetime(1960, 1, 1),
+        "decimal": bson.Decimal128("1.25"),
+        "nan": float("nan"),
+        "binary": bson.Binary(b"\x01\x02"),
+        "uuid": bson.Binary(uuid.UUID("12345678123456781234567812345678").bytes, 4),
+        "regex": bson.Regex("^a", "i"),
+        "timestamp": bson.Timestamp(1700000000, 5),
+        "code": bson.Code("x = 1"),
+        "minkey": bson.MinKey(),
+        "dbref": bson.DBRef("demo", oid),
+        "nested": {"list": [1, {"date": dt.datetime(2024, 1, 1)}], "oids": [oid]},
+    }
+    assert orjson.loads(document_to_json(RawBSONDocument(bson.encode(document)))) == {
+        "oid": "55153a8014829a865bbf700d",
+        "date": 1704164645678,
+        "date_old": -315619200000,
+        "decimal": "1.25",
+        "nan": None,
+        "binary": "AQI=",
+        "uuid": "12345678-1234-5678-1234-567812345678",
+        "regex": "(?i)^a",
+        "timestamp": {"t": 1700000000000, "i": 5},
+        "code": "x = 1",
+        "minkey": None,
+        "dbref": {"ref": "demo", "id": "55153a8014829a865bbf700d"},
+        "nested": {"list": [1, {"date": 1704067200000}], "oids": ["55153a8014829a865bbf700d"]},
+    }
+
+
+def test_document_to_json_int64():
+    document = RawBSONDocument(bson.encode({"small": bson.Int64(1), "large": bson.Int64(2**62 + 1)}))
+    assert document_to_json(document) == b'{"small":1,"large":4611686018427387905}'
+
+
+def test_document_to_json_timestamp():
+    """
+    Verify timestamps within the same second remain distinct.
+    """
+    document = {"a": bson.Timestamp(1700000000, 1), "b": bson.Timestamp(1700000000, 2)}
+    assert orjson.loads(document_to_json(RawBSONDocument(bson.encode(document)))) == {
+        "a": {"t": 1700000000000, "i": 1},
+        "b": {"t": 1700000000000, "i": 2},
+    }
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (bson.Binary(b"\x01\x02", bson.binary.BINARY_SUBTYPE), "AQI="),
+        (bson.Binary(b"\x01\x02", bson.binary.FUNCTION_SUBTYPE), "AQI="),
+        (bson.Binary(b"\x01" * 16, bson.binary.PYTHON_LEGACY), "AQEBAQEBAQEBAQEBAQEBAQ=="),
+        (bson.Binary(uuid.UUID(int=1).bytes, bson.binary.UUID_SUBTYPE), "00000000-0000-0000-0000-000000000001"),
+        (bson.Binary(b"\x01\x02", bson.binary.MD5_SUBTYPE), "AQI="),
+        (bson.Binary(b"\x01\x02", bson.binary.USER_DEFINED_SUBTYPE), "AQI="),
+    ],
+)
+def test_document_to_json_binary(value, expected):
+    """
+    Verify binary values are exported as base64-encoded strings, except UUIDs.
+    """
+    document = RawBSONDocument(bson.encode({"value": value}))
+    assert orjson.loads(document_to_json(document)) == {"value": expected}
+    # Records keep UUIDs, which are serialized by the database driver.
+    assert str(document_to_record(document)["value"]) == expected
+
+
+def test_document_to_record():
+    """
+    Verify documents are converted to records of the same values as when converting them to JSON.
+    """
+    oid = bson.ObjectId("55153a8014829a865bbf700d")
+    document = {
+        "_id": oid,
+        "date": dt.datetime(2024, 1, 2, 3, 4, 5, 678000),
+        "decimal": bson.Decimal128("1.25"),
+        "dbref": bson.DBRef("demo", oid),
+        "nested": {"list": [1, {"date": dt.datetime(2024, 1, 1)}], "oids": [oid]},
+    }
+    record = document_to_record(RawBSONDocument(bson.encode(document)))
+    assert record == orjson.loads(document_to_json(RawBSONDocument(bson.encode(document))))
+    assert record["dbref"] == {"ref": "demo", "id": "55153a8014829a865bbf700d"}
+
+
+def test_partition_queries(mocker):
+    """
+    Verify ranges of `_id` values are derived from quantiles of a sample.
+    """
+    collection = sample_collection(mocker, reversed(range(100)))
+    queries = partition_queries(collection, partitions=4)
+    assert queries == [
+        {"_id": {"$not": {"$gte": 25}}},
+        {"_id": {"$gte": 25, "$lt": 50}},
+        {"_id": {"$gte": 50, "$lt": 75}},
+        {"_id": {"$gte": 75}},
+    ]
+    assert collection.aggregate.call_args.args[0][0] == {"$sample": {"size": 128}}
+
+
+@pytest.mark.parametrize("values", [[], [1, "foo", 2], [{"a": 1}, {"a": 2}]])
+def test_partition_queries_unordered(mocker, values):
+    """
+    Verify collections are not split when `_id` values can not be ordered.
+    """
+    assert partition_queries(sample_collection(mocker, values), partitions=4) == [{}]
+
+
+def test_partition_queries_single(mocker):
+    collection = sample_collection(mocker, range(100))
+    assert partition_queries(collection, partitions=1) == [{}]
+    collection.aggregate.assert_not_called()
+
+
+def test_export_partitioned(mocker):
+    """
+    Verify large collections are exported in ranges, using a pool of processes.
+    """
+    db = mocker.MagicMock()
+    db["demo"].estimated_document_count.return_value = core.PARTITION_MIN_DOCUMENTS
+    mocker.patch.object(core, "get_mongodb_client_database", return_value=(mocker.MagicMock(), db))
+    mocker.patch.object(core, "partition_queries", return_value=[{"a": 1}, {"b": 2}])
+    mocker.patch.object(core, "export_partition", side_effect=lambda args, query, reader: [orjson.dumps(query)])
+
+    def bounded_map(fn, items, workers, processes=False):
+        assert processes is True
+        assert workers == 2
+        return map(fn, items)
+
+    mocker.patch.object(core, "bounded_map", side_effect=bounded_map)
+    args = argparse.Namespace(url="mongodb://localhost", database="testdrive", collection="demo", workers=2)
+    assert core.export(args).read() == b'{"a":1}\n{"b":2}\n'
+
+
+def test_export_batches(mocker):
+    """
+    Verify documents are exported in batches of bounded size.
+    """
+    db = mocker.MagicMock()
+    db["demo"].estimated_document_count.return_value = 5
+    mocker.patch.object(core, "get_mongodb_client_database", return_value=(mocker.MagicMock(), db))
+    mocker.patch.object(core, "collection_to_json_lines", return_value=iter([b"1", b"2", b"3", b"4", b"5"]))
+    args = argparse.Namespace(url="mongodb://localhost", database="testdrive", collection="demo", workers=2)
+    assert list(core.export_batches(args, batch_size=2)) == [[b"1", b"2"], [b"3", b"4"], [b"5"]]
+
+
+def test_mongodb_copy_pipeline(mocker):
+    """
+    Verify batches of documents are loaded using bulk operations, including all of their fields.
+    """
+    batches = [[{"a": 1}, {"b": 2}], [{"a": 3, "c": {"d": 4}}]]
+    mocker.patch.object(api, "extract", return_value={"demo": {"count": 3}})
+    mocker.patch.object(api, "translate", return_value={})
+    mocker.patch.object(api, "export_records", return_value=iter(batches))
+    adapter = mocker.patch.object(api, "DatabaseAdapter").return_value
+    adapter.insert_bulk.side_effect = lambda tablename, data, columns, batch_size: mocker.MagicMock(
+        record_count=len(data), failed_records=[]
+    )
+
+    assert api.mongodb_copy("mongodb://localhost/testdrive/demo", "crate://localhost/testdrive/demo") is True
+    calls = [call.kwargs for call in adapter.insert_bulk.call_args_list]
+    assert [(call["columns"], call["data"]) for call in calls] == [
+        (["a", "b"], [{"a": 1}, {"b": 2}]),
+        (["a", "c"], [{"a": 3, "c": {"d": 4}}]),
+    ]
+    assert calls[0]["tablename"] == "testdrive.demo"
+    adapter.refresh_table.assert_called_once()
+
+
+def test_export_partitioned_mongodb(mongodb, monkeypatch):
+    """
+    Verify all documents are exported exactly once, when exporting a collection in ranges.
+    """
+    monkeypatch.setattr(core, "PARTITION_MIN_DOCUMENTS", 0)
+    collection = mongodb.get_connection_client()["testdrive"]["demo"]
+    collection.insert_many([{"_id": index, "value": index} for index in range(1000)])
+    collection.insert_one({"_id": "foo", "value": -1})
+
+    args = argparse.Namespace(url=mongodb.get_connection_url(), database="testdrive", collection="demo", workers=2)
+    values = [orjson.loads(line)["value"] for line in core.export(args).read().splitlines()]
+    assert sorted(values) == list(range(-1, 1000))
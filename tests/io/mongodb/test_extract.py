@@ -1,4 +1,5 @@
 # ruff: noqa: E402
+import argparse
 import unittest
 
 import pytest
@@ -84,3 +85,142 @@ class TestTypeCount(unittest.TestCase):
         self.assertEqual(s["a"]["types"]["INTEGER"]["count"], 1)
         self.assertEqual(s["a"]["types"]["STRING"]["count"], 1)
         self.assertEqual(s["a"]["types"]["BOOLEAN"]["count"], 1)
+
+
+class TestMergeSchemas(unittest.TestCase):
+    def test_merge(self):
+        documents = [
+            {"a": 1, "b": {"c": "x"}, "d": [1, {"e": True}]},
+            {"a": "foo", "b": {"c": "y", "f": 1.5}},
+            {"a": 2, "d": [[1], {"e": False}]},
+            {"g": None},
+        ]
+        expected = extract.extract_schema_from_documents(documents)
+        schema = extract.extract_schema_from_documents(documents[:2])
+        other = extract.extract_schema_from_documents(documents[2:])
+        merged = extract.merge_schemas(schema, other)
+        self.assertEqual(expected, merged)
+        self.assertEqual(merged["count"], 4)
+        self.assertEqual(merged["document"]["a"]["types"], {"INTEGER": {"count": 2}, "STRING": {"count": 1}})
+        self.assertEqual(merged["document"]["d"]["types"]["ARRAY"]["types"]["OBJECT"]["count"], 2)
+
+    def test_merge_copies(self):
+        other = extract.extract_schema_from_documents([{"a": {"b": 1}}])
+        schema = extract.merge_schemas({}, other)
+        extract.merge_schemas(schema, other)
+        self.assertEqual(other["document"]["a"]["types"]["OBJECT"]["document"]["b"]["count"], 1)
+        self.assertEqual(schema["document"]["a"]["types"]["OBJECT"]["document"]["b"]["count"], 2)
+
+
+def test_sample_size_for():
+    assert extract.sample_size_for(10**9) == 16587
+    assert extract.sample_size_for(10**9, confidence=0.95) == 9604
+    assert extract.sample_size_for(100) == 100
+    with pytest.raises(ValueError):
+        extract.sample_size_for(100, confidence=1)
+
+
+@pytest.mark.parametrize("engine", ["client", "server"])
+def test_extract_collection_sample(mocker, engine):
+    """
+    Verify `_id` values are sampled once, and schemas of disjoint parts of the sample are extracted in parallel.
+
+    `$sample` needs to be the first stage of the pipeline, so MongoDB uses a random cursor.
+    Extracting on the client uses a pool of processes, extracting within MongoDB a pool of threads.
+    """
+    from cratedb_toolkit.io.mongodb import core
+
+    collection = mocker.MagicMock()
+    collection.name = "demo"
+    collection.estimated_document_count.return_value = 10**9
+    # A random cursor may return the same document more than once.
+    collection.aggregate.return_value = [{"_id": i} for i in range(200_003)] + [{"_id": 42}, {"_id": {"a": 1}}]
+    pipelines = []
+
+    def extract_partition(args, name, pipeline, engine):
+        pipelines.append(pipeline)
+        return extract.extract_schema_from_documents([{"a": 1}] * len(pipeline[0]["$match"]["_id"]["$in"]))
+
+    mocker.patch.object(core, "extract_partition", side_effect=extract_partition)
+
+    def bounded_map(fn, items, workers, processes=False):
+        assert processes is (engine == "client")
+        return map(fn, items)
+
+    mocker.patch.object(core, "bounded_map", side_effect=bounded_map)
+    args = argparse.Namespace(sample_size=200_003, workers=4, engine=engine)
+    schema = core.extract_collection(args, collection, scan="sample")
+    assert schema == {"count": 200_004, "document": {"a": {"count": 200_004, "types": {"INTEGER": {"count": 200_004}}}}}
+    collection.aggregate.assert_called_once_with([{"$sample": {"size": 200_003}}, {"$project": {"_id": 1}}])
+    assert len(pipelines) == 16
+    assert all(list(pipeline[0]) == ["$match"] and len(pipeline) == 1 for pipeline in pipelines)
+    ids = [value for pipeline in pipelines for value in pipeline[0]["$match"]["_id"]["$in"]]
+    assert ids == [*range(200_003), {"a": 1}]
+    assert {len(pipeline[0]["$match"]["_id"]["$in"]) for pipeline in pipelines} == {12_500, 12_501}
+
+
+def test_extract_schema_from_collection_sample(mocker):
+    collection = mocker.MagicMock()
+    collection.estimated_document_count.return_value = 1000
+    collection.aggregate.return_value = [{"a": 1}, {"a": "foo"}]
+    schema = extract.extract_schema_from_collection(collection, partial=False, sample_size=2)
+    assert schema["count"] == 2
+    assert schema["document"]["a"]["types"] == {"INTEGER": {"count": 1}, "STRING": {"count": 1}}
+    collection.aggregate.assert_called_once_with([{"$sample": {"size": 2}}])
+
+
+SERVER_TYPES = {value: key for key, value in extract.SERVER_TYPES_MAP.items()}
+
+
+def type_counts(documents):
+    """
+    Count types per path in Python, like the aggregation pipeline of `schema_pipeline` does within MongoDB.
+    """
+    counts = {}
+
+    def visit(value, path, position):
+        key = (path, SERVER_TYPES.get(extract.get_type(value), "null"))
+        count, minimum = counts.get(key, (0, position))
+        counts[key] = (count + 1, min(minimum, position))
+        if isinstance(value, dict):
+            for index, (name, item) in enumerate(value.items()):
+                visit(item, (*path, name), index)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item, (*path, None), 0)
+
+    for document in documents:
+        visit(document, (), 0)
+    return [{"_id": {"p": list(path), "t": t}, "count": count, "i": i} for (path, t), (count, i) in counts.items()]
+
+
+def test_schema_from_type_counts():
+    """
+    Verify counts of types per path are assembled into the same schema as extracting it on the client.
+    """
+    documents = [
+        {"_id": bson.ObjectId(), "a": 1, "b": {"c": "x", "d": [1, {"e": True}]}, "f": [[1.5], []]},
+        {"_id": bson.ObjectId(), "a": "foo", "b": {"c": "y", "g": bson.Int64(1)}, "h": None},
+        {"_id": bson.ObjectId(), "a": 2, "b": [], "f": [{"e": {"i": bson.datetime.datetime.now()}}]},
+    ]
+    schema = extract.schema_from_type_counts(reversed(type_counts(documents)))
+    assert schema == extract.extract_schema_from_documents(documents)
+    assert list(schema["document"]) == ["_id", "a", "b", "f", "h"]
+    assert list(schema["document"]["a"]["types"]) == ["INTEGER", "STRING"]
+
+
+def test_extract_schema_from_aggregation(mongodb):
+    """
+    Verify extracting a schema within MongoDB yields the same outcome as extracting it on the client.
+    """
+    collection = mongodb.get_connection_client()["testdrive"]["demo"]
+    collection.insert_many(
+        [
+            {"a": 1, "b": {"c": "x", "d": [1, {"e": True}]}, "f": [[1.5], []]},
+            {"a": "foo", "b": {"c": "y", "g": bson.Int64(1)}, "h": None},
+            {"a": 2, "b": [], "f": [{"e": {"i": bson.datetime.datetime.now()}}]},
+        ]
+    )
+    expected = extract.extract_schema_from_documents(collection.find())
+    assert extract.extract_schema_from_aggregation(collection) == expected
+    assert extract.extract_schema_from_aggregation(collection, [{"$limit": 1}])["count"] == 1
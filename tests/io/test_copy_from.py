@@ -0,0 +1,177 @@
+import gzip
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from cratedb_toolkit.io.copy_from import CopyFromSummary, HttpStage, copy_from, copy_from_sql
+from cratedb_toolkit.model import InputOutputResource, TableAddress
+from cratedb_toolkit.util.database import DatabaseAdapter
+
+
+@pytest.fixture
+def csv_files(tmp_path):
+    paths = []
+    for name in ["foo.csv", "bar.csv.gz"]:
+        path = tmp_path / name
+        data = b"id,name\n1,foo\n2,bar\n"
+        path.write_bytes(gzip.compress(data) if name.endswith(".gz") else data)
+        paths.append(path)
+    return paths
+
+
+def test_copy_from_sql():
+    sql = copy_from_sql(table='"testdrive"."demo"', uri="http://example.org/o'brien.csv", format_="csv")
+    assert (
+        sql
+        == """COPY "testdrive"."demo" FROM 'http://example.org/o''brien.csv' WITH (format = 'csv') RETURN SUMMARY;"""
+    )
+    sql = copy_from_sql(table="demo", uri="file:///data.json.gz", format_="json", compression="gzip", shared=True)
+    assert sql == (
+        "COPY demo FROM 'file:///data.json.gz' WITH (format = 'json', compression = 'gzip', shared = true) "
+        "RETURN SUMMARY;"
+    )
+
+
+def test_copy_from_summary():
+    summary = CopyFromSummary(uri="http://example.org/data.csv")
+    summary.add({"success_count": 40, "error_count": 2, "errors": {"Cannot cast": {"count": 2, "line_numbers": [3]}}})
+    summary.add({"success_count": 10, "error_count": 1, "errors": {"Cannot cast": {"count": 1, "line_numbers": [7]}}})
+    summary.add({"success_count": None, "error_count": None, "errors": None})
+    assert summary.success_count == 50
+    assert summary.error_count == 3
+    assert summary.errors == {"Cannot cast": 3}
+
+
+def test_http_stage(csv_files):
+    stage = HttpStage(paths=csv_files, host="127.0.0.1")
+    assert stage.server.server_address[0] == "127.0.0.1"
+    stage.start()
+    try:
+        with urllib.request.urlopen(stage.uri(csv_files[0])) as response:  # noqa: S310
+            assert response.read() == b"id,name\n1,foo\n2,bar\n"
+        with pytest.raises(urllib.error.HTTPError) as ex:
+            urllib.request.urlopen(f"http://127.0.0.1:{stage.port}/foo.csv")  # noqa: S310
+        assert ex.value.code == 404
+        with pytest.raises(urllib.error.HTTPError) as ex:
+            urllib.request.urlopen(f"http://127.0.0.1:{stage.port}/{stage.prefix}/0/../../etc/passwd")  # noqa: S310
+        assert ex.value.code == 404
+    finally:
+        stage.stop()
+    with pytest.raises(urllib.error.URLError):
+        urllib.request.urlopen(stage.uri(csv_files[0]), timeout=1)  # noqa: S310
+
+
+def test_http_stage_invalid_host(csv_files):
+    with pytest.raises(OSError) as ex:
+        HttpStage(paths=csv_files, host="192.0.2.1")
+    assert ex.match("Unable to serve files on 192.0.2.1: .+ Use the `stage_host` option")
+
+
+def test_copy_from_http_stage(csv_files, mocker, caplog):
+    """
+    Verify local files are staged via HTTP, and per-file errors are reported.
+    """
+    statements = []
+
+    def run_sql(self, sql, records=False, **kwargs):
+        statements.append(sql)
+        match = re.search(r"FROM '(.+?)'", sql)
+        if match is None:
+            return []
+        with urllib.request.urlopen(match.group(1)) as response:  # noqa: S310
+            assert response.status == 200
+        return [{"success_count": 1, "error_count": 1, "errors": {"Cannot cast value": {"count": 1}}}]
+
+    mocker.patch.object(DatabaseAdapter, "run_sql", run_sql)
+    ensure_table = mocker.patch("cratedb_toolkit.io.copy_from.ensure_table")
+
+    resource = InputOutputResource(url=f"file+copy://{csv_files[0].parent}/*.csv*?stage_host=127.0.0.1")
+    outcome = copy_from(resource, "crate://localhost:4200/", target=TableAddress(schema="testdrive", table="demo"))
+
+    assert outcome is False
+    assert ensure_table.call_count == 2
+    copy_statements = [sql for sql in statements if sql.startswith("COPY")]
+    assert len(copy_statements) == 2
+    assert any("compression = 'gzip'" in sql for sql in copy_statements)
+    assert all(sql.startswith("COPY testdrive.demo FROM 'http://127.0.0.1:") for sql in copy_statements)
+    assert "REFRESH TABLE testdrive.demo;" in statements
+    assert "Failed to load 1 records from http://127.0.0.1:" in caplog.text
+
+
+def test_copy_from_http_stage_failure(csv_files, mocker):
+    """
+    Verify the HTTP server is shut down when loading fails.
+    """
+    stages = []
+    mocker.patch.object(HttpStage, "start", autospec=True, side_effect=lambda stage: stages.append(stage))
+    stop = mocker.patch.object(HttpStage, "stop", autospec=True)
+    mocker.patch.object(DatabaseAdapter, "run_sql", side_effect=ValueError("Connection refused"))
+    mocker.patch("cratedb_toolkit.io.copy_from.ensure_table")
+
+    resource = InputOutputResource(url=f"file+copy://{csv_files[0]}?stage_host=127.0.0.1")
+    with pytest.raises(ValueError):
+        copy_from(resource, "crate://localhost:4200/testdrive/demo")
+    assert len(stages) == 1
+    stop.assert_called_once_with(stages[0])
+
+    # Also when preparing the target table fails, before serving files.
+    stop.reset_mock()
+    mocker.patch("cratedb_toolkit.io.copy_from.ensure_table", side_effect=ValueError("Connection refused"))
+    with pytest.raises(ValueError):
+        copy_from(resource, "crate://localhost:4200/testdrive/demo")
+    assert stop.call_count == 1
+
+
+def test_copy_from_shared(csv_files, mocker):
+    """
+    Verify local files on a shared filesystem are read by the cluster directly.
+    """
+    run_sql = mocker.patch.object(DatabaseAdapter, "run_sql", return_value=[{"success_count": 2, "error_count": 0}])
+    mocker.patch("cratedb_toolkit.io.copy_from.ensure_table")
+
+    resource = InputOutputResource(url=f"file+copy://{csv_files[0]}?stage=shared")
+    assert copy_from(resource, "crate://localhost:4200/testdrive/demo") is True
+    sql = run_sql.call_args_list[0].args[0]
+    assert (
+        sql
+        == f"COPY testdrive.demo FROM '{csv_files[0].as_uri()}' WITH (format = 'csv', shared = true) RETURN SUMMARY;"
+    )
+
+
+def test_copy_from_remote_glob(mocker, caplog):
+    """
+    Verify summaries of remote globs are reported per file, aggregating the records of all nodes.
+    """
+    records = [
+        {"node": {"name": "n1"}, "uri": "s3://bucket/data/a.csv", "success_count": 2, "error_count": 0, "errors": {}},
+        {"node": {"name": "n2"}, "uri": "s3://bucket/data/a.csv", "success_count": 3, "error_count": 0, "errors": {}},
+        {
+            "node": {"name": "n1"},
+            "uri": "s3://bucket/data/b.csv",
+            "success_count": 1,
+            "error_count": 4,
+            "errors": {"Cannot cast value": {"count": 4, "line_numbers": [2, 3, 4, 5]}},
+        },
+    ]
+    run_sql = mocker.patch.object(DatabaseAdapter, "run_sql", return_value=records)
+    mocker.patch.object(DatabaseAdapter, "table_exists", return_value=True)
+    mocker.patch.object(DatabaseAdapter, "refresh_table")
+
+    resource = InputOutputResource(url="s3://bucket/data/*.csv")
+    with caplog.at_level("INFO"):
+        assert copy_from(resource, "crate://localhost:4200/testdrive/demo") is False
+    run_sql.assert_called_once()
+    assert "Failed to load 4 records from s3://bucket/data/b.csv: Cannot cast value" in caplog.text
+    assert "s3://bucket/data/a.csv:" not in caplog.text
+    assert "Loaded 6 of 10 records from 2 files" in caplog.text
+
+
+def test_copy_from_parquet_unsupported(tmp_path, mocker):
+    path = tmp_path / "demo.parquet"
+    path.touch()
+    resource = InputOutputResource(url=f"file+copy://{path}?stage=shared")
+    with pytest.raises(NotImplementedError) as ex:
+        copy_from(resource, "crate://localhost:4200/testdrive/demo")
+    assert ex.match("File format not supported by COPY FROM: parquet")
@@ -0,0 +1,147 @@
+import gzip
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from cratedb_toolkit.cli import cli
+from cratedb_toolkit.io.file import FileReader, nested_types, resolve_paths, table_name_from_path
+
+
+@pytest.fixture
+def csv_file(tmp_path) -> Path:
+    path = tmp_path / "demo.csv"
+    pd.DataFrame({"id": range(42), "name": [f"item-{i}" for i in range(42)]}).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def ndjson_file(tmp_path) -> Path:
+    path = tmp_path / "demo.ndjson.gz"
+    with gzip.open(path, "wt") as f:
+        for i in range(42):
+            f.write(json.dumps({"id": i, "data": {"value": i * 2}}) + "\n")
+    return path
+
+
+@pytest.fixture
+def nested_file(tmp_path) -> Path:
+    path = tmp_path / "demo.ndjson"
+    with open(path, "w") as f:
+        for i in range(42):
+            f.write(json.dumps({"data": {"value": i * 2}, "tags": [f"tag-{i}"]}) + "\n")
+    return path
+
+
+@pytest.fixture
+def parquet_file(tmp_path) -> Path:
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "demo.parquet"
+    pd.DataFrame({"id": range(42), "value": [i / 2 for i in range(42)]}).to_parquet(path, row_group_size=10)
+    return path
+
+
+def test_reader_format_detection(tmp_path):
+    assert FileReader(Path("data.csv")).format == "csv"
+    assert FileReader(Path("data.jsonl")).format == "ndjson"
+    assert FileReader(Path("data.pq")).format == "parquet"
+    reader = FileReader(Path("data.json.gz"))
+    assert reader.format == "ndjson"
+    assert reader.compression == "gzip"
+    assert FileReader(Path("data.txt"), format_="csv").format == "csv"
+    assert FileReader(Path("data.txt"), format_="jsonl").format == "ndjson"
+
+
+def test_reader_format_unknown():
+    with pytest.raises(NotImplementedError) as ex:
+        FileReader(Path("data.txt"))
+    assert ex.match("File format not supported: data.txt")
+
+
+def test_reader_partitions(csv_file, ndjson_file, parquet_file):
+    for path in [csv_file, ndjson_file, parquet_file]:
+        reader = FileReader(path)
+        assert sum(len(reader.read(partition)) for partition in reader.partitions()) == 42
+    assert len(list(FileReader(parquet_file).partitions())) == 5
+
+
+@pytest.mark.parametrize("name", ["empty.csv", "empty.ndjson", "empty.parquet"])
+def test_reader_sample_empty(tmp_path, name):
+    """
+    Verify deriving the table schema from files without records fails with a clear error.
+    """
+    path = tmp_path / name
+    if name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+        pd.DataFrame({"id": pd.Series([], dtype="int64")}).to_parquet(path)
+    else:
+        path.touch()
+    with pytest.raises(ValueError) as ex:
+        FileReader(path).sample()
+    assert ex.match(f"Unable to derive table schema, file contains no records: {path}")
+
+
+def test_nested_types(tmp_path):
+    """
+    Verify columns holding nested data are defined as objects or arrays.
+    """
+    pytest.importorskip("pyarrow")
+    import sqlalchemy as sa
+    from sqlalchemy.schema import CreateTable
+
+    path = tmp_path / "nested.parquet"
+    pd.DataFrame(
+        {
+            "id": [1, 2],
+            "name": ["foo", None],
+            "data": [None, {"value": 42}],
+            "items": [[{"value": 1}], []],
+            "tags": [[], ["foo", "bar"]],
+            "numbers": [[1, 2], None],
+            "unknown": [None, None],
+        }
+    ).to_parquet(path)
+    types = nested_types(FileReader(path).sample())
+    columns = [sa.Column(name, type_) for name, type_ in types.items()]
+    ddl = str(CreateTable(sa.Table("demo", sa.MetaData(), *columns)).compile(sa.create_engine("crate://")))
+    assert "data OBJECT" in ddl
+    assert "items ARRAY(OBJECT)" in ddl
+    assert "tags ARRAY(STRING)" in ddl
+    assert "numbers ARRAY(LONG)" in ddl
+    assert sorted(types) == ["data", "items", "numbers", "tags"]
+
+
+def test_resolve_paths(tmp_path, csv_file, parquet_file):
+    assert resolve_paths(f"file://{tmp_path}") == [csv_file, parquet_file]
+    assert resolve_paths(f"file://{tmp_path}/*.csv") == [csv_file]
+    assert resolve_paths(f"file://{tmp_path}/unknown.csv") == []
+
+
+def test_table_name_from_path():
+    assert table_name_from_path(Path("/path/to/demo.csv")) == "demo"
+    assert table_name_from_path(Path("/path/to/demo.ndjson.gz")) == "demo"
+
+
+@pytest.mark.parametrize("fixture", ["csv_file", "ndjson_file", "nested_file", "parquet_file"])
+def test_file_load_table(request, cratedb, fixture):
+    """
+    CLI test: Invoke `ctk load table` for local files.
+    """
+    path = request.getfixturevalue(fixture)
+    cratedb_url = f"{cratedb.get_connection_url()}/testdrive/demo"
+
+    # Run transfer command.
+    runner = CliRunner(env={"CRATEDB_SQLALCHEMY_URL": cratedb_url})
+    result = runner.invoke(
+        cli,
+        args=f"load table file://{path}",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+
+    # Verify data in target database.
+    assert cratedb.database.table_exists("testdrive.demo") is True
+    assert cratedb.database.refresh_table("testdrive.demo") is True
+    assert cratedb.database.count_records("testdrive.demo") == 42
@@ -1,3 +1,5 @@
+import gzip
+
 import pytest
 import responses
 
@@ -50,6 +52,39 @@ def test_import_csv_dask_with_progressbar(cratedb, dummy_csv, needs_sqlalchemy2)
     assert result == [(2,)]
 
 
+def test_import_csv_dask_compressed(cratedb, dummy_csv, needs_sqlalchemy2):
+    """
+    Invoke convenience function `import_csv_dask` with a compressed file, and verify database content.
+    """
+    csvfile_gz = dummy_csv.with_suffix(".csv.gz")
+    csvfile_gz.write_bytes(gzip.compress(dummy_csv.read_bytes()))
+    result = cratedb.database.import_csv_dask(filepath=csvfile_gz, tablename="foobar")
+    assert result is None
+
+    cratedb.database.run_sql("REFRESH TABLE foobar;")
+    result = cratedb.database.run_sql("SELECT COUNT(*) FROM foobar;")
+    assert result == [(2,)]
+
+
+def test_insert_bulk(cratedb):
+    """
+    Invoke `insert_bulk` with a list of records, and verify database content.
+    """
+    cratedb.database.run_sql("CREATE TABLE foobar (name TEXT PRIMARY KEY, value DOUBLE);")
+    records = [{"name": "temperature", "value": 42.42}, {"name": "humidity", "value": 84.84}]
+    response = cratedb.database.insert_bulk(tablename="foobar", data=records)
+    assert response.record_count == 2
+    assert response.success_count == 2
+
+    # Inserting the same records again will fail on the primary key constraint.
+    response = cratedb.database.insert_bulk(tablename="foobar", data=records)
+    assert response.failed_records == [0, 1]
+
+    cratedb.database.run_sql("REFRESH TABLE foobar;")
+    result = cratedb.database.run_sql("SELECT COUNT(*) FROM foobar;")
+    assert result == [(2,)]
+
+
 @pytest.mark.skip("Does not work. Why?")
 @responses.activate
 def test_import_cloud_file(tmp_path, caplog, cloud_cluster_mock):
@@ -0,0 +1,113 @@
+import io
+import tarfile
+import threading
+
+import pytest
+
+from cratedb_toolkit.util.archive import (
+    ArchiveReader,
+    ArchiveWriter,
+    ParallelGzipWriter,
+    archive_compression,
+    is_archive,
+)
+
+
+def read_members(path, compression):
+    if compression == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        fileobj = io.BytesIO(zstandard.ZstdDecompressor().stream_reader(path.open("rb")).read())
+        tar = tarfile.open(fileobj=fileobj, mode="r|")
+    else:
+        tar = tarfile.open(path, mode="r|*")
+    with tar:
+        return {member.name: tar.extractfile(member).read() for member in tar}  # type: ignore[union-attr]
+
+
+def test_archive_compression(tmp_path):
+    assert archive_compression(tmp_path / "cfr.tgz") == "gzip"
+    assert archive_compression(tmp_path / "cfr.tar.zst") == "zstd"
+    assert archive_compression(tmp_path / "cfr.tar") is None
+    assert is_archive(tmp_path / "cfr.tar.gz") is True
+    assert is_archive(tmp_path / "cfr") is False
+    with pytest.raises(ValueError) as ex:
+        archive_compression(tmp_path / "cfr.zip")
+    assert ex.match("Archive format not supported: cfr.zip")
+
+
+@pytest.mark.parametrize("filename", ["cfr.tar", "cfr.tgz", "cfr.tar.zst"])
+def test_archive_writer(tmp_path, filename):
+    """
+    Verify members written concurrently are appended to the archive completely.
+    """
+    path = tmp_path / filename
+    payloads = {f"foo/data-{index}.jsonl": str(index).encode() * 100_000 for index in range(8)}
+
+    def write(name):
+        with archive.open(name) as file:
+            payload = payloads[name]
+            for offset in range(0, len(payload), 4096):
+                file.write(payload[offset : offset + 4096])
+
+    with ArchiveWriter(path, threads=2, spool_size=1024) as archive:
+        threads = [threading.Thread(target=write, args=(name,)) for name in payloads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert read_members(path, archive.compression) == payloads
+
+
+def test_archive_writer_exists(tmp_path):
+    path = tmp_path / "cfr.tgz"
+    path.touch()
+    with pytest.raises(FileExistsError):
+        ArchiveWriter(path)
+
+
+def test_parallel_gzip_writer():
+    """
+    Verify blocks compressed in parallel make up a regular gzip stream.
+    """
+    import gzip
+
+    data = bytes(range(256)) * 20_000
+    buffer = io.BytesIO()
+    writer = ParallelGzipWriter(buffer, threads=4)
+    writer.BLOCK_SIZE = 64 * 1024
+    for offset in range(0, len(data), 10_000):
+        writer.write(data[offset : offset + 10_000])
+    writer.close()
+    assert gzip.decompress(buffer.getvalue()) == data
+
+
+@pytest.mark.parametrize("filename", ["cfr.tar", "cfr.tgz", "cfr.tar.zst"])
+def test_archive_reader(tmp_path, filename):
+    """
+    Verify archive members are read without extracting them, using seekable file objects.
+    """
+    if filename.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = tmp_path / filename
+    with ArchiveWriter(path) as archive:
+        with archive.open("foo/sys/schema/sys-nodes.sql") as file:
+            file.write(b"CREATE TABLE foo;")
+        with archive.open("foo/sys/data/sys-nodes.jsonl") as file:
+            file.write(b"".join(b'{"id":%d}\n' % index for index in range(100_000)))
+
+    reader = ArchiveReader(path)
+    assert reader.names() == ["foo/sys/schema/sys-nodes.sql", "foo/sys/data/sys-nodes.jsonl"]
+    with reader.open("foo/sys/data/sys-nodes.jsonl") as file:
+        assert file.readline() == b'{"id":0}\n'
+        file.seek(-13, io.SEEK_END)
+        assert file.read() == b'{"id":99999}\n'
+        file.seek(0)
+        assert file.read(8) == b'{"id":0}'
+
+    root = reader.root() / "foo" / "sys"
+    assert root.exists() is True
+    assert (root / "unknown").exists() is False
+    assert [path.name for path in (root / "schema").glob("*.sql")] == ["sys-nodes.sql"]
+    assert (root / "schema" / "sys-nodes.sql").read_text() == "CREATE TABLE foo;"
+    assert (root / "schema" / "sys-nodes.sql").stat().st_size == 17
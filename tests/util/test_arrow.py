@@ -0,0 +1,90 @@
+import datetime as dt
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from cratedb_toolkit.util.arrow import arrow_from_response, arrow_type_from_name  # noqa: E402
+
+
+def test_arrow_from_response_types():
+    """
+    Verify columns are converted using CrateDB's type information.
+    """
+    response = {
+        "cols": ["id", "name", "ts", "day", "tags", "location", "data"],
+        "col_types": [10, 4, 11, 24, [100, 4], 13, 12],
+        "rows": [
+            [1, "foo", 1704067200000, 1704067200000, ["a", "b"], [9.74, 47.4], {"a": 1}],
+            [2, None, None, None, None, None, {"a": 2, "b": "x"}],
+        ],
+    }
+    table = arrow_from_response(response)
+    assert table.schema.field("id").type == pa.int64()
+    assert table.schema.field("ts").type == pa.timestamp("ms", tz="UTC")
+    assert table.schema.field("day").type == pa.date32()
+    assert table.schema.field("tags").type == pa.list_(pa.string())
+    assert table.schema.field("location").type == pa.list_(pa.float64())
+    assert table.column("ts").to_pylist() == [dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc), None]
+    assert table.column("day").to_pylist() == [dt.date(2024, 1, 1), None]
+    assert table.column("data").to_pylist() == [{"a": 1, "b": None}, {"a": 2, "b": "x"}]
+
+
+def test_arrow_from_response_fallback():
+    """
+    Verify values not fitting their designated type are inferred, or serialized to JSON.
+    """
+    response = {
+        "cols": ["number", "data"],
+        "col_types": [9, 12],
+        "rows": [[2**40, {"a": 1}], [1, {"a": "x"}]],
+    }
+    table = arrow_from_response(response)
+    assert table.column("number").to_pylist() == [2**40, 1]
+    assert table.column("data").to_pylist() == ['{"a": 1}', '{"a": "x"}']
+
+
+def test_arrow_from_response_empty():
+    """
+    Verify empty results retain their columns.
+    """
+    table = arrow_from_response({"cols": ["id"], "col_types": [10], "rows": []})
+    assert table.column_names == ["id"]
+    assert table.num_rows == 0
+
+
+def test_arrow_from_response_schema():
+    """
+    Verify pages are converted consistently using a schema, also when a column is NULL on a whole page.
+    """
+    schema = pa.schema([pa.field("data", pa.struct([pa.field("a", pa.int64())]))])
+    pages = [
+        {"cols": ["id", "data"], "col_types": [10, 12], "rows": [[1, None], [2, None]]},
+        {"cols": ["id", "data"], "col_types": [10, 12], "rows": [[3, {"a": 1}], [4, None]]},
+    ]
+    tables = [arrow_from_response(page, schema=schema) for page in pages]
+    assert tables[0].schema == tables[1].schema
+    assert tables[0].schema.field("id").type == pa.int64()
+    assert tables[0].schema.field("data").type == schema.field("data").type
+    assert tables[1].column("data").to_pylist() == [{"a": 1}, None]
+
+    # Without a schema, the type of the object column is inferred per page.
+    assert arrow_from_response(pages[0]).schema.field("data").type == pa.null()
+
+
+@pytest.mark.parametrize(
+    "data_type,expected",
+    [
+        ("text", pa.string()),
+        ("bigint", pa.int64()),
+        ("timestamp with time zone", pa.timestamp("ms", tz="UTC")),
+        ("text_array", pa.list_(pa.string())),
+        ("object", None),
+        ("object_array", None),
+    ],
+)
+def test_arrow_type_from_name(data_type, expected):
+    """
+    Verify data type names of `information_schema.columns` are mapped to Arrow data types.
+    """
+    assert arrow_type_from_name(data_type) == expected
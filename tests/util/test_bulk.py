@@ -0,0 +1,87 @@
+import pytest
+
+from cratedb_toolkit.util.bulk import BulkResponse, batched_by_size, rows_from_data
+
+RECORDS = [{"name": "temperature", "value": 42.42}, {"name": "humidity", "value": None}]
+ROWS = [("temperature", 42.42), ("humidity", None)]
+
+
+def test_rows_from_records():
+    columns, rows = rows_from_data(RECORDS)
+    assert columns == ["name", "value"]
+    assert list(rows) == ROWS
+
+
+def test_rows_from_sequences():
+    columns, rows = rows_from_data(ROWS, columns=["name", "value"])
+    assert columns == ["name", "value"]
+    assert list(rows) == ROWS
+
+
+def test_rows_from_sequences_without_columns():
+    with pytest.raises(ValueError) as ex:
+        rows_from_data(ROWS)
+    assert ex.match("Inserting sequences of values needs column names")
+
+
+def test_rows_from_pandas():
+    pd = pytest.importorskip("pandas")
+    columns, rows = rows_from_data(pd.DataFrame.from_records(RECORDS), chunk_size=1)
+    assert columns == ["name", "value"]
+    assert list(rows) == ROWS
+
+
+def test_rows_from_polars():
+    pl = pytest.importorskip("polars")
+    columns, rows = rows_from_data(pl.from_dicts(RECORDS), chunk_size=1)
+    assert columns == ["name", "value"]
+    assert list(rows) == ROWS
+
+
+def test_rows_from_arrow():
+    pa = pytest.importorskip("pyarrow")
+    columns, rows = rows_from_data(pa.Table.from_pylist(RECORDS), chunk_size=1)
+    assert columns == ["name", "value"]
+    assert list(rows) == ROWS
+
+
+@pytest.mark.parametrize("kind", ["pandas", "polars", "pyarrow"])
+def test_rows_from_frame_columns(kind):
+    """
+    Verify explicit columns select and reorder values of data frames and tables, not only their labels.
+    """
+    module = pytest.importorskip(kind)
+    if kind == "pandas":
+        data = module.DataFrame.from_records(RECORDS)
+    elif kind == "polars":
+        data = module.from_dicts(RECORDS)
+    else:
+        data = module.Table.from_pylist(RECORDS)
+
+    columns, rows = rows_from_data(data, columns=["value", "name"])
+    assert columns == ["value", "name"]
+    assert list(rows) == [tuple(reversed(row)) for row in ROWS]
+
+    columns, rows = rows_from_data(data, columns=["value"])
+    assert columns == ["value"]
+    assert list(rows) == [(row[1],) for row in ROWS]
+
+
+def test_batched_by_rows():
+    batches = list(batched_by_size(range(10), max_rows=4, max_bytes=1_000_000))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_batched_by_bytes():
+    rows = [("x" * 98,)] * 10
+    batches = list(batched_by_size(rows, max_rows=1_000, max_bytes=350, sample_size=2))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_bulk_response():
+    response = BulkResponse()
+    response.extend([{"rowcount": 1}, {"rowcount": -2}])
+    response.extend([{"rowcount": 1}])
+    assert response.record_count == 3
+    assert response.success_count == 2
+    assert response.failed_records == [1]
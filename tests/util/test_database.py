@@ -0,0 +1,230 @@
+import pytest
+import sqlalchemy as sa
+
+from cratedb_toolkit.util.database import (
+    DatabaseAdapter,
+    EngineRegistry,
+    engine_registry,
+    get_table_names,
+    split_sql,
+)
+
+
+def test_engine_registry_shared():
+    """
+    Verify adapters for the same database address share a single engine.
+    """
+    adapter1 = DatabaseAdapter(dburi="crate://localhost:4200/")
+    adapter2 = DatabaseAdapter(dburi="crate://localhost:4200/")
+    assert adapter1.engine is adapter2.engine
+
+
+def test_engine_registry_options():
+    """
+    Verify adapters with different engine options use different engines.
+    """
+    adapter1 = DatabaseAdapter(dburi="crate://localhost:4200/")
+    adapter2 = DatabaseAdapter(dburi="crate://localhost:4200/", pool_size=2)
+    assert adapter1.engine is not adapter2.engine
+    assert adapter2.engine.pool.size() == 2
+
+
+def test_engine_registry_dispose():
+    """
+    Verify disposing the registry creates fresh engines on next access.
+    """
+    registry = EngineRegistry()
+    engine1 = registry.get("crate://localhost:4200/")
+    registry.dispose()
+    engine2 = registry.get("crate://localhost:4200/")
+    assert engine1 is not engine2
+
+
+def test_database_adapter_lazy_connection():
+    """
+    Verify creating an adapter does not connect to the database.
+    """
+    adapter = DatabaseAdapter(dburi="crate://localhost:12345/")
+    assert adapter._connection is None
+    assert adapter.engine in engine_registry.engines.values()
+
+
+@pytest.fixture
+def sqlite_adapter(tmp_path):
+    """
+    Provide a database adapter to an SQLite database, which does not support server-side cursors.
+    """
+    adapter = DatabaseAdapter(dburi=f"sqlite:///{tmp_path / 'testdrive.sqlite'}")
+    with adapter.engine.begin() as connection:
+        connection.execute(sa.text("CREATE TABLE testdrive (id INTEGER, name TEXT);"))
+        connection.execute(
+            sa.text("INSERT INTO testdrive (id, name) VALUES (:id, :name);"),
+            [{"id": value, "name": f"n{value}"} for value in range(25)],
+        )
+    return adapter
+
+
+def test_iter_sql_keyset_tuples(sqlite_adapter):
+    """
+    Verify streaming results falls back to keyset pagination.
+    """
+    rows = list(sqlite_adapter.iter_sql("SELECT * FROM testdrive;", page_size=10, key="id"))
+    assert len(rows) == 25
+    assert rows[0] == (0, "n0")
+    assert rows[-1] == (24, "n24")
+
+
+def test_iter_sql_keyset_dicts(sqlite_adapter):
+    """
+    Verify streaming results as dictionaries.
+    """
+    rows = list(sqlite_adapter.iter_sql("SELECT * FROM testdrive", page_size=10, key="id", output="dicts"))
+    assert len(rows) == 25
+    assert rows[3] == {"id": 3, "name": "n3"}
+
+
+def test_iter_sql_keyset_arrow(sqlite_adapter):
+    """
+    Verify streaming results as Arrow record batches, one per page.
+    """
+    pytest.importorskip("pyarrow")
+    batches = list(sqlite_adapter.iter_sql("SELECT * FROM testdrive", page_size=10, key="id", output="arrow"))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    assert batches[0].schema.names == ["id", "name"]
+
+
+def test_iter_sql_keyset_arrow_schema(sqlite_adapter):
+    """
+    Verify streaming results as Arrow record batches uses the schema, also for a NULL-only page.
+    """
+    pa = pytest.importorskip("pyarrow")
+    sql = "SELECT id, CASE WHEN id >= 10 THEN name END AS name FROM testdrive"
+    schema = pa.schema([pa.field("name", pa.string())])
+    batches = list(sqlite_adapter.iter_sql(sql, page_size=10, key="id", output="arrow", schema=schema))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    assert batches[0].column("name").null_count == 10
+    assert all(batch.schema == batches[0].schema for batch in batches)
+    assert batches[0].schema.field("name").type == pa.string()
+
+
+@pytest.fixture
+def cratedb_demo(cratedb):
+    """
+    Provide a CrateDB table with 25 records, where the object column is NULL on the first ten.
+    """
+    database = cratedb.database
+    database.run_sql('CREATE TABLE "testdrive"."demo" (id INTEGER, name TEXT, data OBJECT(DYNAMIC));')
+    with database.checkout(begin=True) as connection:
+        connection.execute(
+            sa.text('INSERT INTO "testdrive"."demo" (id, name, data) VALUES (:id, :name, :data);'),
+            [{"id": value, "name": f"n{value}", "data": {"a": value} if value >= 10 else None} for value in range(25)],
+        )
+    database.refresh_table("testdrive.demo")
+    return database
+
+
+def test_iter_sql_cursor_cratedb(cratedb_demo):
+    """
+    Verify streaming results from CrateDB using a server-side cursor, across page boundaries.
+    """
+    rows = list(cratedb_demo.iter_sql('SELECT id, name FROM "testdrive"."demo" ORDER BY id', page_size=10))
+    assert len(rows) == 25
+    assert rows[0] == (0, "n0")
+    assert rows[-1] == (24, "n24")
+
+    # Exact multiple of the page size, followed by an empty page.
+    rows = list(cratedb_demo.iter_sql('SELECT id FROM "testdrive"."demo" WHERE id < 20 ORDER BY id', page_size=10))
+    assert [row[0] for row in rows] == list(range(20))
+
+
+def test_iter_sql_cursor_cratedb_arrow(cratedb_demo):
+    """
+    Verify streaming results from CrateDB as Arrow record batches, consistent across a NULL-only page.
+    """
+    pa = pytest.importorskip("pyarrow")
+    schema = pa.schema([pa.field("data", pa.struct([pa.field("a", pa.int32())]))])
+    batches = list(
+        cratedb_demo.iter_sql(
+            'SELECT id, data FROM "testdrive"."demo" ORDER BY id', page_size=10, output="arrow", schema=schema
+        )
+    )
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    assert batches[0].column("data").null_count == 10
+    assert all(batch.schema == batches[0].schema for batch in batches)
+    assert batches[0].schema.field("data").type == schema.field("data").type
+    assert batches[-1].column("data").to_pylist()[-1] == {"a": 24}
+
+
+def test_iter_sql_keyset_cratedb(cratedb_demo):
+    """
+    Verify keyset pagination on CrateDB, across page boundaries.
+    """
+    pages = list(cratedb_demo._iter_pages_keyset('SELECT id, data FROM "testdrive"."demo"', key="id", page_size=10))
+    assert [len(rows) for columns, rows in pages] == [10, 10, 5]
+    assert pages[0][0] == ["id", "data"]
+    assert [row[0] for columns, rows in pages for row in rows] == list(range(25))
+    assert {row[1] for row in pages[0][1]} == {None}
+
+
+def test_iter_sql_without_key(sqlite_adapter):
+    """
+    Verify streaming results without cursor support needs a key column.
+    """
+    with pytest.raises(sa.exc.DatabaseError):
+        list(sqlite_adapter.iter_sql("SELECT * FROM testdrive"))
+
+
+def test_split_sql_single():
+    """
+    Verify single statements are returned without tokenizing them.
+    """
+    assert split_sql("  SELECT 1 ") == ("SELECT 1",)
+    assert split_sql("SELECT 1;") == ("SELECT 1;",)
+    assert split_sql("") == ()
+
+
+def test_split_sql_multiple():
+    """
+    Verify multiple statements are split, respecting semicolons within literals.
+    """
+    assert split_sql("SELECT 1; SELECT ';';") == ("SELECT 1;", "SELECT ';';")
+
+
+def test_split_sql_cached():
+    """
+    Verify split statements are cached by SQL text.
+    """
+    split_sql.cache_clear()
+    split_sql("SELECT 1; SELECT 2;")
+    split_sql("SELECT 1; SELECT 2;")
+    assert split_sql.cache_info().hits == 1
+
+
+def test_get_table_names():
+    """
+    Verify table names are decoded from SQL statements, and callers receive independent lists.
+    """
+    names = get_table_names("SELECT * FROM foo; SELECT * FROM bar")
+    assert names == [["foo"], ["bar"]]
+    names[0].append("baz")
+    assert get_table_names("SELECT * FROM foo; SELECT * FROM bar") == [["foo"], ["bar"]]
+
+
+def test_run_sql_output_arrow(sqlite_adapter):
+    """
+    Verify returning results as Arrow table.
+    """
+    pytest.importorskip("pyarrow")
+    table = sqlite_adapter.run_sql("SELECT * FROM testdrive WHERE id < :limit", parameters={"limit": 3}, output="arrow")
+    assert table.column_names == ["id", "name"]
+    assert table.to_pydict() == {"id": [0, 1, 2], "name": ["n0", "n1", "n2"]}
+
+
+def test_run_sql_output_polars(sqlite_adapter):
+    """
+    Verify returning results as polars data frame, also for multiple statements.
+    """
+    pytest.importorskip("polars")
+    frames = sqlite_adapter.run_sql("SELECT * FROM testdrive; SELECT * FROM testdrive WHERE id > 100;", output="polars")
+    assert frames[0].shape == (25, 2)
+    assert frames[1].is_empty()
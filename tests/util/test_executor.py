@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from cratedb_toolkit.util.executor import bounded_map, prefetch
+
+
+def test_bounded_map_order():
+    """
+    Verify results are returned in order of the input items.
+    """
+
+    def work(item):
+        time.sleep(0.01 * (5 - item))
+        return item * 2
+
+    assert list(bounded_map(work, range(5), workers=3)) == [0, 2, 4, 6, 8]
+
+
+def test_bounded_map_processes():
+    """
+    Verify work is distributed to a pool of processes, and results are yielded in order.
+    """
+    assert list(bounded_map(abs, range(0, -20, -1), workers=2, processes=True)) == list(range(20))
+
+
+def test_prefetch_items():
+    assert list(prefetch(iter(range(10)), size=2)) == list(range(10))
+
+
+def test_prefetch_overlap():
+    """
+    Verify items are produced while the consumer processes the previous one.
+    """
+    produced = []
+
+    def produce():
+        for item in range(3):
+            produced.append(item)
+            yield item
+
+    for item in prefetch(produce()):
+        time.sleep(0.1)
+        assert len(produced) >= min(item + 2, 3)
+
+
+def test_prefetch_error():
+    def produce():
+        yield 1
+        raise ValueError("Something failed")
+
+    items = prefetch(produce())
+    assert next(items) == 1
+    with pytest.raises(ValueError) as ex:
+        next(items)
+    assert ex.match("Something failed")
+
+
+def test_prefetch_stop():
+    """
+    Verify the producer stops when the consumer does.
+    """
+    threads = threading.active_count()
+    items = prefetch(iter(range(1000)))
+    assert next(items) == 0
+    items.close()
+    time.sleep(0.3)
+    assert threading.active_count() == threads
@@ -0,0 +1,132 @@
+import io
+import json
+
+import pytest
+import sqlalchemy as sa
+from click.testing import CliRunner
+
+from cratedb_toolkit.cli import cli
+from cratedb_toolkit.util.database import DatabaseAdapter
+from cratedb_toolkit.util.instrumentation import sql_profiler
+
+
+@pytest.fixture
+def profiler():
+    sql_profiler.reset()
+    sql_profiler.enable()
+    yield sql_profiler
+    sql_profiler.disable()
+    sql_profiler.reset()
+
+
+def test_profiler_statements(profiler, tmp_path):
+    """
+    Verify SQL statements are recorded and aggregated by statement text.
+    """
+    adapter = DatabaseAdapter(dburi=f"sqlite:///{tmp_path / 'testdrive.sqlite'}")
+    for _ in range(3):
+        adapter.run_sql("SELECT   1")
+    adapter.run_sql("SELECT 2")
+
+    data = profiler.to_dict()
+    statements = {item["statement"]: item for item in data["statements"]}
+    assert statements["SELECT 1"]["calls"] == 3
+    assert statements["SELECT 2"]["calls"] == 1
+    assert statements["SELECT 1"]["total_ms"] >= statements["SELECT 1"]["max_ms"]
+    assert data["connections"]["count"] == 1
+    assert data["checkouts"]["count"] == 4
+    assert data["checkouts"]["total_ms"] >= data["checkouts"]["max_ms"]
+
+
+def test_profiler_insert_bulk(profiler, tmp_path):
+    """
+    Verify bulk operations are recorded, even though they bypass SQLAlchemy's engine events.
+    """
+    adapter = DatabaseAdapter(dburi=f"sqlite:///{tmp_path / 'testdrive.sqlite'}")
+    with adapter.checkout(begin=True) as connection:
+        connection.execute(sa.text("CREATE TABLE demo (id INTEGER, name TEXT)"))
+    adapter.insert_bulk("demo", [{"id": index, "name": "foo"} for index in range(5)], batch_size=2)
+
+    statements = {item["statement"]: item for item in profiler.to_dict()["statements"]}
+    bulk = statements["INSERT INTO demo (id, name) VALUES (?, ?)"]
+    assert bulk["calls"] == 3
+    assert bulk["rows"] == 5
+
+
+def test_profiler_response_size(profiler, mocker):
+    """
+    Verify the payload size is taken from response bodies of the CrateDB HTTP client, per thread.
+    """
+    import crate.client.http
+
+    body = b'{"cols":["x"],"rows":[[1]],"rowcount":1,"duration":1}'
+    response = mocker.Mock(status=200, data=body)
+    response.get_redirect_location.return_value = False
+    mocker.patch.object(crate.client.http.Server, "request", return_value=response)
+
+    client = crate.client.http.Client("http://localhost:4200")
+    assert client.sql("SELECT 1")["rows"] == [[1]]
+    assert profiler.response_size() == len(body)
+    assert profiler.response_size() == 0
+
+    profiler.disable()
+    client.sql("SELECT 1")
+    assert profiler.response_size() == 0
+
+
+def test_profiler_disabled(tmp_path):
+    """
+    Verify nothing is recorded when the profiler is not enabled.
+    """
+    sql_profiler.reset()
+    engine = sa.create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.execute(sa.text("SELECT 1"))
+    assert sql_profiler.to_dict()["statements"] == []
+
+
+def test_profiler_report(profiler):
+    """
+    Verify reporting measurements as table and JSON.
+    """
+    profiler.record("SELECT 42", duration=0.5, rows=1, size=4)
+
+    buffer = io.StringIO()
+    profiler.report(format_="json", file=buffer)
+    assert json.loads(buffer.getvalue())["statements"] == [
+        {
+            "statement": "SELECT 42",
+            "calls": 1,
+            "total_ms": 500.0,
+            "mean_ms": 500.0,
+            "max_ms": 500.0,
+            "rows": 1,
+            "bytes": 4,
+        }
+    ]
+
+    buffer = io.StringIO()
+    profiler.report(format_="table", file=buffer)
+    assert "SELECT 42" in buffer.getvalue()
+    assert "Connections: count=0" in buffer.getvalue()
+    assert "Checkouts: count=0" in buffer.getvalue()
+
+
+def test_cli_profile_sql(cratedb):
+    """
+    Verify `ctk --profile-sql` reports SQL statements of the invoked subcommand.
+    """
+    runner = CliRunner(env={"CRATEDB_SQLALCHEMY_URL": cratedb.database.dburi})
+    try:
+        result = runner.invoke(
+            cli,
+            args="--profile-sql --profile-sql-format=json wtf info",
+            catch_exceptions=False,
+        )
+    finally:
+        sql_profiler.disable()
+    assert result.exit_code == 0
+
+    report = json.loads(result.stderr[result.stderr.index("{\n") :])
+    assert report["statements"]
+    assert report["connections"]["count"] >= 1
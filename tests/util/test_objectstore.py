@@ -0,0 +1,265 @@
+import inspect
+import threading
+import time
+
+import pytest
+
+from cratedb_toolkit.util.objectstore import (
+    MultipartWriter,
+    ObjectStore,
+    S3MultipartWriter,
+    S3ObjectStore,
+    is_object_store_url,
+)
+
+
+class MemoryWriter(MultipartWriter):
+    """
+    Collect uploaded parts in memory, recording how many uploads run concurrently.
+    """
+
+    def __init__(self, fail_part=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_part = fail_part
+        self.uploaded = {}
+        self.objects = []
+        self.completed = None
+        self.aborted = False
+        self.active = 0
+        self.active_max = 0
+        self.lock = threading.Lock()
+
+    def begin_upload(self):
+        pass
+
+    def upload_part(self, number, data):
+        with self.lock:
+            self.active += 1
+            self.active_max = max(self.active, self.active_max)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        if number == self.fail_part:
+            raise OSError("Connection reset by peer")
+        self.uploaded[number] = data
+        return number
+
+    def complete_upload(self, parts):
+        self.completed = b"".join(self.uploaded[number] for number in parts)
+
+    def abort_upload(self):
+        self.aborted = True
+
+    def upload_object(self, data):
+        self.objects.append(data)
+
+
+class FakeMinio:
+    """
+    Receive objects like the MinIO client, validating calls against the signatures of its methods.
+    """
+
+    def __init__(self, fail_part=None):
+        self.fail_part = fail_part
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+
+    def call(self, name, *args):
+        from minio import Minio
+
+        inspect.signature(getattr(Minio, name)).bind(self, *args)
+        self.calls.append(name)
+
+    def put_object(self, bucket, key, data, length):
+        self.call("put_object", bucket, key, data, length)
+        self.objects[(bucket, key)] = data.read(length)
+
+    def _create_multipart_upload(self, bucket, key, headers):
+        self.call("_create_multipart_upload", bucket, key, headers)
+        self.uploads["upload-1"] = {}
+        return "upload-1"
+
+    def _upload_part(self, bucket, key, data, headers, upload_id, number):
+        self.call("_upload_part", bucket, key, data, headers, upload_id, number)
+        if number == self.fail_part:
+            raise OSError("Connection reset by peer")
+        self.uploads[upload_id][number] = data
+        return f"etag-{number}"
+
+    def _complete_multipart_upload(self, bucket, key, upload_id, parts):
+        self.call("_complete_multipart_upload", bucket, key, upload_id, parts)
+        assert [part.etag for part in parts] == [f"etag-{part.part_number}" for part in parts]
+        upload = self.uploads.pop(upload_id)
+        self.objects[(bucket, key)] = b"".join(upload[part.part_number] for part in parts)
+
+    def _abort_multipart_upload(self, bucket, key, upload_id):
+        self.call("_abort_multipart_upload", bucket, key, upload_id)
+        del self.uploads[upload_id]
+
+
+def test_is_object_store_url():
+    assert is_object_store_url("s3://bucket/cfr") is True
+    assert is_object_store_url("az://container/cfr.tgz") is True
+    assert is_object_store_url("file:///var/ctk/cfr") is False
+
+
+def test_multipart_writer():
+    """
+    Verify parts are uploaded concurrently, and completed in order.
+    """
+    payload = bytes(range(256)) * 1000
+    writer = MemoryWriter(part_size=1000, threads=4)
+    for offset in range(0, len(payload), 333):
+        writer.write(payload[offset : offset + 333])
+    writer.close()
+    assert writer.completed == payload
+    assert len(writer.uploaded) == 256
+    assert 1 < writer.active_max <= 4
+    assert writer.objects == []
+
+
+def test_multipart_writer_small():
+    """
+    Verify objects smaller than a single part are uploaded using a single request.
+    """
+    writer = MemoryWriter(part_size=1000)
+    writer.write(b"foo")
+    writer.close()
+    assert writer.objects == [b"foo"]
+    assert writer.completed is None
+
+
+def test_multipart_writer_failure():
+    """
+    Verify failing uploads are aborted, instead of being completed.
+    """
+    writer = MemoryWriter(part_size=10, fail_part=3)
+    writer.write(b"x" * 100)
+    with pytest.raises(OSError):
+        writer.close()
+    assert writer.aborted is True
+    assert writer.completed is None
+    assert writer.closed
+
+
+def test_object_store_open_abort(mocker):
+    """
+    Verify objects are not created when writing them fails.
+    """
+    store = S3ObjectStore("s3://bucket/cfr?endpoint=http://localhost:9000")
+    writer = MemoryWriter(part_size=10)
+    mocker.patch.object(store, "writer", return_value=writer)
+    with pytest.raises(ValueError):
+        with store.open("foo.jsonl") as file:
+            file.write(b"x" * 100)
+            raise ValueError("Connection refused")
+    assert writer.aborted is True
+    assert writer.completed is None
+
+
+def test_multipart_writer_bounded():
+    """
+    Verify the number of parts held in memory is bounded, when uploads are slower than writing.
+    """
+    writer = MemoryWriter(part_size=10, threads=2)
+    held_max = 0
+    for _ in range(20):
+        writer.write(b"x" * 10)
+        held_max = max(held_max, sum(not future.done() for future in writer.parts))
+    writer.close()
+    assert 0 < held_max <= 4
+
+
+def test_s3_multipart_writer():
+    """
+    Verify large objects are uploaded to S3 in parts, and completed in order.
+    """
+    pytest.importorskip("minio")
+    client = FakeMinio()
+    payload = bytes(range(256)) * 1000
+    writer = S3MultipartWriter(client, bucket="bucket", key="foo.jsonl", part_size=1000, threads=2)
+    for offset in range(0, len(payload), 333):
+        writer.write(payload[offset : offset + 333])
+    writer.close()
+    assert client.objects == {("bucket", "foo.jsonl"): payload}
+    assert client.calls.count("_upload_part") == 256
+    assert client.calls[0] == "_create_multipart_upload"
+    assert client.calls[-1] == "_complete_multipart_upload"
+
+
+def test_s3_multipart_writer_small():
+    """
+    Verify small and empty objects are uploaded using a single request.
+    """
+    pytest.importorskip("minio")
+    client = FakeMinio()
+    S3MultipartWriter(client, bucket="bucket", key="foo.jsonl").close()
+    with S3MultipartWriter(client, bucket="bucket", key="bar.jsonl") as writer:
+        writer.write(b"bar")
+    assert client.objects == {("bucket", "foo.jsonl"): b"", ("bucket", "bar.jsonl"): b"bar"}
+    assert client.calls == ["put_object", "put_object"]
+
+
+def test_s3_multipart_writer_failure():
+    """
+    Verify failing uploads are aborted, instead of being completed.
+    """
+    pytest.importorskip("minio")
+    client = FakeMinio(fail_part=3)
+    writer = S3MultipartWriter(client, bucket="bucket", key="foo.jsonl", part_size=10)
+    writer.write(b"x" * 100)
+    with pytest.raises(OSError) as ex:
+        writer.close()
+    assert ex.match("Connection reset by peer")
+    assert client.objects == {}
+    assert client.uploads == {}
+    assert client.calls[-1] == "_abort_multipart_upload"
+
+
+def test_s3_object_store(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "foo")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "bar")
+    store = ObjectStore.from_url("s3://bucket/var/cfr.tgz?endpoint=http://localhost:9000")
+    assert isinstance(store, S3ObjectStore)
+    assert store.bucket == "bucket"
+    assert store.prefix == "var/cfr.tgz"
+    assert store.location("var/cfr.tgz") == "s3://bucket/var/cfr.tgz"
+    assert store.client._base_url.host == "localhost:9000"
+
+    with pytest.raises(ValueError) as ex:
+        ObjectStore.from_url("gs://bucket/cfr")
+    assert ex.match("Object store not supported: gs")
+
+
+def test_s3_object_store_minio(minio):
+    """
+    Verify multipart uploads to an S3-compatible object storage.
+    """
+    client = minio.get_client()
+    client.make_bucket("cfr")
+    config = minio.get_config()
+    store = ObjectStore.from_url(
+        f"s3://{config['access_key']}:{config['secret_key']}@cfr/export?endpoint=http://{config['endpoint']}"
+    )
+    payload = b"x" * (6 * 1024 * 1024) + b"y" * 100
+
+    # Small objects are uploaded using a single request.
+    with store.open("export/small.jsonl") as file:
+        file.write(b"foo")
+
+    # Large objects are uploaded in parts, of at least 5 MiB each, except the last one.
+    with S3MultipartWriter(store.client, bucket="cfr", key="export/large.jsonl", part_size=5 * 1024 * 1024) as writer:
+        writer.write(payload[: 3 * 1024 * 1024])
+        writer.write(payload[3 * 1024 * 1024 :])
+
+    assert client.get_object("cfr", "export/small.jsonl").read() == b"foo"
+    assert client.get_object("cfr", "export/large.jsonl").read() == payload
+
+
+@pytest.fixture(scope="module")
+def minio():
+    from cratedb_toolkit.testing.testcontainers.minio import ExtendedMinioContainer
+
+    with ExtendedMinioContainer() as minio:
+        yield minio